@@ -1,20 +1,61 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Request, Response, request, jsonify, render_template
+import io
 import os
+import threading
 from flask_cors import CORS, cross_origin
-from cnnClassifier.utils.common import decodeImage
+from cnnClassifier import configure_logging
+from cnnClassifier.components.preprocessing import InvalidImageError
+from cnnClassifier.components.profiling import PROFILERS, PROMETHEUS_CONTENT_TYPE, ProfilerBusyError, flatten_gauges, get_metrics
+from cnnClassifier.utils.common import decodeImageToBytes
+from cnnClassifier.components.training_jobs import TrainingJobManager, TrainingJobRunningError
+from cnnClassifier.config.configuration import ConfigurationManager
 from cnnClassifier.pipeline.prediction import PredictionPipeline
 
 os.putenv("LANG", "en_US.UTF-8")
 os.putenv("LC_ALL", "en_US.UTF-8")
+configure_logging()
+
+class InMemoryRequest(Request):
+    # uploaded files stay in memory (bounded by MAX_CONTENT_LENGTH) and go straight to the image decoder
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 CORS(app)
 
+config_manager = ConfigurationManager()
+training_jobs = TrainingJobManager(config_manager.get_training_jobs_config())
+serving_config = config_manager.get_prediction_config()
+# larger /predict bodies are answered with 413
+app.config["MAX_CONTENT_LENGTH"] = int(serving_config.max_upload_mb * 1024 * 1024)
+
 
 class ClientApp:
-    def __init__(self):
-        self.filename = "inputImage.jpg"
-        self.classifier = PredictionPipeline(self.filename)
+    def __init__(self, prefork: bool = False):
+        self.classifier = PredictionPipeline(config=config_manager.get_prediction_config(prefork=prefork))
+        # load the model once at startup instead of on every request
+        self.classifier.registry.load()
+
+
+clApp = None
+_clApp_lock = threading.Lock()
+
+
+def get_client_app(prefork: bool = False) -> ClientApp:
+    """
+    Returns the process' ClientApp, creating it (and loading the model) on first use.
+
+    The model is not loaded at import time, so a pre-fork server can import this module once in its
+    master process and every worker loads the model itself, with its own thread budget (see
+    `gunicorn.conf.py`). With `prefork` set, the worker serves `prediction.serving.prefork_backend`.
+    """
+    global clApp
+    with _clApp_lock:
+        if clApp is None:
+            clApp = ClientApp(prefork=prefork)
+    return clApp
 
 
 @app.route("/", methods=["GET"])
@@ -26,20 +67,103 @@ def home():
 @app.route("/train", methods=["GET", "POST"])
 @cross_origin()
 def trainRoute():
-    os.system("python main.py")
-    # os.system("dvc repro")
-    return "Training done successfully!"
+    # runs main.py in a background process; poll the returned job for its progress
+    try:
+        job = training_jobs.submit()
+    except TrainingJobRunningError as e:
+        return jsonify({"error": str(e), "job_id": e.job_id}), 409
+    job["status_url"] = f"/train/jobs/{job['job_id']}"
+    return jsonify(job), 202
+
+
+@app.route("/train/jobs", methods=["GET"])
+@cross_origin()
+def trainJobsRoute():
+    return jsonify(training_jobs.list_jobs())
+
+
+@app.route("/train/jobs/<job_id>", methods=["GET"])
+@cross_origin()
+def trainJobRoute(job_id):
+    try:
+        return jsonify(training_jobs.status(job_id))
+    except FileNotFoundError:
+        return jsonify({"error": f"Unknown training job {job_id}"}), 404
+
+
+def request_images() -> list:
+    """
+    Returns the images of a /predict request, still encoded: the raw body of an `image/*` (or
+    `application/octet-stream`) request, every file of a `multipart/form-data` upload, or the
+    base64 `image` field of a JSON body.
+    """
+    if request.mimetype.startswith("image/") or request.mimetype == "application/octet-stream":
+        return [request.get_data(cache=False)]
+    if request.mimetype == "multipart/form-data":
+        return [upload.stream for name in request.files for upload in request.files.getlist(name)]
+    # decoded in memory: no shared temp file between concurrent requests
+    return [decodeImageToBytes(request.json["image"])]
 
 
 @app.route("/predict", methods=["POST"])
 @cross_origin()
 def predictRoute():
-    image = request.json["image"]
-    decodeImage(image, clApp.filename)
-    result = clApp.classifier.predict()
-    return jsonify(result)
+    images = request_images()
+    if not images:
+        return jsonify({"error": "The request holds no image"}), 400
+    if len(images) > serving_config.max_images_per_request:
+        return jsonify({"error": f"At most {serving_config.max_images_per_request} images per request"}), 413
+
+    classifier = get_client_app().classifier
+    profile = request.args.get("profile")
+    if not profile:
+        try:
+            return jsonify(classifier.predict_batch(images))
+        except InvalidImageError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # opt-in profile of this single request, e.g. /predict?profile=cprofile
+    if not classifier.config.request_profiles:
+        return jsonify({"error": "Request profiles are disabled (profiling.request_profiles)"}), 403
+    if profile not in PROFILERS:
+        return jsonify({"error": f"Unknown profiler {profile}, expected one of {list(PROFILERS)}"}), 400
+    try:
+        result, path = classifier.profile(images, profile)
+    except ProfilerBusyError as e:
+        return jsonify({"error": str(e)}), 409
+    except InvalidImageError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(result)
+    response.headers["X-Profile-Path"] = str(path)
+    return response
+
+
+def serving_metrics() -> dict:
+    classifier = get_client_app().classifier
+    metrics = classifier.registry.metrics()
+    metrics["pid"] = os.getpid()
+    if classifier.batcher is not None:
+        metrics["batching"] = classifier.batcher.metrics()
+    if classifier.result_cache is not None:
+        metrics["result_cache"] = classifier.result_cache.metrics()
+    return metrics
+
+
+@app.route("/model/metrics", methods=["GET"])
+@cross_origin()
+def modelMetricsRoute():
+    metrics = serving_metrics()
+    metrics["spans"] = get_metrics().summary()
+    return jsonify(metrics)
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheusMetricsRoute():
+    # span histograms and the model metrics of this process, in the Prometheus text format
+    gauges = flatten_gauges("serving", serving_metrics())
+    return Response(get_metrics().render_prometheus(gauges), content_type=PROMETHEUS_CONTENT_TYPE)
 
 
 if __name__ == "__main__":
-    clApp = ClientApp()
+    get_client_app()
     app.run(host="0.0.0.0", port=8080) # for AWS
\ No newline at end of file
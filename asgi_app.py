@@ -0,0 +1,242 @@
+"""
+Asyncio-native prediction service with admission control:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+
+Image decoding and inference run on a bounded pool of `prediction.serving.worker_threads` threads.
+Requests beyond `max_queue` waiting ones are rejected with 429, and requests that are not answered
+within their deadline (`request_timeout_ms`, or a shorter positive `X-Request-Timeout-Ms` header) get
+503, so tail latency stays bounded under overload instead of growing until clients time out. A
+malformed `X-Request-Timeout-Ms` or `Content-Length` header gets 400. Bodies above
+`max_upload_mb` (counted as they arrive, so chunked uploads without a Content-Length are capped too)
+and uploads of more than `max_images_per_request` images get 413, like in the Flask app.
+"""
+import asyncio
+import contextlib
+import math
+import os
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.bounded_executor import BoundedExecutor, DeadlineExceededError, QueueFullError
+from cnnClassifier.components.preprocessing import InvalidImageError
+from cnnClassifier.components.profiling import PROFILERS, PROMETHEUS_CONTENT_TYPE, ProfilerBusyError, flatten_gauges, get_metrics
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from cnnClassifier.utils.common import decodeImageToBytes
+
+
+configure_logging()
+templates = Jinja2Templates(directory="templates")
+
+
+class BodyTooLargeError(Exception):
+    """Raised while a request body is read, once it grows beyond the upload limit."""
+
+
+class AsyncClientApp:
+    def __init__(self, config: PredictionConfig = None):
+        self.classifier = PredictionPipeline(config=config)
+        config = self.classifier.config
+        self.executor = BoundedExecutor(max_workers=config.worker_threads, max_queue=config.max_queue)
+        self.default_timeout = config.request_timeout_ms / 1000.0
+
+
+    @staticmethod
+    def decode(images: list) -> list:
+        # base64 images of JSON bodies are decoded on the worker thread, not on the event loop
+        return [decodeImageToBytes(image) if isinstance(image, str) else image for image in images]
+
+
+    def predict(self, images: list):
+        return self.classifier.predict_batch(self.decode(images))
+
+
+    def profile(self, images: list, kind: str):
+        return self.classifier.profile(self.decode(images), kind)
+
+
+    def metrics(self) -> dict:
+        metrics = self.classifier.registry.metrics()
+        metrics["pid"] = os.getpid()
+        metrics["executor"] = self.executor.metrics()
+        if self.classifier.batcher is not None:
+            metrics["batching"] = self.classifier.batcher.metrics()
+        if self.classifier.result_cache is not None:
+            metrics["result_cache"] = self.classifier.result_cache.metrics()
+        return metrics
+
+
+    def timeout_of(self, request: Request) -> float:
+        """
+        Returns the deadline of a request in seconds: the `X-Request-Timeout-Ms` header if given,
+        capped at the configured `request_timeout_ms`.
+
+        Raises:
+            ValueError: If the header is not a positive number of milliseconds.
+        """
+        header = request.headers.get("x-request-timeout-ms")
+        if header is None:
+            return self.default_timeout
+        try:
+            timeout_ms = float(header)
+        except ValueError:
+            timeout_ms = math.nan
+        if not timeout_ms > 0:
+            raise ValueError(f"X-Request-Timeout-Ms must be a positive number of milliseconds, got {header!r}")
+        return min(timeout_ms / 1000.0, self.default_timeout)
+
+
+async def home(request: Request):
+    return templates.TemplateResponse(request, "index.html")
+
+
+def content_length_of(request: Request) -> int:
+    """
+    Returns the declared body size of a request, or None without a Content-Length header.
+
+    Raises:
+        ValueError: If the header is not a non-negative integer.
+    """
+    header = request.headers.get("content-length")
+    if header is None:
+        return None
+    if not header.strip().isdigit():
+        raise ValueError(f"Content-Length must be a non-negative integer, got {header!r}")
+    return int(header)
+
+
+def limit_body(request: Request, max_bytes: int) -> Request:
+    """
+    Returns the request with a body that raises `BodyTooLargeError` as soon as more than `max_bytes`
+    have been received, whether or not the client sent a Content-Length.
+    """
+    receive = request.receive
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise BodyTooLargeError(f"The request body exceeds {max_bytes / (1024 * 1024):g} MB")
+        return message
+
+    return Request(request.scope, limited_receive)
+
+
+async def request_images(request: Request, max_images: int) -> list:
+    """
+    Returns the images of a /predict request: the raw body of an `image/*` (or
+    `application/octet-stream`) request, every file of a `multipart/form-data` upload, or the
+    still base64 encoded `image` field of a JSON body.
+    """
+    content_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if content_type.startswith("image/") or content_type == "application/octet-stream":
+        return [await request.body()]
+    if content_type == "multipart/form-data":
+        async with request.form(max_files=max_images) as form:
+            return [await upload.read() for _, upload in form.multi_items() if isinstance(upload, UploadFile)]
+    payload = await request.json()
+    return [payload["image"]]
+
+
+async def predictRoute(request: Request):
+    clApp = request.app.state.clApp
+    config = clApp.classifier.config
+    too_many_images = {"error": f"At most {config.max_images_per_request} images per request"}
+    max_bytes = int(config.max_upload_mb * 1024 * 1024)
+    try:
+        timeout = clApp.timeout_of(request)
+        content_length = content_length_of(request)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if content_length is not None and content_length > max_bytes:
+        return JSONResponse({"error": f"The request body exceeds {config.max_upload_mb} MB"}, status_code=413)
+    try:
+        images = await request_images(limit_body(request, max_bytes), config.max_images_per_request)
+    except BodyTooLargeError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except HTTPException as e:
+        # Starlette reports its multipart limits as 400s; more files than max_images_per_request is a 413
+        if str(e.detail).startswith("Too many files"):
+            return JSONResponse(too_many_images, status_code=413)
+        return JSONResponse({"error": e.detail}, status_code=e.status_code)
+    if not images:
+        return JSONResponse({"error": "The request holds no image"}, status_code=400)
+    if len(images) > config.max_images_per_request:
+        return JSONResponse(too_many_images, status_code=413)
+
+    profile = request.query_params.get("profile")
+    if profile and not clApp.classifier.config.request_profiles:
+        return JSONResponse({"error": "Request profiles are disabled (profiling.request_profiles)"}, status_code=403)
+    if profile and profile not in PROFILERS:
+        return JSONResponse({"error": f"Unknown profiler {profile}, expected one of {list(PROFILERS)}"}, status_code=400)
+    try:
+        if profile:
+            # opt-in profile of this single request, e.g. /predict?profile=cprofile
+            result, path = await clApp.executor.run(clApp.profile, images, profile, timeout=timeout)
+        else:
+            result = await clApp.executor.run(clApp.predict, images, timeout=timeout)
+    except QueueFullError as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "1"})
+    except DeadlineExceededError as e:
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+    except ProfilerBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    except InvalidImageError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if profile:
+        return JSONResponse(result, headers={"X-Profile-Path": str(path)})
+    return JSONResponse(result)
+
+
+async def modelMetricsRoute(request: Request):
+    metrics = request.app.state.clApp.metrics()
+    metrics["spans"] = get_metrics().summary()
+    return JSONResponse(metrics)
+
+
+async def prometheusMetricsRoute(request: Request):
+    # span histograms and the model and executor metrics of this process, in the Prometheus text format
+    gauges = flatten_gauges("serving", request.app.state.clApp.metrics())
+    return Response(get_metrics().render_prometheus(gauges), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    clApp = AsyncClientApp()
+    # load and warm up the model before the server accepts requests
+    await asyncio.get_running_loop().run_in_executor(None, clApp.classifier.registry.load)
+    app.state.clApp = clApp
+    logger.info("ASGI prediction service ready")
+    yield
+    clApp.executor.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/", home, methods=["GET"]),
+        Route("/predict", predictRoute, methods=["POST"]),
+        Route("/model/metrics", modelMetricsRoute, methods=["GET"]),
+        Route("/metrics", prometheusMetricsRoute, methods=["GET"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,137 @@
+"""
+Import-time benchmark of the package and the serving apps, based on `python -X importtime`.
+
+Every target is imported in a fresh interpreter `--repeat` times. The script reports the median
+cumulative import time, the heaviest modules it pulled in and whether any of the `--forbid`
+modules (by default TensorFlow, Keras and joblib, which the package loads only on first use) were
+imported. Results can be saved and compared against a saved baseline to catch regressions; the
+script exits with status 1 if a forbidden module is imported or a target got slower than the
+baseline by more than `--max-regression`.
+
+Usage (from the repository root, with the package installed or `src` on PYTHONPATH):
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --save import_time.json
+    python benchmarks/bench_import_time.py --baseline import_time.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+TARGETS = [
+    "cnnClassifier",
+    "cnnClassifier.utils.common",
+    "cnnClassifier.config.configuration",
+    "cnnClassifier.pipeline.prediction",
+    "app",
+    "asgi_app",
+]
+FORBIDDEN = ["tensorflow", "keras", "joblib"]
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses `-X importtime` output into (module, depth, self_us, cumulative_us) tuples.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_once(target: str) -> list:
+    """
+    Imports `target` in a fresh interpreter and returns its parsed `-X importtime` output. The
+    modules the interpreter itself imports at startup are listed too; see `startup_modules`.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(os.getcwd(), "src"), os.getcwd(), env.get("PYTHONPATH")]))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}" if target else "pass"],
+        capture_output=True, text=True, env=env
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{process.stderr[-2000:]}")
+    return parse_importtime(process.stderr)
+
+
+def startup_modules() -> set:
+    """
+    Returns the modules an empty interpreter imports (encodings, site, ...), which are not counted.
+    """
+    return {name for name, _, _, _ in import_once(None)}
+
+
+def measure(target: str, repeat: int, top: int, forbid: list, startup: set) -> dict:
+    """
+    Returns the median and minimum import time of `target` in ms over `repeat` fresh interpreters,
+    the number of modules it imports, its `top` heaviest direct imports and the `forbid` modules it imports.
+    """
+    totals, modules = [], []
+    for _ in range(repeat):
+        modules = [entry for entry in import_once(target) if entry[0] not in startup]
+        # the top-level entries are the target and its parent packages, each with everything it imported
+        totals.append(sum(cumulative for _, depth, _, cumulative in modules if depth == 0))
+    loaded = {name for name, _, _, _ in modules}
+    heaviest = sorted((entry for entry in modules if entry[1] == 1), key=lambda entry: -entry[3])
+    return {
+        "median_ms": statistics.median(totals) / 1000.0,
+        "min_ms": min(totals) / 1000.0,
+        "modules": len(modules),
+        "heaviest": [(name, cumulative / 1000.0) for name, _, _, cumulative in heaviest[:top]],
+        "forbidden": sorted(name for name in forbid if name in loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=TARGETS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports listed per target")
+    parser.add_argument("--forbid", nargs="*", default=FORBIDDEN, help="modules no target may import")
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare against results saved with --save")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown vs. the baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    startup = startup_modules()
+    results, failures = {}, []
+    print(f"{'target':<36}{'median (ms)':>12}{'min (ms)':>10}{'modules':>9}{'baseline':>10}  forbidden")
+    for target in args.targets:
+        result = measure(target, args.repeat, args.top, args.forbid, startup)
+        results[target] = result
+        reference = baseline.get(target, {}).get("median_ms")
+        print(f"{target:<36}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}{result['modules']:>9}"
+              f"{(f'{reference:.1f}' if reference else '-'):>10}  {', '.join(result['forbidden']) or '-'}")
+        for name, cumulative_ms in result["heaviest"]:
+            print(f"    {name:<44}{cumulative_ms:>10.1f} ms")
+
+        if result["forbidden"]:
+            failures.append(f"{target} imports {', '.join(result['forbidden'])}")
+        if reference and result["median_ms"] > reference * (1 + args.max_regression):
+            failures.append(f"{target} takes {result['median_ms']:.1f} ms to import, baseline {reference:.1f} ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Saved results to {args.save}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Load benchmark for the /predict inference path: one forward pass per request vs. the micro-batcher.
+
+Concurrent clients are simulated with threads that each send single 224x224x3 images. For both
+paths the script reports p50/p99 request latency and throughput in images/sec.
+
+Usage:
+    python benchmarks/bench_micro_batching.py --concurrency 16 --requests 512
+    python benchmarks/bench_micro_batching.py --model model/model --max-batch-size 32 --max-wait-ms 10
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.micro_batcher import MicroBatcher
+from cnnClassifier.components.model_artifact import load_model
+from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+
+
+def load_or_build_model(path: str) -> tf.keras.Model:
+    if path and os.path.exists(path):
+        return load_model(path)
+    print(f"Model file {path} not found, benchmarking an untrained VGG16 with the same head")
+    base_model = tf.keras.applications.vgg16.VGG16(input_shape=[224, 224, 3], weights=None, include_top=False)
+    return PrepareBaseModel._prepare_full_model(model=base_model, classes=2, freeze_all=True, freeze_till=None)
+
+
+def run_load(request_fn, concurrency: int, total_requests: int, image: np.ndarray) -> dict:
+    latencies = []
+    latencies_lock = threading.Lock()
+    per_thread = total_requests // concurrency
+
+    def client():
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            request_fn(image)
+            local.append(time.perf_counter() - start)
+        with latencies_lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "images_per_sec": len(latencies) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("model", "model"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = load_or_build_model(args.model)
+    image = np.random.default_rng(0).uniform(0, 255, size=(224, 224, 3)).astype("float32")
+
+    def predict_batch(batch):
+        return model.predict(batch, verbose=0)
+
+    # warm up both paths so tracing is not measured
+    predict_batch(image[None])
+    predict_batch(np.stack([image] * args.max_batch_size))
+
+    per_request = run_load(lambda x: predict_batch(x[None]), args.concurrency, args.requests, image)
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    batched = run_load(batcher.predict, args.concurrency, args.requests, image)
+    batch_metrics = batcher.metrics()
+    batcher.stop()
+
+    print(f"concurrency={args.concurrency} requests={args.requests} "
+          f"max_batch_size={args.max_batch_size} max_wait_ms={args.max_wait_ms}")
+    print(f"{'path':<14}{'p50 (ms)':>12}{'p99 (ms)':>12}{'images/sec':>14}")
+    for name, result in (("per-request", per_request), ("micro-batched", batched)):
+        print(f"{name:<14}{result['p50_ms']:>12.1f}{result['p99_ms']:>12.1f}{result['images_per_sec']:>14.1f}")
+    print(f"mean batch size: {batch_metrics['mean_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Load-time benchmark of the model file formats.
+
+The model (`--model`, or an untrained VGG16 with the project's head if it does not exist) is saved
+once in every format into a temporary directory:
+
+- `h5`: legacy HDF5 (`model.save("model.h5")`), what the pipeline stages wrote before
+- `keras_v3`: the Keras v3 zip archive (`model.save("model.keras", save_format="keras_v3")`)
+- `savedmodel`: a TensorFlow SavedModel directory
+- `artifact`: a model artifact (see `ModelArtifactStore`): the architecture as JSON, the raw weights
+  (memory-mapped on load) and a manifest
+
+Every format is then loaded `--repeat` times, each time in a fresh interpreter that has already
+imported TensorFlow, so only the load itself is timed. The script reports the size on disk, the
+median load time, the median time of the first prediction after loading and the largest difference
+between the predictions of the loaded and the original model (0 for a lossless format).
+
+Usage (from the repository root, with the package installed or `src` on PYTHONPATH):
+    python benchmarks/bench_model_load.py
+    python benchmarks/bench_model_load.py --model model/model --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+FORMATS = ["h5", "keras_v3", "savedmodel", "artifact"]
+
+
+def load_once(fmt: str, path: str, input_path: str):
+    """
+    Runs in the fresh interpreter: loads the model, predicts once and prints the timings as JSON.
+    """
+    import tensorflow as tf
+    from cnnClassifier.components.model_artifact import load_model
+
+    images = np.load(input_path)
+    start = time.perf_counter()
+    if fmt == "artifact":
+        model = load_model(path)
+    else:
+        model = tf.keras.models.load_model(path, compile=False)
+    loaded_at = time.perf_counter()
+    probabilities = model(tf.constant(images), training=False).numpy()
+    print(json.dumps({
+        "load_seconds": loaded_at - start,
+        "first_predict_seconds": time.perf_counter() - loaded_at,
+        "probabilities": probabilities.tolist(),
+    }))
+
+
+def load_or_build_model(path: str):
+    import tensorflow as tf
+    from cnnClassifier.components.model_artifact import load_model
+    from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+
+    if path and os.path.exists(path):
+        return load_model(path)
+    print(f"Model {path} not found, benchmarking an untrained VGG16 with the same head")
+    base_model = tf.keras.applications.vgg16.VGG16(input_shape=[224, 224, 3], weights=None, include_top=False)
+    return PrepareBaseModel._prepare_full_model(model=base_model, classes=2, freeze_all=True, freeze_till=None)
+
+
+def save_all(model, directory: str) -> dict:
+    """
+    Saves `model` in every format under `directory` and returns the path of each.
+    """
+    from cnnClassifier.components.model_artifact import ModelArtifactStore
+
+    paths = {
+        "h5": os.path.join(directory, "model.h5"),
+        "keras_v3": os.path.join(directory, "model.keras"),
+        "savedmodel": os.path.join(directory, "savedmodel"),
+    }
+    model.save(paths["h5"])
+    model.save(paths["keras_v3"], save_format="keras_v3")
+    model.save(paths["savedmodel"], save_format="tf")
+    paths["artifact"] = str(ModelArtifactStore(os.path.join(directory, "store")).save(model, name="model"))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("model", "model"))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per format")
+    parser.add_argument("--load-once", nargs=3, metavar=("FORMAT", "PATH", "INPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_once:
+        load_once(*args.load_once)
+        return
+
+    from cnnClassifier.components.model_artifact import model_size
+
+    model = load_or_build_model(args.model)
+    images = np.random.default_rng(0).random((2,) + tuple(model.input_shape[1:]), dtype=np.float32)
+    reference = model(images, training=False).numpy()
+
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(os.getcwd(), "src"), env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "images.npy")
+        np.save(input_path, images)
+        paths = save_all(model, tmp_dir)
+
+        print(f"{'format':<12}{'size (MB)':>10}{'load (s)':>10}{'first predict (s)':>19}{'max diff':>10}")
+        for fmt in args.formats:
+            runs = []
+            for _ in range(args.repeat):
+                process = subprocess.run(
+                    [sys.executable, __file__, "--load-once", fmt, paths[fmt], input_path],
+                    capture_output=True, text=True, env=env
+                )
+                if process.returncode != 0:
+                    raise RuntimeError(f"Loading {fmt} failed:\n{process.stderr[-2000:]}")
+                runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+            difference = np.abs(np.array(runs[-1]["probabilities"]) - reference).max()
+            print(f"{fmt:<12}{model_size(paths[fmt]) / 2**20:>10.1f}"
+                  f"{statistics.median(run['load_seconds'] for run in runs):>10.3f}"
+                  f"{statistics.median(run['first_predict_seconds'] for run in runs):>19.3f}{difference:>10.2g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Scaling benchmark of the pre-fork server (`gunicorn -c gunicorn.conf.py app:app`).
+
+For every worker count the script starts the server, sends concurrent /predict requests for a fixed
+duration and reports the aggregate throughput together with the memory of each worker: RSS (which
+counts shared pages in full in every process) and PSS (which splits shared pages between the
+processes that map them). See `bench_prefork_memory.py` for the private memory every worker adds.
+
+The served model and backend are taken from `prediction` in `config/config.yaml`; compare e.g.
+`serving.prefork_backend: keras` with `serving.prefork_backend: tflite_int8`. Linux only (reads /proc).
+
+Usage:
+    python benchmarks/bench_multiprocess_serving.py --workers 1 2 4 --concurrency 16 --seconds 20
+"""
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+from PIL import Image
+
+from cnnClassifier.constants import CONFIG_FILE_PATH
+from cnnClassifier.utils.common import read_yaml
+
+
+def post(url: str, payload: bytes, timeout: float = 60):
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def worker_pids(master_pid: int) -> list:
+    pids = []
+    for children in glob.glob(f"/proc/{master_pid}/task/*/children"):
+        with open(children) as f:
+            pids.extend(int(pid) for pid in f.read().split())
+    return pids
+
+
+def memory_mb(pid: int) -> dict:
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0]) / 1024
+    return memory
+
+
+def wait_until_ready(base_url: str, workers: int, timeout: float = 300):
+    """
+    Waits until every worker has loaded the model (each answers /model/metrics with its pid).
+    """
+    seen, deadline = set(), time.monotonic() + timeout
+    while len(seen) < workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Only {len(seen)} of {workers} workers became ready")
+        try:
+            with urllib.request.urlopen(f"{base_url}/model/metrics", timeout=60) as response:
+                seen.add(json.loads(response.read())["pid"])
+        except OSError:
+            time.sleep(0.5)
+
+
+def run_load(url: str, payload: bytes, concurrency: int, seconds: float) -> float:
+    completed = [0] * concurrency
+    stop_at = time.monotonic() + seconds
+
+    def client(index):
+        while time.monotonic() < stop_at:
+            post(url, payload)
+            completed[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(completed) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    prediction = read_yaml(CONFIG_FILE_PATH).prediction
+    print(f"model={prediction.model} backend={prediction.serving.prefork_backend or prediction.backend}")
+
+    image = np.random.default_rng(0).integers(0, 255, size=(224, 224, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="JPEG")
+    payload = json.dumps({"image": base64.b64encode(buffer.getvalue()).decode()}).encode()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"{'workers':>8}{'images/sec':>12}{'RSS/worker (MB)':>18}{'PSS/worker (MB)':>18}{'PSS total (MB)':>16}")
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers), "app:app"],
+            env=dict(os.environ, BIND=f"127.0.0.1:{args.port}"),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_ready(base_url, workers)
+            throughput = run_load(f"{base_url}/predict", payload, args.concurrency, args.seconds)
+            memory = [memory_mb(pid) for pid in worker_pids(server.pid)]
+            rss = np.mean([m["rss"] for m in memory])
+            pss = np.mean([m["pss"] for m in memory])
+            print(f"{workers:>8}{throughput:>12.1f}{rss:>18.0f}{pss:>18.0f}{pss * len(memory):>16.0f}")
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
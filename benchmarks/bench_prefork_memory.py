@@ -0,0 +1,133 @@
+"""
+Per-worker memory benchmark of the serving backends, as loaded by the pre-fork server's workers.
+
+The model (`--model`, or an untrained VGG16 with the project's head if it does not exist) is saved as
+a model artifact (the `keras` backend) and converted to every TFLite variant in a temporary directory.
+For every backend, `--workers` fresh processes each load the model the way `ModelRegistry` does (with
+one intra-op thread), run one batch through it and stay alive while the script reads their memory
+from `/proc/<pid>/smaps_rollup`:
+
+- `RSS`: every resident page, shared ones counted in full in every process
+- `PSS`: shared pages split between the processes that map them
+- `private`: pages only this process maps (`Private_Clean` + `Private_Dirty`), i.e. what every
+  additional worker costs. Weights that are repacked at load time (e.g. by the XNNPACK delegate of
+  the TFLite interpreter) show up here even though the model file itself is memory-mapped.
+
+The memory of a process that has only imported TensorFlow is reported as `baseline`, so the cost of the
+model itself is the difference. Linux only (reads /proc).
+
+Usage (from the repository root, with the package installed or `src` on PYTHONPATH):
+    python benchmarks/bench_prefork_memory.py --workers 2
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+BACKENDS = ["baseline", "keras", "tflite_float32", "tflite_dynamic", "tflite_float16", "tflite_int8"]
+
+
+def serve_once(backend: str, path: str):
+    """
+    Runs in the worker process: loads the backend, predicts once, reports that it is ready and waits
+    until the script has read its memory (a line on stdin).
+    """
+    import tensorflow as tf
+    from cnnClassifier.components.model_artifact import load_model
+    from cnnClassifier.components.model_backends import configure_threads, load_backend
+
+    configure_threads(1, 1)
+    if backend == "keras":
+        model = load_model(path)
+    elif backend != "baseline":
+        model = load_backend(backend, path, num_threads=1)
+    if backend != "baseline":
+        height, width, channels = (224, 224, 3) if backend == "keras" else model.interpreter.get_input_details()[0]["shape"][1:]
+        model(np.zeros((1, height, width, channels), dtype=np.float32))
+    else:
+        tf.constant(0)
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+
+def memory_mb(pid: int) -> dict:
+    memory = {"private": 0.0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0]) / 1024
+            elif key in ("Private_Clean", "Private_Dirty"):
+                memory["private"] += int(value.split()[0]) / 1024
+    return memory
+
+
+def convert(model, backend: str) -> bytes:
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if backend != "tflite_float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if backend == "tflite_float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif backend == "tflite_int8":
+        rng = np.random.default_rng(0)
+        converter.representative_dataset = lambda: ([rng.random((1,) + tuple(model.input_shape[1:]), dtype=np.float32)] for _ in range(8))
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("model", "model"))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--serve-once", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_once:
+        serve_once(*args.serve_once)
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from bench_model_load import load_or_build_model
+    from cnnClassifier.components.model_artifact import ModelArtifactStore, model_size
+    from cnnClassifier.constants import EXPORT_FILES
+
+    model = load_or_build_model(args.model)
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(os.getcwd(), "src"), env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {"baseline": "", "keras": str(ModelArtifactStore(os.path.join(tmp_dir, "store")).save(model, name="model"))}
+        for backend in args.backends:
+            if backend.startswith("tflite"):
+                paths[backend] = os.path.join(tmp_dir, EXPORT_FILES[backend])
+                with open(paths[backend], "wb") as f:
+                    f.write(convert(model, backend))
+
+        print(f"{'backend':<16}{'file (MB)':>10}{'RSS/worker (MB)':>17}{'PSS/worker (MB)':>17}{'private/worker (MB)':>21}")
+        for backend in args.backends:
+            workers = [
+                subprocess.Popen([sys.executable, __file__, "--serve-once", backend, paths[backend]],
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+                for _ in range(args.workers)
+            ]
+            try:
+                for worker in workers:
+                    if worker.stdout.readline().strip() != "ready":
+                        raise RuntimeError(f"A {backend} worker failed to load the model")
+                memory = [memory_mb(worker.pid) for worker in workers]
+            finally:
+                for worker in workers:
+                    worker.communicate("\n")
+            size = model_size(paths[backend]) / 2**20 if paths[backend] else 0.0
+            print(f"{backend:<16}{size:>10.1f}{np.mean([m['rss'] for m in memory]):>17.0f}"
+                  f"{np.mean([m['pss'] for m in memory]):>17.0f}{np.mean([m['private'] for m in memory]):>21.0f}")
+
+
+if __name__ == "__main__":
+    main()
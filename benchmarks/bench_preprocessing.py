@@ -0,0 +1,193 @@
+"""
+Throughput benchmark of the shared `ImagePreprocessor` against the per-image Keras helpers.
+
+For every batch size the same encoded images (read into memory first, so disk I/O is not counted)
+are preprocessed into float32 model inputs in two ways:
+
+- `keras`: one image at a time with `tf.keras.utils.load_img(target_size=..., interpolation=...)`,
+  `img_to_array` and the normalization, then stacked, like the prediction pipeline and the image cache did
+- `preprocessor`: `ImagePreprocessor.__call__`, which decodes and resizes every image with native
+  TensorFlow ops and then normalizes the whole batch at once
+
+The script reports images/sec and the speedup per batch size, the decode/resize/normalize split of
+the preprocessor, the images/sec of the tf.data training pipeline reading the same files with
+`num_parallel_calls=AUTOTUNE` (which scales with the CPU cores, as its decode and resize are native ops
+that release the GIL), and the largest pixel difference between the preprocessor (serving) and the
+tf.data training pipeline, which is 0 as both run the same ops.
+
+Usage (from the repository root, with the package installed or `src` on PYTHONPATH):
+    python benchmarks/bench_preprocessing.py --images "artifacts/data_ingestion/Chest-CT-Scan-data/*/*" --limit 128
+    python benchmarks/bench_preprocessing.py --batch-sizes 1 8 32 128 --repeat 5
+"""
+import argparse
+import glob
+import io
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from cnnClassifier.components.preprocessing import PIL_INTERPOLATIONS, ImagePreprocessor
+from cnnClassifier.utils.common import read_yaml
+
+
+def synthetic_images(count: int, size: int) -> list:
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        pixels = rng.integers(0, 255, size=(size, size), dtype=np.uint8)
+        Image.fromarray(np.stack([pixels] * 3, axis=-1)).save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def load_images(pattern: str, limit: int, size: int) -> list:
+    paths = sorted(path for path in glob.glob(pattern) if path.lower().endswith((".jpg", ".jpeg", ".png")))[:limit]
+    if not paths:
+        print(f"No images match {pattern}, using {limit} synthetic {size}x{size} JPEGs")
+        return synthetic_images(limit, size)
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    return images
+
+
+def keras_batch(images: list, preprocessor: ImagePreprocessor):
+    import tensorflow as tf
+
+    arrays = []
+    for data in images:
+        image = tf.keras.utils.load_img(io.BytesIO(data), target_size=preprocessor.image_size,
+                                        interpolation=PIL_INTERPOLATIONS[preprocessor.interpolation])
+        arrays.append(preprocessor.normalize(tf.keras.utils.img_to_array(image)))
+    return np.stack(arrays)
+
+
+def time_batches(fn, images: list, batch_size: int, repeat: int) -> float:
+    """
+    Returns the median images/sec of `fn` over `repeat` passes through `images` in batches of `batch_size`.
+    """
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(images), batch_size):
+            fn(images[i:i + batch_size])
+        rates.append(len(images) / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def stage_split(preprocessor: ImagePreprocessor, images: list, batch_size: int) -> dict:
+    """
+    Returns the milliseconds per image spent decoding, resizing and normalizing.
+    """
+    totals = {"decode": 0.0, "resize": 0.0, "normalize": 0.0}
+    for i in range(0, len(images), batch_size):
+        start = time.perf_counter()
+        decoded = [preprocessor.decode(data) for data in images[i:i + batch_size]]
+        resized_at = time.perf_counter()
+        batch = preprocessor.resize(decoded)
+        normalized_at = time.perf_counter()
+        preprocessor.normalize(batch)
+        end = time.perf_counter()
+        totals["decode"] += resized_at - start
+        totals["resize"] += normalized_at - resized_at
+        totals["normalize"] += end - normalized_at
+    return {name: 1000.0 * seconds / len(images) for name, seconds in totals.items()}
+
+
+def write_files(images: list, directory: str) -> list:
+    paths = []
+    for index, data in enumerate(images):
+        path = os.path.join(directory, f"{index:05d}.jpg")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def training_rate(preprocessor: ImagePreprocessor, images: list, repeat: int) -> float:
+    """
+    Returns the median images/sec of the tf.data training pipeline (`ImageDatasetBuilder.build`, no
+    augmentation) reading `images` from files.
+    """
+    from cnnClassifier.components.data_pipeline import ImageDatasetBuilder
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_files(images, tmp_dir)
+        builder = ImageDatasetBuilder(preprocessor.image_size + [preprocessor.channels], batch_size=32,
+                                      preprocessor=preprocessor)
+        dataset = builder.build(paths, [0] * len(paths), 1, training=False)
+        rates = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            for _ in dataset:
+                pass
+            rates.append(len(paths) / (time.perf_counter() - start))
+    # the first pass traces the pipeline
+    return statistics.median(rates[1:])
+
+
+def training_parity(preprocessor: ImagePreprocessor, images: list) -> float:
+    """
+    Returns the largest absolute difference between the preprocessor and the tf.data training pipeline
+    (`ImageDatasetBuilder.build`, no augmentation) on the same images, in units of one pixel level.
+    """
+    from cnnClassifier.components.data_pipeline import ImageDatasetBuilder
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_files(images, tmp_dir)
+        builder = ImageDatasetBuilder(preprocessor.image_size + [preprocessor.channels], batch_size=len(paths),
+                                      preprocessor=preprocessor)
+        training, _ = next(iter(builder.build(paths, [0] * len(paths), 1, training=False)))
+        serving = preprocessor(paths)
+    shape = (1, preprocessor.channels)
+    level = np.abs(preprocessor.normalize(np.ones(shape, np.uint8)) - preprocessor.normalize(np.zeros(shape, np.uint8))).max()
+    return float(np.abs(training.numpy() - serving).max() / level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default="artifacts/data_ingestion/Chest-CT-Scan-data/*/*")
+    parser.add_argument("--limit", type=int, default=128)
+    parser.add_argument("--synthetic-size", type=int, default=512, help="side of the synthetic images")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--params", default="params.yaml", help="IMAGE_SIZE and PREPROCESSING are read from here")
+    args = parser.parse_args()
+
+    if os.path.exists(args.params):
+        params = read_yaml(Path(args.params))
+        preprocessor = ImagePreprocessor.from_params(params.IMAGE_SIZE, params.get("PREPROCESSING"))
+    else:
+        preprocessor = ImagePreprocessor([224, 224, 3])
+    print(f"Preprocessing: {preprocessor.spec()}")
+
+    images = load_images(args.images, args.limit, args.synthetic_size)
+    print(f"{len(images)} images, {sum(map(len, images)) / len(images) / 1024:.1f} KiB per image on average")
+
+    # warm-up: TensorFlow import and op kernels
+    keras_batch(images[:2], preprocessor)
+    preprocessor(images[:2])
+
+    print(f"{'batch size':>10}{'keras img/s':>14}{'preprocessor img/s':>20}{'speedup':>10}"
+          f"{'decode ms':>11}{'resize ms':>11}{'normalize ms':>14}")
+    for batch_size in args.batch_sizes:
+        keras_rate = time_batches(lambda batch: keras_batch(batch, preprocessor), images, batch_size, args.repeat)
+        rate = time_batches(preprocessor, images, batch_size, args.repeat)
+        split = stage_split(preprocessor, images, batch_size)
+        print(f"{batch_size:>10}{keras_rate:>14.1f}{rate:>20.1f}{rate / keras_rate:>9.2f}x"
+              f"{split['decode']:>11.2f}{split['resize']:>11.2f}{split['normalize']:>14.3f}")
+
+    print(f"tf.data training pipeline on {os.cpu_count()} cores: {training_rate(preprocessor, images, args.repeat):.1f} img/s")
+    difference = training_parity(preprocessor, images[:min(len(images), 32)])
+    print(f"Largest serving/training difference: {difference:.2f} pixel levels")
+
+
+if __name__ == "__main__":
+    main()
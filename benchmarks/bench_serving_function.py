@@ -0,0 +1,83 @@
+"""
+Microbenchmark of the per-call inference overhead: `model.predict()` vs. the graph-compiled serving
+function used by `PredictionPipeline` (optionally XLA-compiled).
+
+For every batch size the script reports the median and p99 latency per call and the time per image.
+Both paths are warmed up first, so tracing and compilation are not measured.
+
+Usage:
+    python benchmarks/bench_serving_function.py
+    python benchmarks/bench_serving_function.py --model model/model --batch-sizes 1 8 32 --iterations 50 --xla
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.model_registry import build_serving_function, warm_up
+from cnnClassifier.components.model_artifact import load_model
+from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+
+
+IMAGE_SIZE = [224, 224, 3]
+
+
+def load_or_build_model(path: str) -> tf.keras.Model:
+    if path and os.path.exists(path):
+        return load_model(path)
+    print(f"Model file {path} not found, benchmarking an untrained VGG16 with the same head")
+    base_model = tf.keras.applications.vgg16.VGG16(input_shape=IMAGE_SIZE, weights=None, include_top=False)
+    return PrepareBaseModel._prepare_full_model(model=base_model, classes=2, freeze_all=True, freeze_till=None)
+
+
+def time_calls(fn, batch, iterations: int) -> dict:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "ms_per_image": float(np.percentile(latencies_ms, 50)) / len(batch),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join("model", "model"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--xla", action="store_true", help="also benchmark the XLA-compiled serving function")
+    args = parser.parse_args()
+
+    model = load_or_build_model(args.model)
+    paths = {
+        "model.predict": lambda x: model.predict(x, verbose=0),
+        "tf.function": build_serving_function(model, IMAGE_SIZE),
+    }
+    if args.xla:
+        paths["tf.function+xla"] = build_serving_function(model, IMAGE_SIZE, jit_compile=True)
+
+    for name, fn in paths.items():
+        if name == "model.predict":
+            for batch_size in args.batch_sizes:
+                fn(np.zeros([batch_size] + IMAGE_SIZE, dtype="float32"))
+        else:
+            seconds = warm_up(fn, IMAGE_SIZE, args.batch_sizes)
+            print(f"{name}: warm-up (tracing/compilation) took {seconds:.2f}s")
+
+    rng = np.random.default_rng(0)
+    print(f"{'path':<18}{'batch':>6}{'p50 (ms)':>12}{'p99 (ms)':>12}{'ms/image':>12}")
+    for batch_size in args.batch_sizes:
+        batch = rng.uniform(0, 255, size=[batch_size] + IMAGE_SIZE).astype("float32")
+        for name, fn in paths.items():
+            result = time_calls(fn, batch, args.iterations)
+            print(f"{name:<18}{batch_size:>6}{result['p50_ms']:>12.2f}{result['p99_ms']:>12.2f}{result['ms_per_image']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Wire-size and server-CPU benchmark of the /predict upload formats:
+
+- `json`: one base64 encoded image per JSON body (`{"image": ...}`)
+- `raw`: one image per request as the raw `image/jpeg` (or png) body
+- `multipart`: `--batch` images per `multipart/form-data` request
+
+The script starts the server with one worker (`gunicorn -c gunicorn.conf.py app:app`, or
+`uvicorn asgi_app:app` with `--server asgi`), sends every image once per format and reports the
+request bytes per image, the client-side latency per request and the CPU time the server process
+spent per image (from /proc, so Linux only).
+
+Every format is sent once before it is measured. With the result cache enabled (the default,
+`prediction.result_cache`), that warm-up caches the results of all images. The measured pass then
+skips the forward pass and shows only the transport, parsing and decoding overhead of each
+format. Disable the cache to measure whole requests instead.
+
+Usage:
+    python benchmarks/bench_upload_formats.py --images "artifacts/data_ingestion/Chest-CT-Scan-data/*/*" --limit 64
+    python benchmarks/bench_upload_formats.py --server asgi --batch 8
+"""
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_images(count: int) -> list:
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, size=(512, 512, 3), dtype=np.uint8)).save(buffer, format="JPEG", quality=90)
+        images.append(("image.jpg", buffer.getvalue()))
+    return images
+
+
+def load_images(pattern: str, limit: int) -> list:
+    paths = sorted(path for path in glob.glob(pattern) if path.lower().endswith((".jpg", ".jpeg", ".png")))[:limit]
+    if not paths:
+        print(f"No images match {pattern}, using {limit} synthetic 512x512 JPEGs")
+        return synthetic_images(limit)
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def content_type_of(name: str) -> str:
+    return "image/png" if name.lower().endswith(".png") else "image/jpeg"
+
+
+def multipart_body(images: list) -> tuple:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, data in images:
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"images\"; filename=\"{name}\"\r\n"
+            f"Content-Type: {content_type_of(name)}\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_requests(fmt: str, images: list, batch: int) -> list:
+    """
+    Returns the (body, content type, number of images) of every request of one format.
+    """
+    if fmt == "json":
+        return [(json.dumps({"image": base64.b64encode(data).decode()}).encode(), "application/json", 1) for _, data in images]
+    if fmt == "raw":
+        return [(data, content_type_of(name), 1) for name, data in images]
+    return [multipart_body(images[i:i + batch]) + (len(images[i:i + batch]),) for i in range(0, len(images), batch)]
+
+
+def post(url: str, body: bytes, content_type: str) -> list:
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return json.loads(response.read())
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def wait_until_ready(base_url: str, timeout: float = 300) -> int:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{base_url}/model/metrics", timeout=60) as response:
+                return json.loads(response.read())["pid"]
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError("The server did not become ready")
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default="artifacts/data_ingestion/Chest-CT-Scan-data/*/*")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=8, help="images per multipart request")
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    raw_bytes = sum(len(data) for _, data in images)
+    print(f"{len(images)} images, {raw_bytes / len(images) / 1024:.1f} KiB per image on average")
+
+    if args.server == "wsgi":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", "1", "app:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi_app:app", "--host", "127.0.0.1", "--port", str(args.port)]
+    server = subprocess.Popen(command, env=dict(os.environ, BIND=f"127.0.0.1:{args.port}"),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        pid = wait_until_ready(base_url)
+        url = f"{base_url}/predict"
+        print(f"{'format':<12}{'requests':>9}{'bytes/image':>13}{'overhead':>10}{'ms/request':>12}{'server CPU ms/image':>21}")
+        for fmt in ("json", "raw", "multipart"):
+            requests = build_requests(fmt, images, args.batch)
+            for body, content_type, _ in requests:
+                post(url, body, content_type)
+
+            cpu_start, start = cpu_seconds(pid), time.perf_counter()
+            predicted = 0
+            for body, content_type, count in requests:
+                result = post(url, body, content_type)
+                if len(result) != count:
+                    raise RuntimeError(f"Expected {count} predictions, got {len(result)}")
+                predicted += count
+            elapsed, cpu = time.perf_counter() - start, cpu_seconds(pid) - cpu_start
+
+            wire_bytes = sum(len(body) for body, _, _ in requests)
+            print(f"{fmt:<12}{len(requests):>9}{wire_bytes / predicted:>13.0f}{wire_bytes / raw_bytes - 1:>10.1%}"
+                  f"{1000.0 * elapsed / len(requests):>12.2f}{1000.0 * cpu / predicted:>21.2f}")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Pre-fork production server for the prediction app:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app module (Flask and the pipeline code) and TensorFlow, which the app itself only imports
+when the model is loaded, are imported once in the master and shared copy-on-write by the workers.
+TensorFlow's runtime does not survive a fork, so every worker loads the model itself after the
+fork, with its share of the CPU cores as thread budget. The workers serve
+`prediction.serving.prefork_backend` (the Keras model by default). Each worker holds its own copy
+of the weights with every backend, as the TFLite interpreter repacks the memory-mapped weights into
+private memory; `benchmarks/bench_prefork_memory.py` measures the memory per worker.
+"""
+import os
+
+from cnnClassifier.components.performance import configure_onednn
+from cnnClassifier.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from cnnClassifier.utils.common import read_yaml
+
+
+serving = read_yaml(CONFIG_FILE_PATH).prediction.serving
+# before the app (and TensorFlow) is preloaded
+configure_onednn(read_yaml(PARAMS_FILE_PATH).PERFORMANCE.ONEDNN)
+
+bind = os.environ.get("BIND", "0.0.0.0:8080")
+workers = serving.workers
+worker_class = "gthread"
+threads = serving.worker_threads
+preload_app = True
+# loading and warming up the model can take a while on the first request
+timeout = 120
+
+
+def thread_budget():
+    """
+    Returns the (intra-op, inter-op) threads of one worker: the configured values, or an even
+    share of the CPU cores when they are 0.
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    intra_op_threads = serving.intra_op_threads or max(1, cores // workers)
+    inter_op_threads = serving.inter_op_threads or min(2, intra_op_threads)
+    return intra_op_threads, inter_op_threads
+
+
+def when_ready(server):
+    # in the master, before the workers are forked
+    import tensorflow  # noqa: F401
+
+
+def post_fork(server, worker):
+    from cnnClassifier.components.model_backends import configure_threads
+
+    intra_op_threads, inter_op_threads = thread_budget()
+    configure_threads(intra_op_threads, inter_op_threads)
+    server.log.info(f"Worker {worker.pid}: intra_op_threads={intra_op_threads}, inter_op_threads={inter_op_threads}")
+
+
+def post_worker_init(worker):
+    # load and warm up the model before the worker accepts requests
+    import app
+
+    app.get_client_app(prefork=True)
@@ -0,0 +1,102 @@
+"""
+Runs the training stage as a local multi-worker cluster, one process per worker:
+
+    python launch_multi_worker.py --workers 2
+
+Every worker gets a `TF_CONFIG` describing the cluster on localhost and an even share of the CPU
+cores, and trains with `MultiWorkerMirroredStrategy` (set `DISTRIBUTION.STRATEGY` in `params.yaml`
+to `multi_worker` or `auto`). The data and the base model must already be prepared (`python main.py`
+or `dvc repro prepare_base_model`). Worker 0 is the chief and saves the trained model; the log of
+every worker is written to `artifacts/training/workers/`. On several hosts, set `TF_CONFIG` on every
+host instead and run the training stage there.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.constants import PARAMS_FILE_PATH
+from cnnClassifier.utils.common import read_yaml
+
+
+TRAINING_STAGE = "src/cnnClassifier/pipeline/stage_03_model_trainer.py"
+LOG_DIR = "artifacts/training/workers"
+
+
+def free_ports(count: int) -> list:
+    sockets = [socket.socket() for _ in range(count)]
+    for s in sockets:
+        s.bind(("localhost", 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def launch(workers: int, command: list) -> int:
+    """
+    Starts `workers` processes running `command` and waits for them. If one fails, the others are
+    stopped, since they would wait for it forever in the next all-reduce.
+
+    Returns:
+        int: 0 if every worker succeeded, otherwise the exit code of the first failed worker.
+    """
+    cluster = {"worker": [f"localhost:{port}" for port in free_ports(workers)]}
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    threads = max(1, cores // workers)
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    processes = []
+    for index in range(workers):
+        env = dict(
+            os.environ,
+            TF_CONFIG=json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}),
+            TF_NUM_INTRAOP_THREADS=str(threads),
+            TF_NUM_INTEROP_THREADS=str(min(2, threads)),
+        )
+        log_path = os.path.join(LOG_DIR, f"worker_{index}.log")
+        with open(log_path, "wb") as log:
+            processes.append(subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT))
+        logger.info(f"Started worker {index} (pid {processes[-1].pid}), log at: {log_path}")
+
+    exit_code = 0
+    while True:
+        # poll every worker, not only up to the first running one, or later failures go unnoticed
+        running = [process for process in processes if process.poll() is None]
+        failed = [process for process in processes if process.returncode not in (None, 0)]
+        if not failed and not running:
+            break
+        if failed:
+            exit_code = failed[0].returncode
+            logger.error(f"Worker pid {failed[0].pid} failed with exit code {exit_code}, stopping the others")
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+            break
+        time.sleep(1)
+
+    for process in processes:
+        process.wait()
+        if not exit_code and process.returncode:
+            exit_code = process.returncode
+    return exit_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the training stage as a local multi-worker cluster.")
+    parser.add_argument("--workers", type=int, default=2, help="The number of worker processes")
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help=f"The command every worker runs (default: python {TRAINING_STAGE})")
+    args = parser.parse_args()
+    configure_logging()
+
+    strategy = read_yaml(PARAMS_FILE_PATH).DISTRIBUTION.STRATEGY
+    if strategy not in ("multi_worker", "auto"):
+        parser.error(f"DISTRIBUTION.STRATEGY is {strategy} in {PARAMS_FILE_PATH}, set it to multi_worker or auto")
+
+    command = [arg for arg in args.command if arg != "--"] or [sys.executable, TRAINING_STAGE]
+    raise SystemExit(launch(args.workers, command))
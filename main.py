@@ -1,28 +1,191 @@
-from cnnClassifier import logger
-from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
-from cnnClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
-from cnnClassifier.pipeline.stage_03_model_trainer import ModelTrainingPipeline
-from cnnClassifier.pipeline.stage_04_model_evaluation import EvaluationPipeline
-
-
-# MAIN PIPELINE
-
-try:
-    # Run data ingestion
-    data_ingestion_pipeline = DataIngestionTrainingPipeline()
-    data_ingestion_pipeline.main()
-
-    # Run base model prep
-    prepare_base_model_pipeline = PrepareBaseModelTrainingPipeline()
-    prepare_base_model_pipeline.main()
-
-    # Run model training
-    model_training_pipeline = ModelTrainingPipeline()
-    model_training_pipeline.main()
-
-    # Run model evaluation
-    model_evaluation_pipeline = EvaluationPipeline()
-    model_evaluation_pipeline.main()
-    
-except Exception as e:
-    logger.exception(f"Exception raised when running main pipeline: {e}")
\ No newline at end of file
+import argparse
+import time
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.performance import apply_performance_profile
+from cnnClassifier.components.profiling import get_metrics
+from cnnClassifier.components.stage_cache import StageCache, StageSpec, module_deps
+from cnnClassifier.components.training_jobs import JobStatus
+from cnnClassifier.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from cnnClassifier.utils.common import read_yaml
+
+
+STATE_PATH = "artifacts/pipeline_state.json"
+
+
+def stage_specs(config) -> list:
+    """
+    Declares every stage of the training pipeline with its inputs and outputs, in execution order.
+    The source code a stage depends on is derived from the imports of its stage module (see `module_deps`).
+
+    The stage modules (and with them TensorFlow) are imported here rather than at the top of this
+    script, so `--help` is instant and `main` can set the oneDNN switch before TensorFlow loads.
+    """
+    from cnnClassifier.components.preprocessing import preprocessing_path
+    from cnnClassifier.pipeline import stage_01_data_ingestion, stage_02_prepare_base_model, stage_03_model_trainer, \
+                                       stage_04_model_evaluation, stage_05_model_export
+
+    return [
+        # Run data ingestion
+        StageSpec(
+            name=stage_01_data_ingestion.STAGE_NAME,
+            key="data_ingestion",
+            pipeline=stage_01_data_ingestion.DataIngestionTrainingPipeline,
+            config_sections=["data_ingestion", "training.training_data"],
+            params=["IMAGE_SIZE", "IMAGE_CACHE", "PREPROCESSING"],
+            deps=module_deps(stage_01_data_ingestion.__name__),
+            outs=[config.training.training_data],
+        ),
+        # Run base model prep
+        StageSpec(
+            name=stage_02_prepare_base_model.STAGE_NAME,
+            key="prepare_base_model",
+            pipeline=stage_02_prepare_base_model.PrepareBaseModelTrainingPipeline,
+            config_sections=["prepare_base_model", "model_artifacts"],
+            params=["IMAGE_SIZE", "INCLUDE_TOP", "CLASSES", "WEIGHTS", "LEARNING_RATE", "FREEZE_TILL"],
+            deps=module_deps(stage_02_prepare_base_model.__name__),
+            outs=[config.prepare_base_model.updated_base_model_path],
+        ),
+        # Run model training
+        StageSpec(
+            name=stage_03_model_trainer.STAGE_NAME,
+            key="training",
+            pipeline=stage_03_model_trainer.ModelTrainingPipeline,
+            config_sections=["training", "prepare_base_model.updated_base_model_path", "model_artifacts",
+                             "data_ingestion.image_cache_dir", "data_ingestion.split_path",
+                             "evaluation.predictions_path", "profiling.root_dir", "profiling.training_profile",
+                             "profiling.training_profile_step"],
+            params=["IMAGE_SIZE", "EPOCHS", "BATCH_SIZE", "AUGMENTATION", "LEARNING_RATE", "DATA_PIPELINE",
+                    "DATA_CACHE", "IMAGE_CACHE", "BOTTLENECK_CACHE", "SEED", "VALIDATION_SPLIT", "PERFORMANCE",
+                    "DISTRIBUTION", "PREPROCESSING"],
+            deps=module_deps(stage_03_model_trainer.__name__)
+                 + [config.training.training_data, config.prepare_base_model.updated_base_model_path],
+            outs=[config.training.trained_model_path, config.training.trained_model_path_for_tracking,
+                  preprocessing_path(config.training.trained_model_path),
+                  preprocessing_path(config.training.trained_model_path_for_tracking)],
+        ),
+        # Run model evaluation
+        StageSpec(
+            name=stage_04_model_evaluation.STAGE_NAME,
+            key="evaluation",
+            pipeline=stage_04_model_evaluation.EvaluationPipeline,
+            config_sections=["evaluation", "training.trained_model_path", "training.training_data",
+                             "data_ingestion.image_cache_dir", "data_ingestion.split_path"],
+            params=["IMAGE_SIZE", "BATCH_SIZE", "VALIDATION_SPLIT", "PREPROCESSING", "IMAGE_CACHE"],
+            deps=module_deps(stage_04_model_evaluation.__name__) + [config.training.training_data, config.training.trained_model_path],
+            outs=["scores.json", config.evaluation.report_path],
+        ),
+        # Run model export
+        StageSpec(
+            name=stage_05_model_export.STAGE_NAME,
+            key="model_export",
+            pipeline=stage_05_model_export.ModelExportPipeline,
+            config_sections=["model_export", "training.trained_model_path", "training.training_data",
+                             "data_ingestion.split_path"],
+            params=["IMAGE_SIZE", "BATCH_SIZE", "SEED", "VALIDATION_SPLIT", "PREPROCESSING"],
+            deps=module_deps(stage_05_model_export.__name__) + [config.training.training_data, config.training.trained_model_path],
+            outs=[config.model_export.report_path],
+        ),
+    ]
+
+
+def log_summary(timings: list):
+    """
+    Logs one line per stage with its outcome (ran, skipped or failed) and duration.
+    """
+    lines = [f"{'stage':<32}{'status':<10}{'seconds':>10}"]
+    lines += [f"{name:<32}{status:<10}{seconds:>10.1f}" for name, status, seconds in timings]
+    lines.append(f"{'total':<32}{'':<10}{sum(seconds for _, _, seconds in timings):>10.1f}")
+    logger.info("Pipeline summary:\n" + "\n".join(lines))
+
+
+def main(status_file: str = None, force: bool = False, from_stage: str = None):
+    """
+    Runs the stages of the training pipeline in order, skipping those whose inputs are unchanged.
+
+    A stage is skipped when its config sections, params and dependencies (source code and upstream
+    artifacts) hash to the same value as at its last successful run and its outputs still exist.
+
+    Args:
+        status_file (str, optional): The status file of a background training job (see
+            `TrainingJobManager`), updated with the current stage, progress and per-stage timing.
+        force (bool, optional): Run every stage, even if it is up to date. Defaults to False.
+        from_stage (str, optional): Run this stage (its key as in `dvc.yaml`, e.g. "training") and
+            every stage after it, even if they are up to date.
+    """
+    config = read_yaml(CONFIG_FILE_PATH)
+    params = read_yaml(PARAMS_FILE_PATH)
+    # before TensorFlow is imported (oneDNN switch) and runs its first op (thread counts), in any stage
+    apply_performance_profile(
+        mixed_precision=params.PERFORMANCE.MIXED_PRECISION,
+        intra_op_threads=params.PERFORMANCE.INTRA_OP_THREADS,
+        inter_op_threads=params.PERFORMANCE.INTER_OP_THREADS,
+        onednn=params.PERFORMANCE.ONEDNN
+    )
+    # the logical devices of the mirrored strategy, before the first stage runs a TensorFlow op
+    from cnnClassifier.components.distribution import configure_devices
+    configure_devices(params.DISTRIBUTION.STRATEGY, params.DISTRIBUTION.CPU_DEVICES)
+    specs = stage_specs(config)
+    cache = StageCache(STATE_PATH)
+
+    forced_from = 0 if force else len(specs)
+    if from_stage:
+        matches = [i for i, spec in enumerate(specs) if from_stage in (spec.key, spec.name)]
+        if not matches:
+            raise ValueError(f"Unknown stage {from_stage}, expected one of {[spec.key for spec in specs]}")
+        forced_from = min(forced_from, matches[0])
+
+    status = JobStatus(status_file, [spec.name for spec in specs]) if status_file else None
+    timings = []
+    spec = None
+    try:
+        for index, spec in enumerate(specs):
+            if status:
+                status.stage_started(spec.name)
+            start = time.perf_counter()
+            input_hash = cache.input_hash(spec, config, params)
+
+            if index < forced_from and cache.is_up_to_date(spec, input_hash):
+                logger.info(f"{spec.name} is up to date, skipping")
+                timings.append((spec.name, "skipped", time.perf_counter() - start))
+                if status:
+                    status.stage_finished(spec.name, state="skipped")
+                continue
+
+            with get_metrics().span(spec.key, metric="pipeline_stage_duration_seconds", label="stage"):
+                spec.pipeline().main()
+            seconds = time.perf_counter() - start
+            cache.record(spec, input_hash, seconds)
+            timings.append((spec.name, "ran", seconds))
+            if status:
+                status.stage_finished(spec.name)
+
+    except Exception as e:
+        logger.exception(f"Exception raised when running main pipeline: {e}")
+        timings.append((spec.name, "failed", time.perf_counter() - start))
+        log_summary(timings)
+        if status:
+            status.stage_finished(spec.name, state="failed")
+            status.finish(error=f"{spec.name}: {e}")
+        raise e
+
+    finally:
+        # stage and training step histograms, for the node exporter's textfile collector
+        get_metrics().write_textfile(config.profiling.metrics_path)
+
+    log_summary(timings)
+    if status:
+        status.finish()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the training pipeline, skipping up-to-date stages.")
+    parser.add_argument("--force", action="store_true", help="run every stage even if it is up to date")
+    parser.add_argument("--from-stage", default=None, help="run this stage and all later ones: data_ingestion, prepare_base_model, training, evaluation or model_export")
+    parser.add_argument("--status-file", default=None, help="status file of a background training job")
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        main(status_file=args.status_file, force=args.force, from_stage=args.from_stage)
+    except Exception:
+        raise SystemExit(1)
@@ -5,21 +5,44 @@ import logging
 
 logging_str = "[%(asctime)s: %(levelname)s: %(module)s: %(message)s]"
 
-log_dir = "logs"
-current_datetime = datetime.now()
-formatted_datetime = current_datetime.strftime("%Y-%m-%d_%H-%M-%S")
-log_filepath = os.path.join(log_dir, f"run-logs-{formatted_datetime}.log")
-os.makedirs(log_dir, exist_ok=True)
+logger = logging.getLogger("cnnClassifierLogger")
 
+_log_filepath = None
+_configured = False
 
-logging.basicConfig(
-    level=logging.INFO,
-    format=logging_str,
 
-    handlers=[
-        logging.FileHandler(log_filepath),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+def configure_logging(log_dir: str = "logs", level: int = logging.INFO, log_to_file: bool = True) -> str:
+    """
+    Configures logging for an entry point (main.py, the serving apps, the pipeline stage scripts).
 
-logger = logging.getLogger("cnnClassifierLogger")
+    Logs go to stdout and, with `log_to_file`, to a timestamped file in `log_dir`. Importing the
+    package has no side effects, so this is called explicitly by every entry point; later calls
+    return the log file of the first one without adding handlers.
+
+    Args:
+        log_dir (str, optional): The directory of the log file. Defaults to "logs".
+        level (int, optional): The log level. Defaults to logging.INFO.
+        log_to_file (bool, optional): Whether to also log to a file. Defaults to True.
+
+    Returns:
+        str: The path of the log file, or None if logging to a file is disabled.
+    """
+    global _log_filepath, _configured
+    if _configured:
+        return _log_filepath
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_to_file:
+        formatted_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        _log_filepath = os.path.join(log_dir, f"run-logs-{formatted_datetime}.log")
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(logging.FileHandler(_log_filepath))
+
+    logging.basicConfig(
+        level=level,
+        format=logging_str,
+
+        handlers=handlers
+    )
+    _configured = True
+    return _log_filepath
@@ -0,0 +1,158 @@
+import glob
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import load_model
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from cnnClassifier.entity.config_entity import BatchPredictionConfig
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
+
+class BatchPrediction:
+
+    def __init__(self, config: BatchPredictionConfig):
+        self.config = config
+        # the preprocessing the model was trained with, saved next to it
+        self.preprocessor = ImagePreprocessor.for_model(
+            self.config.model_path,
+            default=ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
+        )
+
+
+    @staticmethod
+    def resolve_inputs(source: str) -> list:
+        """
+        Resolves the images to score from a directory, a glob pattern or a manifest file.
+
+        Args:
+            source (str): One of
+                - a directory, scanned recursively for image files,
+                - a glob pattern such as `scans/**/*.png`,
+                - a manifest file: a `.csv` with a `path` column or a `.txt` file with one path per line.
+                  Relative paths in a manifest are resolved against the manifest's directory.
+
+        Returns:
+            list: The sorted image paths.
+
+        Raises:
+            FileNotFoundError: If no image is found for `source`.
+        """
+        if os.path.isdir(source):
+            paths = [
+                os.path.join(root, name)
+                for root, _, files in os.walk(source)
+                for name in files
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+        elif os.path.isfile(source) and source.lower().endswith((".csv", ".txt")):
+            if source.lower().endswith(".csv"):
+                paths = pd.read_csv(source)["path"].astype(str).tolist()
+            else:
+                with open(source) as f:
+                    paths = [line.strip() for line in f if line.strip()]
+            base_dir = os.path.dirname(source)
+            paths = [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+        else:
+            paths = [path for path in glob.glob(source, recursive=True) if path.lower().endswith(IMAGE_EXTENSIONS)]
+
+        if not paths:
+            raise FileNotFoundError(f"No images found for {source}")
+
+        return sorted(paths)
+
+
+    def _decode(self, path: tf.Tensor):
+        """
+        Reads, decodes and resizes one image inside the tf.data pipeline.
+        """
+        return path, self.preprocessor.load_tf(path)
+
+
+    def build_dataset(self, paths: list, batch_size: int) -> tf.data.Dataset:
+        """
+        Builds a prefetching tf.data pipeline that reads and decodes the images in parallel.
+
+        The image path travels with every element, so files that fail to decode are skipped
+        (and logged by tf.data) without misaligning the remaining predictions. The uint8 images are
+        normalized once per batch.
+
+        Args:
+            paths (list): The image paths.
+            batch_size (int): The number of images per batch.
+
+        Returns:
+            tf.data.Dataset: Batches of (paths, images).
+        """
+        return (
+            tf.data.Dataset.from_tensor_slices(paths)
+            .map(self._decode, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+            .ignore_errors(log_warning=True)
+            .batch(batch_size)
+            .map(lambda paths, images: (paths, self.preprocessor.normalize(images)), num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE)
+        )
+
+
+    def predict(self, source: str, output_path: Path = None, batch_size: int = None) -> dict:
+        """
+        Scores every image of `source` and writes the class probabilities to a CSV or Parquet file.
+
+        The output has one row per image with its path, one `prob_<class name>` column per class
+        and the predicted class name. The format is chosen from the output file suffix
+        (`.parquet` requires `pyarrow` or `fastparquet`).
+
+        Args:
+            source (str): A directory, glob pattern or manifest file, see `resolve_inputs`.
+            output_path (Path, optional): The output file. Defaults to the configured `output_path`.
+            batch_size (int, optional): The number of images per forward pass. Defaults to the configured `batch_size`.
+
+        Returns:
+            dict: A summary with the number of images, elapsed seconds, throughput in images/sec and the output path.
+        """
+        output_path = Path(output_path or self.config.output_path)
+        batch_size = batch_size or self.config.batch_size
+
+        paths = self.resolve_inputs(source)
+        logger.info(f"Scoring {len(paths)} images from {source} in batches of {batch_size}")
+
+        model = load_model(self.config.model_path)
+        dataset = self.build_dataset(paths, batch_size)
+
+        start = time.perf_counter()
+        scored_paths, probabilities = [], []
+        for batch_paths, images in dataset:
+            probabilities.extend(model.predict_on_batch(images))
+            scored_paths.extend(path.decode() for path in batch_paths.numpy())
+        elapsed = time.perf_counter() - start
+
+        results = pd.DataFrame(probabilities, columns=[f"prob_{name}" for name in self.config.class_names])
+        results.insert(0, "path", scored_paths)
+        results["prediction"] = [self.config.class_names[i] for i in results.iloc[:, 1:].to_numpy().argmax(axis=1)]
+
+        os.makedirs(output_path.parent, exist_ok=True)
+        if output_path.suffix == ".parquet":
+            results.to_parquet(output_path, index=False)
+        else:
+            results.to_csv(output_path, index=False)
+
+        skipped = len(paths) - len(scored_paths)
+        if skipped:
+            logger.warning(f"Skipped {skipped} images that could not be decoded")
+
+        summary = {
+            "images": len(scored_paths),
+            "skipped": skipped,
+            "seconds": elapsed,
+            "images_per_sec": len(scored_paths) / elapsed if elapsed > 0 else 0.0,
+            "output_path": str(output_path),
+        }
+        logger.info(f"Scored {summary['images']} images in {elapsed:.1f}s ({summary['images_per_sec']:.1f} images/sec), "
+                    f"predictions saved at: {output_path}")
+        return summary
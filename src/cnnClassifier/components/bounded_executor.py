@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while `max_queue` jobs are already waiting."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a job did not finish before its deadline."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking work (image decoding, inference) from asyncio code on a fixed pool of threads,
+    with admission control.
+
+    At most `max_queue` jobs may wait for a free thread; further submissions fail immediately with
+    `QueueFullError` instead of growing the queue (and the latency of every queued request) without
+    bound. Every job has a deadline: a job still queued at its deadline is cancelled and never runs,
+    and the caller stops waiting for a running job once the deadline passes (`DeadlineExceededError`).
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bounded-executor")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected_queue_full": 0,
+            "deadline_exceeded": 0,
+            "max_queue_depth": 0,
+        }
+
+
+    def _run(self, deadline: float, fn, args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            if time.monotonic() >= deadline:
+                raise DeadlineExceededError("Deadline exceeded while queued")
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+
+    async def run(self, fn, *args, timeout: float):
+        """
+        Runs `fn(*args)` on the pool and waits for its result for at most `timeout` seconds.
+
+        Raises:
+            QueueFullError: If `max_queue` jobs are already waiting.
+            DeadlineExceededError: If the job did not finish within `timeout` seconds.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._metrics["rejected_queue_full"] += 1
+                raise QueueFullError(f"{self._queued} requests are already queued")
+            self._queued += 1
+            self._metrics["submitted"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queued)
+
+        deadline = time.monotonic() + timeout
+        future = self._executor.submit(self._run, deadline, fn, args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except (asyncio.TimeoutError, DeadlineExceededError):
+            # a job that has not started yet is dropped from the queue
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            with self._lock:
+                self._metrics["deadline_exceeded"] += 1
+            raise DeadlineExceededError(f"Request did not complete within {timeout:.3f}s")
+        except Exception:
+            with self._lock:
+                self._metrics["failed"] += 1
+            raise
+
+        with self._lock:
+            self._metrics["completed"] += 1
+        return result
+
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of the executor metrics: current queue depth and running jobs, the
+        configured limits, and counters of submitted, completed, failed, rejected and timed out jobs.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics.update({
+                "queue_depth": self._queued,
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+            })
+        return metrics
+
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import model_fingerprint
+
+
+STATE_FILE = "state.json"
+
+
+class TrainingCheckpoints:
+    """
+    Periodic training checkpoints under `checkpoint_dir`, one directory per saved epoch.
+
+    A checkpoint holds the model weights and optimizer state (a `tf.train.Checkpoint`) and a
+    `state.json` with the completed epochs, the number of training elements consumed so far (the
+    position of the input pipeline) and the hash of the training configuration. It is written to a
+    temporary directory that is renamed once complete, with the state file written last, so an
+    interrupted write never leaves a checkpoint that looks valid. Only checkpoints with the current
+    configuration hash are resumed from, and only the newest `max_to_keep` are kept.
+    """
+
+    def __init__(self, checkpoint_dir: Path, config_hash: str, max_to_keep: int, is_chief: bool = True):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.config_hash = config_hash
+        self.max_to_keep = max_to_keep
+        self.is_chief = is_chief
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+
+    @staticmethod
+    def make_config_hash(config, *extra) -> str:
+        """
+        Hashes the parameters of a training config (`params_*`), its base model (see `model_fingerprint`) and any
+        extra values (e.g. a fingerprint of the training files). Paths of outputs do not count, and neither does
+        the number of epochs: the epochs trained so far do not depend on it, so a longer run continues from the
+        checkpoints of a shorter one (e.g. a trial promoted by successive halving).
+        """
+        values = {
+            key: value for key, value in asdict(config).items()
+            if key.startswith("params_") and key != "params_epochs"
+        }
+        sha256 = hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode())
+        sha256.update(model_fingerprint(config.updated_base_model_path).encode())
+        for value in extra:
+            sha256.update(f"|{value}".encode())
+        return sha256.hexdigest()[:16]
+
+
+    def _checkpoints(self) -> list:
+        """
+        Returns the (epoch, path, state) of every complete checkpoint, oldest first.
+        """
+        checkpoints = []
+        for path in self.checkpoint_dir.glob("epoch-*"):
+            state_path = path / STATE_FILE
+            if not state_path.exists():
+                continue
+            try:
+                with open(state_path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            checkpoints.append((state["epoch"], path, state))
+        return sorted(checkpoints, key=lambda checkpoint: checkpoint[0])
+
+
+    def latest(self, max_epoch: int = None):
+        """
+        Returns the state of the newest checkpoint written with the current config hash, or None. With
+        `max_epoch`, checkpoints after that epoch (of a longer run) are ignored.
+        """
+        for epoch, path, state in reversed(self._checkpoints()):
+            if max_epoch is not None and epoch > max_epoch:
+                continue
+            if state["config_hash"] == self.config_hash:
+                return dict(state, path=str(path))
+        return None
+
+
+    def save(self, model: tf.keras.Model, optimizer, epoch: int, elements_consumed: int):
+        """
+        Writes a checkpoint after `epoch` completed epochs and removes the ones beyond `max_to_keep`.
+
+        In multi-worker training every worker has to take part in writing the variables; the workers
+        other than the chief write to a temporary directory that is removed right away.
+        """
+        checkpoint = tf.train.Checkpoint(model=model, optimizer=optimizer)
+        if not self.is_chief:
+            tmp_dir = tempfile.mkdtemp(prefix="checkpoint-")
+            checkpoint.write(os.path.join(tmp_dir, "ckpt"))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        start = time.perf_counter()
+        name = f"epoch-{epoch:04d}"
+        tmp_dir = self.checkpoint_dir / f".{name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        checkpoint.write(str(tmp_dir / "ckpt"))
+        with open(tmp_dir / STATE_FILE, "w") as f:
+            json.dump({
+                "epoch": epoch,
+                "elements_consumed": elements_consumed,
+                "config_hash": self.config_hash,
+                "created": time.time(),
+            }, f, indent=4)
+
+        final_dir = self.checkpoint_dir / name
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+        logger.info(f"Saved checkpoint after epoch {epoch} in {time.perf_counter() - start:.2f}s at: {final_dir}")
+        self._prune()
+
+
+    def _prune(self):
+        """
+        Removes checkpoints of other configurations and all but the newest `max_to_keep`.
+        """
+        checkpoints = self._checkpoints()
+        current = [path for _, path, state in checkpoints if state["config_hash"] == self.config_hash]
+        stale = [path for _, path, state in checkpoints if state["config_hash"] != self.config_hash]
+        for path in stale + current[:-self.max_to_keep]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+    def restore(self, state: dict, model: tf.keras.Model, optimizer):
+        """
+        Restores the model weights and optimizer state of the checkpoint returned by `latest`.
+        """
+        optimizer.build(model.trainable_variables)
+        checkpoint = tf.train.Checkpoint(model=model, optimizer=optimizer)
+        checkpoint.read(os.path.join(state["path"], "ckpt")).assert_existing_objects_matched()
+        logger.info(f"Resumed from the checkpoint after epoch {state['epoch']} at: {state['path']}")
+
+
+class CheckpointCallback(tf.keras.callbacks.Callback):
+    """
+    Saves a checkpoint of `model` and the optimizer of the model being fit every `every_epochs` epochs
+    and after the last one.
+    """
+
+    def __init__(self, checkpoints: TrainingCheckpoints, model: tf.keras.Model, every_epochs: int, epochs: int, elements_per_epoch: int):
+        super().__init__()
+        self.checkpoints = checkpoints
+        self.checkpoint_model = model
+        self.every_epochs = max(1, every_epochs)
+        self.epochs = epochs
+        self.elements_per_epoch = elements_per_epoch
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        completed = epoch + 1
+        if completed % self.every_epochs == 0 or completed == self.epochs:
+            self.checkpoints.save(self.checkpoint_model, self.model.optimizer, completed, completed * self.elements_per_epoch)
@@ -1,7 +1,19 @@
 import gdown
+import json
+import os
+import shutil
+import time
+import urllib.request
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote, urlparse
 
 from cnnClassifier import logger
+from cnnClassifier.components.image_cache import ImageCache
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from cnnClassifier.components.model_artifact import model_fingerprint
 from cnnClassifier.utils.common import create_directories
 from cnnClassifier.entity.config_entity import DataIngestionConfig
 
@@ -10,8 +22,90 @@ class DataIngestion:
 
     def __init__(self, config: DataIngestionConfig):
         self.config = config
+        self.manifest_path = Path(self.config.root_dir) / "ingestion_manifest.json"
+
+
+    def _read_manifest(self) -> dict:
+        """
+        Reads the ingestion manifest (archive checksum and extracted members), or returns an empty one.
+        """
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+
+    def _write_manifest(self, manifest: dict):
+        """
+        Writes the ingestion manifest atomically.
+        """
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+
+    def _archive_is_valid(self) -> bool:
+        """
+        Checks whether the local archive is complete: it must match the configured `source_sha256`
+        if one is set, otherwise the checksum recorded in the manifest after the last download from
+        the same source URL.
+        """
+        zip_download_dir = self.config.local_data_file
+        if not os.path.exists(zip_download_dir):
+            return False
+
+        manifest = self._read_manifest()
+        if self.config.source_sha256:
+            expected = self.config.source_sha256
+        elif manifest.get("source_url") == self.config.source_url:
+            expected = manifest.get("archive_sha256")
+        else:
+            expected = None
+        if not expected:
+            return False
+        return model_fingerprint(Path(zip_download_dir)) == expected
+
+
+    @staticmethod
+    def _download_http(url: str, output: str):
+        """
+        Downloads `url` over HTTP(S), resuming a previous partial download from `output + ".part"`.
+        """
+        part_path = output + ".part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request = urllib.request.Request(url, headers={"Range": f"bytes={offset}-"} if offset else {})
+
+        with urllib.request.urlopen(request) as response:
+            # 206: the server honours the range; anything else restarts from scratch
+            mode = "ab" if offset and response.status == 206 else "wb"
+            if mode == "ab":
+                logger.info(f"Resuming download at byte {offset}")
+            with open(part_path, mode) as f:
+                shutil.copyfileobj(response, f, length=1 << 20)
+
+        os.replace(part_path, output)
+
+
+    def _fetch(self, dataset_url: str, zip_download_dir: str):
+        """
+        Fetches the archive from a Google Drive share link, an HTTP(S) URL, a `file://` URL or a local path.
+        """
+        parsed = urlparse(dataset_url)
+
+        if parsed.scheme in ("", "file"):
+            source_path = unquote(parsed.path) if parsed.scheme == "file" else dataset_url
+            shutil.copyfile(source_path, zip_download_dir)
+        elif parsed.netloc == "drive.google.com":
+            file_id = dataset_url.split("/")[-2]
+            prefix = "https://drive.google.com/uc?/export=download&id="
+            gdown.download(prefix+file_id, zip_download_dir, resume=True)
+        elif parsed.scheme in ("http", "https"):
+            self._download_http(dataset_url, zip_download_dir)
+        else:
+            raise ValueError(f"Unsupported source URL scheme: {dataset_url}")
+
 
-    
     def download_file(self):
         """
         Downloads a file from a specified URL and saves it to a local directory.
@@ -20,6 +114,11 @@ class DataIngestion:
         The URL is obtained from the `source_url` attribute of the `config` object, while the local directory
         is obtained from the `local_data_file` attribute of the `config` object.
 
+        The source can be a Google Drive share link, any HTTP(S) URL (e.g. an internal mirror), a `file://` URL
+        or a local path. Interrupted HTTP(S) and Google Drive downloads resume from the partial file.
+        The download is skipped when the local archive already matches the `source_sha256` attribute of the
+        `config` object or, if that is not set, the checksum recorded after the previous download.
+
         Parameters:
             self (DataIngestion): The instance of the DataIngestion class.
 
@@ -27,24 +126,76 @@ class DataIngestion:
             None
 
         Raises:
-            Exception: If an error occurs during the download process, the exception is logged and re-raised.
+            Exception: If an error occurs during the download process, or the downloaded file does not match
+            the configured checksum, the exception is logged and re-raised.
 
         """
         try:
             dataset_url = self.config.source_url
             zip_download_dir = self.config.local_data_file
             create_directories([self.config.root_dir])
+            start = time.perf_counter()
+
+            if self._archive_is_valid():
+                logger.info(f"Archive {zip_download_dir} is up to date, skipping download "
+                            f"(checked in {time.perf_counter() - start:.2f}s)")
+                return
+
             logger.info(f"Downloading data from {dataset_url} into file {zip_download_dir}")
+            self._fetch(dataset_url, zip_download_dir)
 
-            file_id = dataset_url.split("/")[-2]
-            prefix = "https://drive.google.com/uc?/export=download&id="
-            gdown.download(prefix+file_id, zip_download_dir)
-            logger.info(f"Finished downloading data from {dataset_url} into file {zip_download_dir}")
+            archive_sha256 = model_fingerprint(Path(zip_download_dir))
+            if self.config.source_sha256 and archive_sha256 != self.config.source_sha256:
+                raise ValueError(f"Checksum mismatch for {zip_download_dir}: expected {self.config.source_sha256}, got {archive_sha256}")
+
+            manifest = self._read_manifest()
+            manifest.update({"source_url": dataset_url, "archive_sha256": archive_sha256})
+            self._write_manifest(manifest)
+            logger.info(f"Finished downloading data from {dataset_url} into file {zip_download_dir} "
+                        f"in {time.perf_counter() - start:.2f}s")
 
         except Exception as e:
             logger.exception(f"Exception raised while downloading data from {dataset_url} into file {zip_download_dir}: {e}")
             raise e
-        
+
+
+    @staticmethod
+    def _file_crc(path: str, chunk_size: int = 1 << 20) -> int:
+        """
+        Computes the CRC-32 of a file, the checksum zip archives store for every member.
+        """
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+
+    def _extract_member(self, info: zipfile.ZipInfo) -> bool:
+        """
+        Extracts one archive member unless the file on disk already has the same size and CRC-32.
+
+        Each call opens its own handle on the archive so members can be decompressed in parallel.
+        The member is written to a temporary file and renamed into place.
+
+        Returns:
+            bool: True if the file was (re)written, False if it was already up to date.
+        """
+        unzip_path = os.path.abspath(self.config.unzip_dir)
+        target = os.path.abspath(os.path.join(unzip_path, info.filename))
+        if os.path.commonpath([unzip_path, target]) != unzip_path:
+            raise ValueError(f"Archive member {info.filename} would be extracted outside {unzip_path}")
+
+        if os.path.isfile(target) and os.path.getsize(target) == info.file_size and self._file_crc(target) == info.CRC:
+            return False
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_target = f"{target}.part"
+        with zipfile.ZipFile(self.config.local_data_file, "r") as z, z.open(info) as src, open(tmp_target, "wb") as dst:
+            shutil.copyfileobj(src, dst, length=1 << 20)
+        os.replace(tmp_target, target)
+        return True
+
 
     def extract_zip_file(self):
         """
@@ -54,6 +205,10 @@ class DataIngestion:
         and extracts its contents to the directory specified by the `unzip_dir` attribute of the `config` object.
         The `unzip_dir` directory is created if it does not exist.
 
+        Extraction is skipped when the manifest shows this exact archive was already extracted and every member
+        is still on disk with its recorded size. Otherwise the members are extracted in parallel by
+        `extract_workers` threads, and only files whose size or CRC-32 differ from the archive are rewritten.
+
         Parameters:
             self (DataIngestion): The instance of the DataIngestion class.
 
@@ -64,13 +219,71 @@ class DataIngestion:
             Exception: If an error occurs during the extraction process, the exception is logged and re-raised.
         """
         try:
-            unzip_path = self.config.unzip_dir 
+            unzip_path = self.config.unzip_dir
             zip_download_dir = self.config.local_data_file
             create_directories([unzip_path])
+            start = time.perf_counter()
+
+            manifest = self._read_manifest()
+            archive_sha256 = manifest.get("archive_sha256") or model_fingerprint(Path(zip_download_dir))
+            extracted = manifest.get("extracted", {})
+            if extracted.get("archive_sha256") == archive_sha256 and all(
+                os.path.isfile(os.path.join(unzip_path, name)) and os.path.getsize(os.path.join(unzip_path, name)) == size
+                for name, size in extracted.get("members", {}).items()
+            ):
+                logger.info(f"{unzip_path} is up to date with {zip_download_dir}, skipping extraction "
+                            f"(checked in {time.perf_counter() - start:.2f}s)")
+                return
+
             with zipfile.ZipFile(zip_download_dir, 'r') as z:
-                z.extractall(unzip_path)
-            logger.info(f"Unzipped downloaded file in {zip_download_dir} to {unzip_path}")
-        
+                members = [info for info in z.infolist() if not info.is_dir()]
+
+            with ThreadPoolExecutor(max_workers=self.config.extract_workers) as executor:
+                written = sum(executor.map(self._extract_member, members))
+
+            manifest["archive_sha256"] = archive_sha256
+            manifest["extracted"] = {
+                "archive_sha256": archive_sha256,
+                "members": {info.filename: info.file_size for info in members},
+            }
+            self._write_manifest(manifest)
+            logger.info(f"Unzipped downloaded file in {zip_download_dir} to {unzip_path}: {written} of {len(members)} files written "
+                        f"in {time.perf_counter() - start:.2f}s")
+
         except Exception as e:
             logger.exception(f"Exception raised while unzipping downloaded file in {zip_download_dir} to {unzip_path}: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+
+    def build_image_cache(self):
+        """
+        Decodes the extracted images once into a memory-mapped array for training and evaluation.
+
+        This method writes the images of the `dataset_dir` attribute of the `config` object, resized to
+        `params_image_size` by the shared `ImagePreprocessor` (`params_preprocessing`), as a uint8 NHWC array
+        plus a labels array and a manifest under the `image_cache_dir` attribute of the `config` object. The
+        cache is keyed on the hash of the source images and the resizing spec, so it is only rebuilt when either changes.
+
+        Parameters:
+            self (DataIngestion): The instance of the DataIngestion class.
+
+        Returns:
+            Path: The directory of the up-to-date cache.
+
+        Raises:
+            Exception: If an error occurs while building the cache, the exception is logged and re-raised.
+        """
+        try:
+            start = time.perf_counter()
+            image_cache = ImageCache(
+                cache_dir=self.config.image_cache_dir,
+                image_size=self.config.params_image_size,
+                preprocessor=ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
+            )
+            cache_path = image_cache.build(self.config.dataset_dir)
+            logger.info(f"Image cache step finished in {time.perf_counter() - start:.2f}s")
+            return cache_path
+
+        except Exception as e:
+            logger.exception(f"Exception raised while building the image cache of {self.config.dataset_dir}: {e}")
+            raise e
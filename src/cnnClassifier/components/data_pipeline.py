@@ -0,0 +1,313 @@
+import hashlib
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+
+
+# same formats and listing order as `ImageDataGenerator.flow_from_directory`
+WHITE_LIST_FORMATS = ("png", "jpg", "jpeg", "bmp", "ppm", "tif", "tiff")
+
+
+def list_image_files(directory: Path, validation_split: float = 0.0, subset: str = None) -> tuple:
+    """
+    Lists the images of a class-per-subdirectory dataset exactly like `flow_from_directory` does.
+
+    Classes are the sorted subdirectory names. Within each class the files are walked in sorted
+    order and, when `validation_split` is set, the first `validation_split` fraction of each class
+    is the "validation" subset and the rest is the "training" subset.
+
+    Args:
+        directory (Path): The dataset directory, with one subdirectory per class.
+        validation_split (float, optional): The fraction of each class held out for validation. Defaults to 0.0.
+        subset (str, optional): "training" or "validation". Ignored when `validation_split` is 0.
+
+    Returns:
+        tuple: (paths, labels, class_names) where `labels` are class indices into `class_names`.
+    """
+    class_names = sorted(
+        name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))
+    )
+
+    if validation_split:
+        if subset not in ("training", "validation"):
+            raise ValueError(f"subset must be 'training' or 'validation', got {subset}")
+        split = (0, validation_split) if subset == "validation" else (validation_split, 1)
+    else:
+        split = None
+
+    paths, labels = [], []
+    for class_index, class_name in enumerate(class_names):
+        class_files = [
+            os.path.join(root, fname)
+            for root, _, files in sorted(os.walk(os.path.join(directory, class_name)), key=lambda x: x[0])
+            for fname in sorted(files)
+            if fname.lower().endswith(WHITE_LIST_FORMATS)
+        ]
+        if split:
+            start, stop = int(split[0] * len(class_files)), int(split[1] * len(class_files))
+            class_files = class_files[start:stop]
+        paths.extend(class_files)
+        labels.extend([class_index] * len(class_files))
+
+    return paths, labels, class_names
+
+
+def fingerprint_files(paths: list, *extra) -> str:
+    """
+    Returns a short hash of a file list (paths, sizes and modification times) and any extra values,
+    used to key caches on the exact inputs they were built from.
+    """
+    sha256 = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        sha256.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    for value in extra:
+        sha256.update(f"{value}\n".encode())
+    return sha256.hexdigest()[:16]
+
+
+class ImageDatasetBuilder:
+    """
+    Builds parallel tf.data input pipelines that replace `ImageDataGenerator.flow_from_directory`.
+
+    Files are read, decoded and resized by the shared `ImagePreprocessor` (native TensorFlow ops, the same
+    the image cache and serving run) with `num_parallel_calls=AUTOTUNE`, optionally cached as uint8 in memory
+    or on disk, shuffled with a fixed seed, normalized per batch and prefetched. Training augmentation reproduces the generator's random
+    rotation/shift/shear/zoom (nearest fill) and horizontal flip, with per-element stateless seeds
+    so a given seed always yields the same batches.
+    """
+
+    def __init__(self,
+                 image_size: list,
+                 batch_size: int,
+                 seed: int = 42,
+                 cache: str = None,
+                 cache_dir: Path = None,
+                 rotation_range: float = 40,
+                 width_shift_range: float = 0.2,
+                 height_shift_range: float = 0.2,
+                 shear_range: float = 0.2,
+                 zoom_range: float = 0.2,
+                 horizontal_flip: bool = True,
+                 preprocessor: ImagePreprocessor = None):
+        self.preprocessor = preprocessor if preprocessor is not None else ImagePreprocessor(image_size)
+        self.image_size = list(self.preprocessor.image_size)
+        self.channels = self.preprocessor.channels
+        self.batch_size = batch_size
+        self.seed = seed
+        self.cache = None if cache in (None, "none", "None", False) else cache
+        self.cache_dir = cache_dir
+        self.rotation_range = rotation_range
+        self.width_shift_range = width_shift_range
+        self.height_shift_range = height_shift_range
+        self.shear_range = shear_range
+        self.zoom_range = zoom_range
+        self.horizontal_flip = horizontal_flip
+
+
+    def _load(self, path: tf.Tensor, label: tf.Tensor):
+        """
+        Reads, decodes and resizes one image to a uint8 (H, W, C) tensor with the shared preprocessor.
+        """
+        return self.preprocessor.load_tf(path), label
+
+
+    def _affine_matrix(self, theta, tx, ty, shear, zx, zy) -> tf.Tensor:
+        """
+        Returns the 8 projective transform parameters (output pixel -> input pixel) of one affine
+        transform: rotation `theta` and `shear` in degrees, shifts `tx` (rows) and `ty` (columns) in
+        pixels and zooms `zx` (rows) and `zy` (columns), composed around the image center like
+        Keras' `apply_affine_transform`.
+
+        `ImageProjectiveTransformV3` takes (x, y) = (column, row) coordinates, so every factor is
+        written in (x, y) order; a row shift drawn from `height_shift_range` moves the image
+        vertically. (Keras 2.12's `ImageDataGenerator` applies it along the columns instead.)
+        """
+        h, w = float(self.image_size[0]), float(self.image_size[1])
+        theta = tf.convert_to_tensor(theta, tf.float32) * math.pi / 180.0
+        shear = tf.convert_to_tensor(shear, tf.float32) * math.pi / 180.0
+        tx, ty, zx, zy = (tf.convert_to_tensor(value, tf.float32) for value in (tx, ty, zx, zy))
+
+        one, zero = tf.constant(1.0), tf.constant(0.0)
+        rotation = tf.stack([[tf.cos(theta), tf.sin(theta), zero], [-tf.sin(theta), tf.cos(theta), zero], [zero, zero, one]])
+        shift = tf.stack([[one, zero, ty], [zero, one, tx], [zero, zero, one]])
+        shear_matrix = tf.stack([[tf.cos(shear), zero, zero], [-tf.sin(shear), one, zero], [zero, zero, one]])
+        zoom = tf.stack([[zy, zero, zero], [zero, zx, zero], [zero, zero, one]])
+
+        center_x, center_y = w / 2 - 0.5, h / 2 - 0.5
+        offset = tf.constant([[1.0, 0.0, center_x], [0.0, 1.0, center_y], [0.0, 0.0, 1.0]])
+        reset = tf.constant([[1.0, 0.0, -center_x], [0.0, 1.0, -center_y], [0.0, 0.0, 1.0]])
+
+        matrix = offset @ rotation @ shift @ shear_matrix @ zoom @ reset
+        return tf.reshape(matrix, [-1])[:8]
+
+
+    def _affine_transform(self, seed: tf.Tensor) -> tf.Tensor:
+        """
+        Draws one random affine transform with the generator's ranges, like
+        `ImageDataGenerator.random_transform`, and returns its projective transform parameters (see
+        `_affine_matrix`).
+        """
+        h, w = float(self.image_size[0]), float(self.image_size[1])
+        u = tf.random.stateless_uniform([6], seed=seed, minval=-1.0, maxval=1.0)
+        return self._affine_matrix(
+            theta=u[0] * self.rotation_range,
+            tx=u[1] * self.height_shift_range * h,
+            ty=u[2] * self.width_shift_range * w,
+            shear=u[3] * self.shear_range,
+            zx=1.0 + u[4] * self.zoom_range,
+            zy=1.0 + u[5] * self.zoom_range,
+        )
+
+
+    def _transform(self, image: tf.Tensor, transform: tf.Tensor) -> tf.Tensor:
+        """
+        Applies projective transform parameters to one float32 (H, W, C) image, with bilinear
+        interpolation and the nearest edge pixels filling the outside, like the Keras generator.
+        """
+        return tf.raw_ops.ImageProjectiveTransformV3(
+            images=image[tf.newaxis],
+            transforms=transform[tf.newaxis],
+            output_shape=self.image_size[:2],
+            fill_value=0.0,
+            interpolation="BILINEAR",
+            fill_mode="NEAREST",
+        )[0]
+
+
+    def _augment(self, image: tf.Tensor, label: tf.Tensor, seed: tf.Tensor):
+        """
+        Applies the random affine transform and horizontal flip to one float32 image.
+        """
+        affine_seed, flip_seed = tf.unstack(tf.random.experimental.stateless_split(seed, num=2))
+        image = self._transform(image, self._affine_transform(affine_seed))
+        if self.horizontal_flip:
+            flip = tf.random.stateless_uniform([], seed=flip_seed) < 0.5
+            image = tf.cond(flip, lambda: tf.image.flip_left_right(image), lambda: image)
+        return image, label
+
+
+    def _cache(self, dataset: tf.data.Dataset, paths: list, name: str) -> tf.data.Dataset:
+        """
+        Caches the decoded uint8 images in memory or in a disk cache file keyed on the exact inputs.
+        """
+        if self.cache == "memory":
+            return dataset.cache()
+        if self.cache == "disk":
+            key = fingerprint_files(paths, self.preprocessor.fingerprint(resize_only=True))
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_file = os.path.join(self.cache_dir, f"{name}-{key}")
+            logger.info(f"Caching decoded {name} images at: {cache_file}")
+            return dataset.cache(cache_file)
+        raise ValueError(f"Unknown cache mode {self.cache}, expected 'none', 'memory' or 'disk'")
+
+
+    def build(self, paths: list, labels: list, num_classes: int, training: bool, augment: bool = False, name: str = "data", skip: int = 0) -> tf.data.Dataset:
+        """
+        Builds the input pipeline for one subset.
+
+        Training pipelines are shuffled (seeded, reshuffled every epoch), repeated indefinitely and
+        optionally augmented; validation pipelines keep the file order and are iterated once.
+        Images are normalized by the preprocessor (rescaled by 1./255 by default) and labels are one-hot
+        encoded, like `class_mode="categorical"`.
+
+        Args:
+            paths (list): The image paths.
+            labels (list): The class indices of the images.
+            num_classes (int): The number of classes.
+            training (bool): Whether to shuffle and repeat the data.
+            augment (bool, optional): Whether to apply random augmentation. Defaults to False.
+            name (str, optional): The subset name, used for the disk cache file. Defaults to "data".
+            skip (int, optional): The number of training elements already consumed, e.g. by the epochs
+                before a resumed checkpoint. The pipeline continues exactly where it left off. Defaults to 0.
+
+        Returns:
+            tf.data.Dataset: Batches of (images, one-hot labels).
+        """
+        dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+
+        if self.cache is None:
+            # shuffle the (cheap) file names before decoding
+            if training:
+                dataset = dataset.shuffle(len(paths), seed=self.seed, reshuffle_each_iteration=True).repeat().skip(skip)
+            dataset = dataset.map(self._load, num_parallel_calls=tf.data.AUTOTUNE)
+        else:
+            dataset = dataset.map(self._load, num_parallel_calls=tf.data.AUTOTUNE)
+            dataset = self._cache(dataset, paths, name)
+            if training:
+                dataset = dataset.shuffle(len(paths), seed=self.seed, reshuffle_each_iteration=True).repeat().skip(skip)
+
+        return self._finish(dataset, num_classes, augment, skip)
+
+
+    def build_from_arrays(self, images: np.ndarray, labels: np.ndarray, indices: np.ndarray, num_classes: int, training: bool, augment: bool = False, skip: int = 0) -> tf.data.Dataset:
+        """
+        Builds the input pipeline for one subset from pre-decoded uint8 images, e.g. the memory-mapped
+        `ImageCache` arrays.
+
+        Only the selected row indices are shuffled; each image is sliced from `images` on demand, so a
+        memory-mapped array is never loaded as a whole. Shuffling, augmentation, normalization and batching
+        are the same as in `build`, so a given seed yields the same batches as the file-based pipeline.
+
+        Args:
+            images (np.ndarray): The uint8 (N, H, W, 3) images.
+            labels (np.ndarray): The class indices of all N images.
+            indices (np.ndarray): The rows of `images` that make up this subset.
+            num_classes (int): The number of classes.
+            training (bool): Whether to shuffle and repeat the data.
+            augment (bool, optional): Whether to apply random augmentation. Defaults to False.
+            skip (int, optional): The number of training elements already consumed (see `build`). Defaults to 0.
+
+        Returns:
+            tf.data.Dataset: Batches of (images, one-hot labels).
+        """
+        dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+        if training:
+            dataset = dataset.shuffle(len(indices), seed=self.seed, reshuffle_each_iteration=True).repeat().skip(skip)
+
+        height, width = self.image_size
+
+        def take(index):
+            image, label = tf.numpy_function(lambda i: (images[i], labels[i]), [index], (tf.uint8, tf.int64))
+            image.set_shape([height, width, self.channels])
+            label.set_shape([])
+            return image, tf.cast(label, tf.int32)
+
+        dataset = dataset.map(take, num_parallel_calls=tf.data.AUTOTUNE)
+        return self._finish(dataset, num_classes, augment, skip)
+
+
+    def _finish(self, dataset: tf.data.Dataset, num_classes: int, augment: bool, skip: int = 0) -> tf.data.Dataset:
+        """
+        Converts decoded uint8 (image, label) elements into augmented, batched, normalized and prefetched
+        (image, one-hot label) batches. The augmentation seeds skip the same `skip` elements as the data.
+
+        Normalization runs once per batch rather than per image. The augmentation interpolates linearly,
+        so it gives the same result before normalization as after it.
+        """
+        dataset = dataset.map(
+            lambda image, label: (tf.cast(image, tf.float32), tf.one_hot(label, num_classes)),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+
+        if augment:
+            seeds = tf.data.Dataset.random(seed=self.seed).batch(2).skip(skip)
+            dataset = tf.data.Dataset.zip((dataset, seeds)).map(
+                lambda data, seed: self._augment(data[0], data[1], seed),
+                num_parallel_calls=tf.data.AUTOTUNE
+            )
+
+        dataset = dataset.batch(self.batch_size).map(
+            lambda images, labels: (self.preprocessor.normalize(images), labels),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+
+        options = tf.data.Options()
+        options.deterministic = True
+        return dataset.with_options(options).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,82 @@
+import json
+import os
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.components.data_pipeline import fingerprint_files, list_image_files
+
+
+class DatasetSplit:
+    """
+    The training/validation split of the dataset, persisted to `split_path` so that training,
+    evaluation and model export use exactly the same validation images.
+
+    The split follows `list_image_files`: the first `validation_split` fraction of each class is the
+    validation subset. It is stored with relative paths and a fingerprint of the files (paths, sizes,
+    modification times) and the fraction, and written again only when those change.
+    """
+
+    def __init__(self, split_path: Path, data_dir: Path, validation_split: float):
+        self.split_path = Path(split_path)
+        self.data_dir = Path(data_dir)
+        self.validation_split = validation_split
+        self._split = None
+
+
+    def _create(self, fingerprint: str) -> dict:
+        split = {"validation_split": self.validation_split, "fingerprint": fingerprint}
+        for subset in ("training", "validation"):
+            paths, labels, class_names = list_image_files(self.data_dir, self.validation_split, subset)
+            split["class_names"] = class_names
+            split[subset] = {
+                "files": [os.path.relpath(path, self.data_dir).replace(os.sep, "/") for path in paths],
+                "labels": labels,
+            }
+
+        os.makedirs(self.split_path.parent, exist_ok=True)
+        tmp_path = Path(f"{self.split_path}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(split, f)
+        os.replace(tmp_path, self.split_path)
+        logger.info(f"Saved the split of {len(split['training']['files'])} training and "
+                    f"{len(split['validation']['files'])} validation images at: {self.split_path}")
+        return split
+
+
+    def load(self) -> dict:
+        """
+        Returns the persisted split, creating it if it is missing or the dataset changed.
+        """
+        if self._split is not None:
+            return self._split
+
+        fingerprint = fingerprint_files(list_image_files(self.data_dir)[0], self.validation_split)
+        split = None
+        if self.split_path.exists():
+            with open(self.split_path) as f:
+                split = json.load(f)
+            if split.get("fingerprint") != fingerprint:
+                logger.info(f"The dataset changed since the split at {self.split_path} was saved, splitting again")
+                split = None
+        self._split = split or self._create(fingerprint)
+        return self._split
+
+
+    @property
+    def fingerprint(self) -> str:
+        return self.load()["fingerprint"]
+
+
+    def subset(self, name: str) -> tuple:
+        """
+        Returns one subset like `list_image_files`.
+
+        Args:
+            name (str): "training" or "validation".
+
+        Returns:
+            tuple: (paths, labels, class_names) with the paths below `data_dir`.
+        """
+        split = self.load()
+        paths = [os.path.join(str(self.data_dir), *file.split("/")) for file in split[name]["files"]]
+        return paths, list(split[name]["labels"]), list(split["class_names"])
@@ -0,0 +1,111 @@
+import json
+import os
+
+import tensorflow as tf
+
+from cnnClassifier import logger
+
+
+def _tf_config() -> dict:
+    return json.loads(os.environ.get("TF_CONFIG") or "{}")
+
+
+def resolve_strategy_name(strategy: str, cpu_devices: int) -> str:
+    """
+    Resolves the `DISTRIBUTION.STRATEGY` parameter: `auto` selects `multi_worker` when `TF_CONFIG`
+    describes a cluster, `mirrored` when more than one CPU device is requested, and `none` otherwise.
+    """
+    if strategy == "auto":
+        if _tf_config().get("cluster"):
+            return "multi_worker"
+        return "mirrored" if cpu_devices > 1 else "none"
+    if strategy not in ("none", "mirrored", "multi_worker"):
+        raise ValueError(f"Unknown distribution strategy {strategy}, expected none, mirrored, multi_worker or auto")
+    return strategy
+
+
+def configure_devices(strategy: str, cpu_devices: int):
+    """
+    Splits the CPU into `cpu_devices` logical devices when training uses the `mirrored` strategy, and
+    does nothing for the other strategies or when the devices are already configured.
+
+    Logical devices can only be configured before TensorFlow runs its first op, so the entry points
+    that run other stages before training in the same process (`main.py`, the sweep trials) call this
+    at start-up. A process that only trains (the training stage script) gets them from `create_strategy`.
+
+    Raises:
+        RuntimeError: If TensorFlow was already initialized with a different number of CPU devices.
+    """
+    if resolve_strategy_name(strategy, cpu_devices) != "mirrored":
+        return
+    cpu = tf.config.list_physical_devices("CPU")[0]
+    # unlike listing the logical devices, this does not initialize the runtime
+    if len(tf.config.get_logical_device_configuration(cpu) or []) == cpu_devices:
+        return
+    try:
+        tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * cpu_devices)
+    except RuntimeError as e:
+        raise RuntimeError(f"The mirrored strategy needs {cpu_devices} logical CPU devices, which can only be configured "
+                           f"before TensorFlow runs its first op; call configure_devices at the start of the process") from e
+
+
+def create_strategy(strategy: str, cpu_devices: int) -> tf.distribute.Strategy:
+    """
+    Creates the tf.distribute strategy used for training.
+
+    - `none`: the default strategy (one device, one process).
+    - `mirrored`: `MirroredStrategy` over `cpu_devices` logical CPU devices of this host; every replica
+      runs its share of the global batch and the gradients are all-reduced in process.
+    - `multi_worker`: `MultiWorkerMirroredStrategy` over the cluster described by `TF_CONFIG`, with
+      ring all-reduce between the workers.
+
+    The logical devices of `mirrored` and the collective ops of `multi_worker` can only be configured
+    before TensorFlow runs its first op: call `configure_devices` at the start of a process that runs
+    other stages first, and start multi-worker training in fresh processes (`launch_multi_worker.py`).
+
+    Returns:
+        tf.distribute.Strategy: The strategy; its `num_replicas_in_sync` scales the batch size.
+    """
+    strategy = resolve_strategy_name(strategy, cpu_devices)
+    if strategy == "none":
+        return tf.distribute.get_strategy()
+
+    if strategy == "mirrored":
+        configure_devices(strategy, cpu_devices)
+        devices = [device.name for device in tf.config.list_logical_devices("CPU")]
+        logger.info(f"MirroredStrategy over {len(devices)} CPU devices: {devices}")
+        return tf.distribute.MirroredStrategy(devices=devices)
+
+    tf_config = _tf_config()
+    if not tf_config.get("cluster"):
+        raise ValueError("The multi_worker distribution strategy needs a cluster in the TF_CONFIG environment variable")
+    task = tf_config.get("task", {})
+    logger.info(f"MultiWorkerMirroredStrategy as {task.get('type')} {task.get('index')} of cluster {tf_config['cluster']}")
+    return tf.distribute.MultiWorkerMirroredStrategy(
+        communication_options=tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING
+        )
+    )
+
+
+def is_chief(strategy: tf.distribute.Strategy) -> bool:
+    """
+    Checks whether this process writes the shared outputs (the trained model): always true outside a
+    multi-worker cluster, otherwise only for the `chief` task or, without one, `worker` 0.
+    """
+    if not isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy):
+        return True
+    task_type = strategy.cluster_resolver.task_type
+    task_id = strategy.cluster_resolver.task_id
+    return task_type == "chief" or (task_type == "worker" and task_id == 0
+                                    and "chief" not in strategy.cluster_resolver.cluster_spec().as_dict())
+
+
+def shard_by_data(dataset: tf.data.Dataset) -> tf.data.Dataset:
+    """
+    Makes multi-worker training shard a dataset by element: the pipelines read a list of files or
+    array indices, not one file per worker, so every worker keeps its share of each global batch.
+    """
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy.stats import rankdata
+
+from cnnClassifier import logger
+
+
+def roc_auc(scores: np.ndarray, positives: np.ndarray) -> float:
+    """
+    Computes the area under the ROC curve from the rank statistic (Mann-Whitney U), with ties
+    counted as half. Returns None when only one class is present.
+    """
+    num_positive = int(positives.sum())
+    num_negative = len(positives) - num_positive
+    if num_positive == 0 or num_negative == 0:
+        return None
+    ranks = rankdata(scores)
+    return float((ranks[positives].sum() - num_positive * (num_positive + 1) / 2) / (num_positive * num_negative))
+
+
+def classification_metrics(probabilities: np.ndarray, labels: np.ndarray, class_names: list) -> dict:
+    """
+    Computes the evaluation metrics from per-sample class probabilities.
+
+    Args:
+        probabilities (np.ndarray): The (N, num_classes) predicted probabilities.
+        labels (np.ndarray): The N true class indices.
+        class_names (list): The class names, in the order of the model outputs.
+
+    Returns:
+        dict: The categorical cross-entropy `loss` (clipped like Keras), `accuracy`, macro-averaged
+        `precision`, `recall` and one-vs-rest `roc_auc` (None if a class is missing), the same metrics per
+        class and the confusion matrix (rows: true class, columns: predicted class).
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    num_classes = len(class_names)
+    predicted = probabilities.argmax(axis=1)
+
+    epsilon = 1e-7
+    clipped = np.clip(probabilities / probabilities.sum(axis=1, keepdims=True), epsilon, 1 - epsilon)
+    loss = float(-np.log(clipped[np.arange(len(labels)), labels]).mean())
+
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(confusion, (labels, predicted), 1)
+
+    per_class = {}
+    for index, name in enumerate(class_names):
+        true_positives = confusion[index, index]
+        predicted_positives = confusion[:, index].sum()
+        actual_positives = confusion[index, :].sum()
+        per_class[name] = {
+            "precision": float(true_positives / predicted_positives) if predicted_positives else 0.0,
+            "recall": float(true_positives / actual_positives) if actual_positives else 0.0,
+            "roc_auc": roc_auc(probabilities[:, index], labels == index),
+            "support": int(actual_positives),
+        }
+
+    def macro(metric):
+        values = [scores[metric] for scores in per_class.values() if scores[metric] is not None]
+        return float(np.mean(values)) if values else None
+
+    return {
+        "loss": loss,
+        "accuracy": float((predicted == labels).mean()),
+        "precision": macro("precision"),
+        "recall": macro("recall"),
+        "roc_auc": macro("roc_auc"),
+        "samples": int(len(labels)),
+        "per_class": per_class,
+        "confusion_matrix": confusion.tolist(),
+    }
+
+
+def save_predictions(path: Path, probabilities: np.ndarray, labels: list, files: list, class_names: list,
+                     model_sha256: str, split_fingerprint: str):
+    """
+    Stores the validation probabilities of a model in a compressed `.npz` file, together with the
+    labels, the image files, the model hash and the split they belong to. Written atomically.
+    """
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            probabilities=np.asarray(probabilities, dtype=np.float32),
+            labels=np.asarray(labels, dtype=np.int32),
+            files=np.asarray(files, dtype=str),
+            class_names=np.asarray(class_names, dtype=str),
+            model_sha256=np.asarray(model_sha256),
+            split_fingerprint=np.asarray(split_fingerprint),
+        )
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {len(labels)} validation predictions at: {path}")
+
+
+def load_predictions(path: Path, model_sha256: str, split_fingerprint: str):
+    """
+    Loads the stored validation predictions if they were made by the same model on the same split.
+
+    Returns:
+        dict: The arrays stored by `save_predictions`, or None.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        predictions = {key: data[key] for key in data.files}
+    if str(predictions["model_sha256"]) != model_sha256 or str(predictions["split_fingerprint"]) != split_fingerprint:
+        return None
+    return predictions
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import model_fingerprint
+
+
+def split_frozen_backbone(model: tf.keras.Model):
+    """
+    Splits a model into its frozen backbone and the trainable head on top of it.
+
+    The backbone is the longest prefix of layers without trainable weights (e.g. the frozen VGG16
+    conv stack), including the weightless layers after the last frozen one (pooling, Flatten), so
+    the cached features are as small as they get; the head is the chain of remaining layers (e.g.
+    Dense). A layer that behaves differently in training (Dropout, GaussianNoise) ends the backbone
+    and goes into the head. The head reuses the model's layer objects, so training it updates the
+    full model.
+
+    Args:
+        model (tf.keras.Model): A functional model.
+
+    Returns:
+        tuple: (backbone, head, reason). `backbone` and `head` are None when the model cannot be
+        split, in which case `reason` explains why.
+    """
+    layers = model.layers
+    split = None
+    for index, layer in enumerate(layers):
+        if layer.trainable_weights or isinstance(layer, (tf.keras.layers.Dropout, tf.keras.layers.GaussianNoise)):
+            break
+        split = index
+    if split is None or not any(layer.weights for layer in layers[:split + 1]):
+        return None, None, "no frozen layer with weights in front of the trainable layers"
+
+    if not any(layer.trainable_weights for layer in layers[split + 1:]):
+        return None, None, "the model has no trainable layers"
+
+    for previous, layer in zip(layers[split:], layers[split + 1:]):
+        if layer.input is not previous.output:
+            return None, None, f"layer {layer.name} is not a plain chain on top of the backbone"
+
+    backbone = tf.keras.Model(inputs=model.input, outputs=layers[split].output, name="bottleneck_backbone")
+
+    head_input = tf.keras.Input(shape=layers[split].output.shape[1:])
+    x = head_input
+    for layer in layers[split + 1:]:
+        x = layer(x)
+    head = tf.keras.Model(inputs=head_input, outputs=x, name="bottleneck_head")
+
+    return backbone, head, None
+
+
+class BottleneckFeatureCache:
+    """
+    On-disk cache of frozen-backbone outputs ("bottleneck features").
+
+    Features are computed once per subset with one inference pass over non-augmented images and
+    stored as memory-mapped `.npy` arrays under a directory keyed on the backbone weights, the image
+    size and the exact input files, so any change to those invalidates the cache.
+    """
+
+    def __init__(self, cache_dir: Path, backbone: tf.keras.Model, key: str):
+        self.backbone = backbone
+        self.path = Path(cache_dir) / key
+
+
+    @staticmethod
+    def make_key(model_path: Path, *extra) -> str:
+        """
+        Hashes the saved model (see `model_fingerprint`) together with any extra values (image size, file fingerprints).
+        """
+        sha256 = hashlib.sha256(model_fingerprint(model_path).encode())
+        for value in extra:
+            sha256.update(f"|{value}".encode())
+        return sha256.hexdigest()[:16]
+
+
+    def get(self, name: str, images: tf.data.Dataset, num_samples: int) -> np.ndarray:
+        """
+        Returns the features of one subset, computing and storing them on first use.
+
+        Args:
+            name (str): The subset name, e.g. "training" or "validation".
+            images (tf.data.Dataset): Batches of non-augmented images, in a fixed order.
+            num_samples (int): The number of images in `images`.
+
+        Returns:
+            np.ndarray: The (num_samples, ...) float32 features, memory-mapped read-only.
+        """
+        feature_path = self.path / f"{name}_features.npy"
+        feature_shape = tuple(self.backbone.output.shape[1:])
+        if feature_path.exists():
+            features = np.load(feature_path, mmap_mode="r")
+            if features.shape == (num_samples,) + feature_shape:
+                logger.info(f"Using cached bottleneck features at: {feature_path}")
+                return features
+            # e.g. written by a version that split the backbone at another layer
+            logger.info(f"Cached bottleneck features at {feature_path} have shape {features.shape}, computing them again")
+            del features
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self.path / f".{name}_features.npy.tmp"
+        start = time.perf_counter()
+
+        features = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(num_samples,) + feature_shape)
+        row = 0
+        for batch in images:
+            batch_features = self.backbone(batch, training=False).numpy()
+            features[row:row + len(batch_features)] = batch_features
+            row += len(batch_features)
+        if row != num_samples:
+            raise ValueError(f"Expected {num_samples} {name} images, the dataset produced {row}")
+        features.flush()
+        del features
+
+        os.replace(tmp_path, feature_path)
+        logger.info(f"Computed {num_samples} {name} bottleneck features in {time.perf_counter() - start:.1f}s at: {feature_path}")
+        return np.load(feature_path, mmap_mode="r")
+
+
+    def prune(self):
+        """
+        Removes the caches of other keys (older backbones or data) next to this one.
+        """
+        if not self.path.parent.exists():
+            return
+        for path in self.path.parent.iterdir():
+            if path != self.path:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def features_dataset(features: np.ndarray, labels: np.ndarray, batch_size: int, training: bool, seed: int = 42, skip: int = 0) -> tf.data.Dataset:
+    """
+    Streams batches of (features, one-hot labels) from (memory-mapped) arrays.
+
+    Training datasets are shuffled with `seed` and repeated, and start after the first `skip` elements
+    (those consumed before a resumed checkpoint); each batch is gathered from the memory map with
+    sorted row indices, so only the rows of the current batch are read.
+    """
+    num_samples = len(labels)
+    feature_shape = features.shape[1:]
+    dataset = tf.data.Dataset.from_tensor_slices(np.arange(num_samples, dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(num_samples, seed=seed, reshuffle_each_iteration=True).repeat().skip(skip)
+    dataset = dataset.batch(batch_size)
+
+    def take(rows):
+        rows = np.sort(rows)
+        return np.asarray(features[rows], dtype=np.float32), np.asarray(labels[rows], dtype=np.float32)
+
+    def gather(rows):
+        x, y = tf.numpy_function(take, [rows], (tf.float32, tf.float32))
+        x.set_shape((None,) + tuple(feature_shape))
+        y.set_shape((None, labels.shape[1]))
+        return x, y
+
+    return dataset.map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
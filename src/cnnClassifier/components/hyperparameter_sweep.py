@@ -0,0 +1,392 @@
+import copy
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.data_split import DatasetSplit
+from cnnClassifier.entity.config_entity import SweepConfig
+
+
+METHODS = ("grid", "random")
+DISTRIBUTIONS = ("uniform", "log_uniform", "int_uniform")
+# scores where lower is better; every other score is maximized
+MINIMIZED_METRICS = ("loss",)
+# parameters every trial has to share, as the dataset split is created once for the whole sweep
+SHARED_PARAMS = ("VALIDATION_SPLIT",)
+
+
+def set_param(params: dict, key: str, value):
+    """
+    Sets `key` in a params dict, where a dotted key (e.g. PREPROCESSING.NORMALIZATION) addresses a nested parameter.
+    """
+    *sections, name = key.split(".")
+    for section in sections:
+        params = params.setdefault(section, {})
+    params[name] = value
+
+
+def _mlflow_param(key: str, value):
+    from mlflow.entities import Param
+
+    return Param(key, str(value))
+
+
+def _mlflow_metric(key: str, value: float, step: int = 0):
+    from mlflow.entities import Metric
+
+    return Metric(key, float(value), int(time.time() * 1000), step)
+
+
+def _sample(key: str, values, rng: random.Random):
+    if isinstance(values, list):
+        return rng.choice(values)
+    distribution, low, high = values.get("DISTRIBUTION"), values["LOW"], values["HIGH"]
+    if distribution == "uniform":
+        return float(f"{rng.uniform(low, high):.6g}")
+    if distribution == "log_uniform":
+        return float(f"{math.exp(rng.uniform(math.log(low), math.log(high))):.6g}")
+    if distribution == "int_uniform":
+        return rng.randint(int(low), int(high))
+    raise ValueError(f"Unknown distribution {distribution} of {key}, expected one of {list(DISTRIBUTIONS)}")
+
+
+def sample_configurations(space: dict, method: str, trials: int, seed: int) -> list:
+    """
+    Returns the parameter overrides of every trial.
+
+    Args:
+        space (dict): The search space: a list of values per parameter or, for random search, a
+            {DISTRIBUTION, LOW, HIGH} mapping.
+        method (str): "grid" for every combination of the lists, "random" for `trials` samples.
+        trials (int): The number of random search trials.
+        seed (int): The seed of the random search.
+
+    Returns:
+        list: One dict of parameter values per trial, without duplicates.
+
+    Raises:
+        ValueError: If the method or a distribution is unknown, or a grid search parameter is not a list.
+    """
+    if method == "grid":
+        for key, values in space.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Grid search needs a list of values for {key}, got {values}")
+        keys = list(space)
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    if method != "random":
+        raise ValueError(f"Unknown search method {method}, expected one of {list(METHODS)}")
+
+    rng = random.Random(seed)
+    configurations, seen = [], set()
+    # a small discrete space has fewer distinct configurations than trials; stop instead of looping forever
+    for _ in range(trials * 20):
+        configuration = {key: _sample(key, values, rng) for key, values in space.items()}
+        fingerprint = json.dumps(configuration, sort_keys=True)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            configurations.append(configuration)
+        if len(configurations) == trials:
+            break
+    return configurations
+
+
+def halving_rungs(max_epochs: int, min_epochs: int, eta: int) -> list:
+    """
+    Returns the epoch budgets of the successive halving rungs, e.g. [1, 2, 4, 5] for 5 epochs, 1 minimum epoch and eta 2.
+    """
+    rungs, epochs = [], max(1, min_epochs)
+    while epochs < max_epochs:
+        rungs.append(epochs)
+        epochs *= eta
+    return rungs + [max_epochs]
+
+
+def trial_config(base_config: dict, trial_dir: Path) -> dict:
+    """
+    Returns the configuration of one trial: every path the training and evaluation stages write to is moved
+    into `trial_dir`, while the ingested dataset, its split and image cache, and the downloaded base model
+    are read from where the pipeline put them.
+    """
+    config = copy.deepcopy(base_config)
+    trial_dir = str(trial_dir)
+    config["model_artifacts"]["root_dir"] = os.path.join(trial_dir, "models")
+    config["prepare_base_model"]["root_dir"] = os.path.join(trial_dir, "prepare_base_model")
+    config["prepare_base_model"]["updated_base_model_path"] = os.path.join(trial_dir, "prepare_base_model", "base_model_updated")
+    config["training"]["root_dir"] = os.path.join(trial_dir, "training")
+    config["training"]["trained_model_path"] = os.path.join(trial_dir, "training", "model")
+    config["training"]["trained_model_path_for_tracking"] = os.path.join(trial_dir, "training", "model")
+    config["training"]["checkpoint_dir"] = os.path.join(trial_dir, "training", "checkpoints")
+    config["evaluation"]["root_dir"] = os.path.join(trial_dir, "evaluation")
+    config["evaluation"]["predictions_path"] = os.path.join(trial_dir, "evaluation", "validation_predictions.npz")
+    config["evaluation"]["report_path"] = os.path.join(trial_dir, "evaluation", "report.json")
+    config["profiling"]["root_dir"] = os.path.join(trial_dir, "profiles")
+    config["profiling"]["metrics_path"] = os.path.join(trial_dir, "profiles", "pipeline_metrics.prom")
+    return config
+
+
+def run_trial(trial_dir: str, threads: int, cores: list) -> dict:
+    """
+    Trains and evaluates one trial in a fresh worker process, with the `config.yaml` and `params.yaml` of
+    `trial_dir` (see `HyperparameterSweep._write_trial`).
+
+    The process is pinned to `cores` and limited to `threads` TensorFlow threads before TensorFlow starts.
+    The head on the base model is built once per trial, with the global seed, so all trials start from the
+    same weights. A promoted trial finds the checkpoint of its previous rung (the checkpoints are keyed on
+    every parameter but `EPOCHS`) and only trains the additional epochs.
+
+    Returns:
+        dict: The evaluation scores and the seconds the trial took.
+    """
+    start = time.perf_counter()
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    configure_logging(log_dir=os.path.join(trial_dir, "logs"))
+
+    import tensorflow as tf
+    from cnnClassifier.components.distribution import configure_devices
+    from cnnClassifier.components.model_artifact import is_artifact
+    from cnnClassifier.components.model_evaluation_mlflow import Evaluation
+    from cnnClassifier.components.model_trainer import Training
+    from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+    from cnnClassifier.config.configuration import ConfigurationManager
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    config = ConfigurationManager(Path(trial_dir) / "config.yaml", Path(trial_dir) / "params.yaml")
+    # before the base model is prepared in this process
+    configure_devices(config.params.DISTRIBUTION.STRATEGY, config.params.DISTRIBUTION.CPU_DEVICES)
+    prepare_base_model_config = config.prepare_base_model_config()
+    if not is_artifact(prepare_base_model_config.updated_base_model_path):
+        tf.keras.utils.set_random_seed(config.params.SEED)
+        prepare_base_model = PrepareBaseModel(config=prepare_base_model_config)
+        prepare_base_model.load_base_model()
+        prepare_base_model.update_base_model()
+
+    training = Training(config=config.get_training_config())
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train()
+
+    evaluation = Evaluation(config=config.get_evaluation_config())
+    evaluation.evaluate(write_scores=False)
+    return {"scores": evaluation.scores, "seconds": time.perf_counter() - start}
+
+
+class HyperparameterSweep:
+    """
+    Searches the parameters of `params.yaml` with parallel training runs ("trials").
+
+    Every trial is a directory `root_dir/<sweep name>/trial-NNNN` with its own `params.yaml` (the project
+    parameters overridden by one point of the search space) and `config.yaml`, and is trained and evaluated
+    by `run_trial` in a fresh process. Up to `parallel_trials` trials run at the same time, each pinned to
+    its own `threads_per_trial` CPU cores.
+
+    With successive halving, all trials are first trained for `sweep_min_epochs` epochs; only the best
+    1/`sweep_eta` of them are trained `sweep_eta` times longer, and so on until `EPOCHS`. Every rung resumes
+    from the trial's checkpoints, so a promoted trial only trains the additional epochs.
+
+    The scores of every trial and rung are logged to a local MLflow file store, as child runs of one run per
+    sweep. The results of all trials are written to `results.json`, and the best trial to `best.json`.
+    """
+
+    def __init__(self, config: SweepConfig):
+        self.config = config
+        if config.sweep_method not in METHODS:
+            raise ValueError(f"Unknown search method {config.sweep_method}, expected one of {list(METHODS)}")
+        if config.sweep_successive_halving and config.sweep_eta < 2:
+            raise ValueError(f"Successive halving needs an ETA of at least 2, got {config.sweep_eta}")
+        for key in config.sweep_space:
+            if key in SHARED_PARAMS:
+                raise ValueError(f"{key} cannot be searched, the dataset split is shared by all trials")
+            if key == "EPOCHS" and config.sweep_successive_halving:
+                raise ValueError("EPOCHS cannot be searched with successive halving, which sets the epochs of every rung")
+
+        self.minimize = config.sweep_metric in MINIMIZED_METRICS
+        self.cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.parallel_trials = max(1, config.parallel_trials)
+        self.threads = config.threads_per_trial or max(1, len(self.cores) // self.parallel_trials)
+
+
+    def _slot_cores(self, slot: int) -> list:
+        """
+        Returns the cores of one of the `parallel_trials` slots, or an empty list (no pinning) when the
+        slots need more cores than there are.
+        """
+        if self.threads * self.parallel_trials > len(self.cores):
+            return []
+        return self.cores[slot * self.threads:(slot + 1) * self.threads]
+
+
+    def _write_trial(self, trial: dict, epochs: int):
+        """
+        Writes the `config.yaml` and `params.yaml` of a trial for a rung of `epochs` epochs.
+        """
+        params = copy.deepcopy(self.config.base_params)
+        for key, value in trial["params"].items():
+            set_param(params, key, value)
+        params["EPOCHS"] = epochs
+        params["PERFORMANCE"]["INTRA_OP_THREADS"] = self.threads
+        params["PERFORMANCE"]["INTER_OP_THREADS"] = self.threads
+
+        os.makedirs(trial["dir"], exist_ok=True)
+        for file_name, data in (("config.yaml", trial_config(self.config.base_config, trial["dir"])), ("params.yaml", params)):
+            with open(Path(trial["dir"]) / file_name, "w") as f:
+                yaml.safe_dump(data, f, sort_keys=False)
+
+
+    def _score(self, trial: dict) -> float:
+        value = trial["scores"].get(self.config.sweep_metric)
+        if value is None:
+            return math.inf
+        return value if self.minimize else -value
+
+
+    def _run_rung(self, trials: list, epochs: int, client):
+        """
+        Trains and evaluates `trials` for `epochs` epochs, at most `parallel_trials` at a time, and logs their scores.
+        """
+        pending, running = list(trials), {}
+        free_slots = list(range(self.parallel_trials))
+        context = multiprocessing.get_context("spawn")
+        while pending or running:
+            while pending and free_slots:
+                trial, slot = pending.pop(0), free_slots.pop(0)
+                self._write_trial(trial, epochs)
+                # one process per trial, so thread limits and pinning apply from its start and TensorFlow
+                # memory is returned when it ends
+                executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+                future = executor.submit(run_trial, str(trial["dir"]), self.threads, self._slot_cores(slot))
+                running[future] = (trial, slot, executor)
+                logger.info(f"Started {trial['name']} ({epochs} epochs) with {trial['params']}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial, slot, executor = running.pop(future)
+                executor.shutdown()
+                free_slots.append(slot)
+                trial["epochs"] = epochs
+                try:
+                    result = future.result()
+                except Exception as e:
+                    trial["state"], trial["error"] = "failed", repr(e)
+                    logger.exception(f"{trial['name']} failed after {epochs} epochs: {e}")
+                    client.set_terminated(trial["run_id"], status="FAILED")
+                    continue
+
+                trial["scores"], trial["seconds"] = result["scores"], trial.get("seconds", 0.0) + result["seconds"]
+                client.log_batch(trial["run_id"], metrics=[
+                    _mlflow_metric(name, value, step=epochs) for name, value in trial["scores"].items()
+                ] + [_mlflow_metric("seconds", result["seconds"], step=epochs)])
+                logger.info(f"{trial['name']} after {epochs} epochs ({result['seconds']:.0f}s): "
+                            f"{self.config.sweep_metric}={trial['scores'].get(self.config.sweep_metric)}")
+
+
+    def run(self, name: str = None) -> dict:
+        """
+        Runs the sweep.
+
+        Args:
+            name (str, optional): The sweep name, and directory under `root_dir`. Defaults to a timestamp.
+
+        Returns:
+            dict: The best trial (name, parameters, scores, epochs and directory).
+
+        Raises:
+            RuntimeError: If every trial failed.
+        """
+        from mlflow.entities import RunStatus
+        from mlflow.tracking import MlflowClient
+
+        name = name or datetime.now().strftime("sweep-%Y-%m-%d_%H-%M-%S")
+        sweep_dir = self.config.root_dir / name
+        os.makedirs(sweep_dir, exist_ok=True)
+
+        # created once here, so the trials only read it
+        DatasetSplit(self.config.split_path, self.config.training_data, self.config.params_validation_split).load()
+
+        configurations = sample_configurations(
+            self.config.sweep_space, self.config.sweep_method, self.config.sweep_trials, self.config.sweep_seed
+        )
+        max_epochs = self.config.params_epochs
+        rungs = [max_epochs]
+        if self.config.sweep_successive_halving:
+            rungs = halving_rungs(max_epochs, self.config.sweep_min_epochs, self.config.sweep_eta)
+        logger.info(f"Sweep {name}: {len(configurations)} trials, rungs of {rungs} epochs, {self.parallel_trials} "
+                    f"parallel trials with {self.threads} threads each, at: {sweep_dir}")
+
+        client = MlflowClient(tracking_uri=self.config.mlflow_uri)
+        experiment = client.get_experiment_by_name("hyperparameter_sweep")
+        experiment_id = experiment.experiment_id if experiment else client.create_experiment("hyperparameter_sweep")
+        parent_run_id = client.create_run(experiment_id, run_name=name).info.run_id
+        client.log_batch(parent_run_id, params=[
+            _mlflow_param("method", self.config.sweep_method),
+            _mlflow_param("metric", self.config.sweep_metric),
+            _mlflow_param("rungs", rungs),
+            _mlflow_param("space", json.dumps(self.config.sweep_space)),
+        ])
+
+        trials = []
+        for index, params in enumerate(configurations, start=1):
+            trial_name = f"trial-{index:04d}"
+            run_id = client.create_run(
+                experiment_id, run_name=f"{name}/{trial_name}", tags={"mlflow.parentRunId": parent_run_id}
+            ).info.run_id
+            client.log_batch(run_id, params=[_mlflow_param(key, value) for key, value in params.items()])
+            trials.append({"name": trial_name, "dir": sweep_dir / trial_name, "params": params,
+                           "state": "running", "run_id": run_id, "scores": {}})
+
+        start = time.perf_counter()
+        active = trials
+        try:
+            for rung, epochs in enumerate(rungs):
+                self._run_rung(active, epochs, client)
+                active = sorted((trial for trial in active if trial["state"] == "running"), key=self._score)
+                if rung < len(rungs) - 1:
+                    promoted = max(1, math.ceil(len(active) / self.config.sweep_eta))
+                    for trial in active[promoted:]:
+                        trial["state"] = "stopped"
+                        client.set_terminated(trial["run_id"])
+                    active = active[:promoted]
+                    logger.info(f"Promoted {[trial['name'] for trial in active]} to {rungs[rung + 1]} epochs")
+            for trial in active:
+                trial["state"] = "completed"
+                client.set_terminated(trial["run_id"])
+        except BaseException:
+            client.set_terminated(parent_run_id, status=RunStatus.to_string(RunStatus.KILLED))
+            raise
+
+        results = [
+            {key: str(value) if key == "dir" else value for key, value in trial.items()} for trial in trials
+        ]
+        with open(sweep_dir / "results.json", "w") as f:
+            json.dump(results, f, indent=4)
+
+        completed = [result for result in results if result["state"] == "completed"]
+        if not completed:
+            client.set_terminated(parent_run_id, status="FAILED")
+            raise RuntimeError(f"Every trial of sweep {name} failed, see {sweep_dir / 'results.json'}")
+        best = min(completed, key=self._score)
+        with open(sweep_dir / "best.json", "w") as f:
+            json.dump(best, f, indent=4)
+
+        client.log_batch(parent_run_id, params=[_mlflow_param(f"best.{key}", value) for key, value in best["params"].items()],
+                         metrics=[_mlflow_metric(f"best.{key}", value) for key, value in best["scores"].items()])
+        client.set_tag(parent_run_id, "best_trial", best["name"])
+        client.set_terminated(parent_run_id)
+        logger.info(f"Sweep {name} finished in {time.perf_counter() - start:.0f}s. Best trial {best['name']}: "
+                    f"{self.config.sweep_metric}={best['scores'][self.config.sweep_metric]} with {best['params']}")
+        return best
+
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.data_pipeline import fingerprint_files, list_image_files
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+
+
+class ImageCache:
+    """
+    Pre-decoded, memory-mapped copy of a class-per-subdirectory image dataset.
+
+    The images are decoded and resized once by the shared `ImagePreprocessor`, exactly like the
+    tf.data pipelines and serving do them, and stored as a uint8 NHWC `images.npy`, together with
+    `labels.npy` and a `manifest.json` listing the class names and the relative path of every row.
+    Each cache lives in a directory keyed on the hash of the source images and the resizing spec (image
+    size, channels, filter), so changing either produces a new cache instead of reusing a stale one.
+    Readers open the arrays with `mmap_mode="r"` and slice them without copying.
+    """
+
+    def __init__(self, cache_dir: Path, image_size: list, preprocessor: ImagePreprocessor = None):
+        self.cache_dir = Path(cache_dir)
+        self.preprocessor = preprocessor if preprocessor is not None else ImagePreprocessor(image_size)
+        self.image_size = list(self.preprocessor.image_size)
+        # normalization happens when the cached images are read, so it does not key the cache
+        self.resize_key = self.preprocessor.fingerprint(resize_only=True)
+
+
+    @staticmethod
+    def source_hash(paths: list, root: Path, chunk_size: int = 1 << 20) -> str:
+        """
+        Computes the SHA-256 hash of the relative paths and content of the source images.
+        """
+        sha256 = hashlib.sha256()
+        for path in paths:
+            sha256.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    sha256.update(chunk)
+        return sha256.hexdigest()
+
+
+    def _key(self, source_hash: str) -> str:
+        return hashlib.sha256(f"{source_hash}|{self.resize_key}".encode()).hexdigest()[:16]
+
+
+    def _find(self, data_dir: Path):
+        """
+        Returns the cache directory and manifest matching the current source images, or (None, None).
+
+        The manifest stores a cheap stat fingerprint of the files; the content hash is only
+        recomputed when that fingerprint changed (e.g. files were touched or replaced).
+        """
+        paths, _, _ = list_image_files(data_dir)
+        fingerprint = fingerprint_files(paths, self.resize_key)
+
+        manifests = sorted(self.cache_dir.glob("*/manifest.json")) if self.cache_dir.exists() else []
+        for manifest_path in manifests:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("fingerprint") == fingerprint:
+                return manifest_path.parent, manifest
+
+        if not manifests:
+            return None, None
+
+        key = self._key(self.source_hash(paths, data_dir))
+        manifest_path = self.cache_dir / key / "manifest.json"
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            manifest["fingerprint"] = fingerprint
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=4)
+            return manifest_path.parent, manifest
+        return None, None
+
+
+    def build(self, data_dir: Path, num_workers: int = None) -> Path:
+        """
+        Builds the cache for `data_dir` unless an up-to-date one already exists.
+
+        The arrays are written into a temporary directory that is renamed into place once complete,
+        so readers never see a partially written cache.
+
+        Args:
+            data_dir (Path): The dataset directory, with one subdirectory per class.
+            num_workers (int, optional): The number of images decoded in parallel. Defaults to tf.data's autotuning.
+
+        Returns:
+            Path: The cache directory.
+        """
+        cache_path, _ = self._find(data_dir)
+        if cache_path is not None:
+            logger.info(f"Image cache is up to date: {cache_path}")
+            return cache_path
+
+        start = time.perf_counter()
+        paths, labels, class_names = list_image_files(data_dir)
+        source_hash = self.source_hash(paths, data_dir)
+        cache_path = self.cache_dir / self._key(source_hash)
+        tmp_path = self.cache_dir / f".{cache_path.name}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        height, width = self.image_size
+        images = np.lib.format.open_memmap(
+            tmp_path / "images.npy", mode="w+", dtype=np.uint8,
+            shape=(len(paths), height, width, self.preprocessor.channels)
+        )
+
+        # the tf.data pipelines' own parallel decode, in file order
+        decoded = tf.data.Dataset.from_tensor_slices(paths).map(
+            self.preprocessor.load_tf, num_parallel_calls=num_workers or tf.data.AUTOTUNE, deterministic=True
+        ).batch(64).prefetch(1)
+        offset = 0
+        for batch in decoded.as_numpy_iterator():
+            images[offset:offset + len(batch)] = batch
+            offset += len(batch)
+        images.flush()
+        del images
+
+        np.save(tmp_path / "labels.npy", np.asarray(labels, dtype=np.int64))
+        manifest = {
+            "source_hash": source_hash,
+            "fingerprint": fingerprint_files(paths, self.resize_key),
+            "image_size": self.image_size,
+            "preprocessing": self.preprocessor.spec(),
+            "class_names": class_names,
+            "count": len(paths),
+            "files": [os.path.relpath(path, data_dir).replace(os.sep, "/") for path in paths],
+        }
+        with open(tmp_path / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=4)
+
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.replace(tmp_path, cache_path)
+
+        # drop caches of older data or image sizes
+        for stale_path in self.cache_dir.iterdir():
+            if stale_path != cache_path and not stale_path.name.startswith("."):
+                shutil.rmtree(stale_path, ignore_errors=True)
+        logger.info(f"Cached {len(paths)} images at {self.image_size} in {time.perf_counter() - start:.1f}s at: {cache_path}")
+        return cache_path
+
+
+    def load(self, data_dir: Path):
+        """
+        Opens the up-to-date cache for `data_dir` as read-only memory maps.
+
+        Args:
+            data_dir (Path): The dataset directory the cache was built from.
+
+        Returns:
+            tuple: (images, labels, manifest), with `images` a uint8 (N, H, W, 3) memory map,
+            or None if there is no cache matching the current source images and resizing spec.
+        """
+        cache_path, manifest = self._find(data_dir)
+        if cache_path is None:
+            return None
+        images = np.load(cache_path / "images.npy", mmap_mode="r")
+        labels = np.load(cache_path / "labels.npy")
+        logger.info(f"Using image cache at: {cache_path}")
+        return images, labels, manifest
+
+
+    @staticmethod
+    def indices_of(manifest: dict, paths: list, data_dir: Path) -> np.ndarray:
+        """
+        Maps image paths (e.g. one split from `list_image_files`) to their rows in the cache.
+        """
+        row_of = {name: row for row, name in enumerate(manifest["files"])}
+        return np.asarray(
+            [row_of[os.path.relpath(path, data_dir).replace(os.sep, "/")] for path in paths],
+            dtype=np.int64
+        )
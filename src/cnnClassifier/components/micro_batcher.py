@@ -0,0 +1,180 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import PredictionConfig
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-image requests into one batch and runs a single forward pass for it.
+
+    A background thread waits for the first queued request, then keeps collecting requests until
+    either `max_batch_size` requests are queued or `max_wait_ms` milliseconds have passed since the
+    first one arrived. The collected inputs are stacked into one NumPy batch, passed to
+    `predict_fn`, and each row of the output is handed back to the caller that submitted it.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "batch_count": 0,
+            "item_count": 0,
+            "max_observed_batch_size": 0,
+            "total_forward_seconds": 0.0,
+        }
+
+
+    def start(self):
+        """
+        Starts the background batching thread if it is not running yet.
+        """
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+
+    def stop(self, timeout: float = None):
+        """
+        Stops the background batching thread after the requests already queued are served.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+    def submit(self, x: np.ndarray) -> Future:
+        """
+        Queues a single input (without batch dimension) and returns a future for its output row.
+
+        Args:
+            x (np.ndarray): One model input, e.g. an image array of shape (224, 224, 3).
+
+        Returns:
+            Future: Resolves to the model output row for `x`.
+        """
+        self.start()
+        future = Future()
+        self._queue.put((x, future))
+        return future
+
+
+    def predict(self, x: np.ndarray, timeout: float = None) -> np.ndarray:
+        """
+        Submits a single input and blocks until its output row is available.
+        """
+        return self.submit(x).result(timeout)
+
+
+    def _collect(self, first) -> list:
+        """
+        Collects queued requests after `first` until the batch is full or the wait budget is spent.
+        """
+        items = [first]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # keep the stop sentinel for the run loop
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+
+    def _run(self):
+        """
+        Batching loop run by the background thread.
+        """
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            items = self._collect(first)
+            # drop requests whose callers cancelled them while queued
+            items = [(x, future) for x, future in items if future.set_running_or_notify_cancel()]
+            if not items:
+                continue
+            inputs = [x for x, _ in items]
+            futures = [future for _, future in items]
+
+            try:
+                start = time.perf_counter()
+                outputs = self.predict_fn(np.stack(inputs))
+                forward_seconds = time.perf_counter() - start
+            except Exception as e:
+                logger.exception(f"Batched forward pass over {len(inputs)} inputs failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+            with self._metrics_lock:
+                self._metrics["batch_count"] += 1
+                self._metrics["item_count"] += len(inputs)
+                self._metrics["max_observed_batch_size"] = max(self._metrics["max_observed_batch_size"], len(inputs))
+                self._metrics["total_forward_seconds"] += forward_seconds
+
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of the batching metrics: number of batches and items served, the mean and
+        largest batch size, total forward-pass time and the current queue depth.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["mean_batch_size"] = metrics["item_count"] / metrics["batch_count"] if metrics["batch_count"] else 0.0
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["max_batch_size"] = self.max_batch_size
+        metrics["max_wait_ms"] = self.max_wait_seconds * 1000.0
+        return metrics
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_micro_batcher(config: PredictionConfig, predict_fn: Callable[[np.ndarray], np.ndarray]) -> MicroBatcher:
+    """
+    Returns the process-wide MicroBatcher for the configured model path, creating it on first use.
+
+    Args:
+        config (PredictionConfig): The prediction configuration.
+        predict_fn (Callable): Runs the forward pass on a stacked batch; only used on creation.
+
+    Returns:
+        MicroBatcher: The batcher shared by every caller in this process.
+    """
+    key = os.path.abspath(config.model_path)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = MicroBatcher(
+                predict_fn=predict_fn,
+                max_batch_size=config.max_batch_size,
+                max_wait_ms=config.max_wait_ms
+            )
+            _batchers[key] = batcher
+    return batcher
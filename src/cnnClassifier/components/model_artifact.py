@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cnnClassifier import logger
+from cnnClassifier.utils.common import LazyModule
+
+# imported on first use, so importing the serving apps stays cheap
+tf = LazyModule("tensorflow")
+
+
+MANIFEST_FILE = "manifest.json"
+CONFIG_FILE = "model.json"
+WEIGHTS_FILE = "weights.bin"
+FORMAT = "cnnClassifier-model"
+FORMAT_VERSION = 1
+# byte alignment of every array in the weights file, so memory-mapped views are aligned for SIMD loads
+ALIGNMENT = 64
+
+
+def is_artifact(path: Path) -> bool:
+    """
+    Returns True if `path` is a model artifact directory (a version in the store or a link to one).
+    """
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+
+def read_manifest(path: Path) -> dict:
+    with open(Path(path) / MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+def model_fingerprint(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the SHA-256 hash identifying a saved model.
+
+    For a model artifact this is the hash recorded in its manifest (of the architecture and the
+    weights), so no weight is read. Any other file (legacy `.h5`/`.keras` models, but also the data
+    archive and the stage cache inputs) is hashed by content in chunks, and other directories
+    (SavedModel) by the relative paths and content of all their files. This is the project's one
+    file hashing helper.
+    """
+    path = Path(path)
+    if is_artifact(path):
+        return read_manifest(path)["sha256"]
+
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    sha256 = hashlib.sha256()
+    for file_path in files:
+        if path.is_dir():
+            sha256.update(f"{file_path.relative_to(path)}\n".encode())
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def model_size(path: Path) -> int:
+    """
+    Returns the size in bytes of a saved model file or directory.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+
+def trained_dtype_policy(path: Path) -> str:
+    """
+    Returns the dtype policy a model was trained in, as recorded in the manifest of its model artifact,
+    or `float32` for a legacy model file or an artifact saved without it.
+
+    The saved layers are float32 either way. Running the model in this policy reproduces the
+    validation predictions training stored with it, whatever the current `MIXED_PRECISION` is.
+    """
+    path = Path(path)
+    if not is_artifact(path):
+        return "float32"
+    return read_manifest(path).get("metadata", {}).get("dtype_policy", "float32")
+
+
+def _tensor_specs(tensors: list) -> list:
+    return [{"name": tensor.name, "shape": tensor.shape.as_list(), "dtype": tensor.dtype.name} for tensor in tensors]
+
+
+def _zero_initializers(config):
+    """
+    Replaces every initializer in a Keras model config with `Zeros`. The variables of a loaded model
+    are overwritten with the stored weights anyway, and drawing random initial values for every
+    kernel (e.g. Glorot for the 15M VGG16 weights) costs more than reading the weights.
+    """
+    if isinstance(config, dict):
+        return {
+            key: {"class_name": "Zeros", "config": {}}
+            if key.endswith("_initializer") and isinstance(value, dict) and "class_name" in value
+            else _zero_initializers(value)
+            for key, value in config.items()
+        }
+    if isinstance(config, list):
+        return [_zero_initializers(value) for value in config]
+    return config
+
+
+class ModelArtifactStore:
+    """
+    Versioned store of trained models under `root_dir`, one directory per version:
+
+        root_dir/<name>/v0001/
+            model.json      the Keras architecture (`model.to_json()`)
+            weights.bin     every weight as raw little-endian bytes, 64-byte aligned
+            manifest.json   format version, SHA-256 hash, parameters, input/output signature,
+                            the offset, shape and dtype of every weight, and creation time
+
+    A version is written to a temporary directory that is renamed once complete, and saving a model
+    identical to an existing version (same hash) returns that version instead of writing a new one.
+    The paths the pipeline stages write (e.g. `artifacts/training/model` and `model/model`) are links
+    to a version (see `link_artifact`), so a model is stored once however many paths refer to it.
+    Only the newest `versions_to_keep` versions of every name are kept; links stay valid when their
+    version is removed, as they are hard links.
+
+    Loading (see `load_model`) builds the model from its architecture without random initialization
+    and fills its variables from a read-only memory map of the weights file, skipping HDF5 entirely.
+    """
+
+    def __init__(self, root_dir: Path, versions_to_keep: int = 3):
+        self.root_dir = Path(root_dir)
+        self.versions_to_keep = max(1, versions_to_keep)
+
+
+    def versions(self, name: str) -> list:
+        """
+        Returns the complete versions of `name`, oldest first.
+        """
+        directory = self.root_dir / name
+        if not directory.is_dir():
+            return []
+        return sorted(path for path in directory.glob("v*") if is_artifact(path))
+
+
+    def save(self, model: tf.keras.Model, name: str, params: dict = None, metadata: dict = None) -> Path:
+        """
+        Saves `model` as a new version of `name`, unless an identical version exists.
+
+        Args:
+            model (tf.keras.Model): The model to save. Only its architecture and weights are stored; the
+                optimizer state is not, and loaded models are not compiled.
+            name (str): The model name, e.g. "model" or "base_model_updated".
+            params (dict, optional): The parameters the model was built or trained with, recorded in the manifest.
+            metadata (dict, optional): Any other JSON-serializable values to record, e.g. the hash of the base model.
+
+        Returns:
+            Path: The version directory.
+        """
+        start = time.perf_counter()
+        directory = self.root_dir / name
+        os.makedirs(directory, exist_ok=True)
+        tmp_dir = directory / f".tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        sha256 = hashlib.sha256()
+        config = model.to_json().encode()
+        sha256.update(config)
+        with open(tmp_dir / CONFIG_FILE, "wb") as f:
+            f.write(config)
+
+        weights, offset = [], 0
+        with open(tmp_dir / WEIGHTS_FILE, "wb") as f:
+            for variable in model.weights:
+                array = np.ascontiguousarray(variable.numpy())
+                array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+                padding = -offset % ALIGNMENT
+                data = b"\0" * padding + array.tobytes()
+                f.write(data)
+                sha256.update(data)
+                offset += padding
+                weights.append({"name": variable.name, "shape": list(array.shape), "dtype": array.dtype.str, "offset": offset})
+                offset += array.nbytes
+
+        content_hash = sha256.hexdigest()
+        for existing in reversed(self.versions(name)):
+            if read_manifest(existing)["sha256"] == content_hash:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                logger.info(f"Model {name} is unchanged, reusing version {existing.name} at: {existing}")
+                return existing
+
+        versions = self.versions(name)
+        version = f"v{int(versions[-1].name[1:]) + 1 if versions else 1:04d}"
+        manifest = {
+            "format": FORMAT,
+            "format_version": FORMAT_VERSION,
+            "name": name,
+            "version": version,
+            "sha256": content_hash,
+            "created": time.time(),
+            "tensorflow_version": tf.__version__,
+            "params": params or {},
+            "inputs": _tensor_specs(model.inputs),
+            "outputs": _tensor_specs(model.outputs),
+            "num_parameters": int(model.count_params()),
+            "weights_bytes": offset,
+            "weights": weights,
+            "metadata": metadata or {},
+        }
+        # the manifest is written last: a directory without one is never treated as an artifact
+        with open(tmp_dir / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=4, default=str)
+
+        final_dir = directory / version
+        os.replace(tmp_dir, final_dir)
+        logger.info(f"Saved model {name} {version} (sha256={content_hash[:12]}, {offset / 2**20:.1f} MiB) "
+                    f"in {time.perf_counter() - start:.2f}s at: {final_dir}")
+        self._prune(name, keep=final_dir)
+        return final_dir
+
+
+    def _prune(self, name: str, keep: Path):
+        """
+        Removes all but the newest `versions_to_keep` versions of `name`, never `keep`.
+        """
+        for path in self.versions(name)[:-self.versions_to_keep]:
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def link_artifact(artifact_dir: Path, path: Path) -> Path:
+    """
+    Makes `path` a link to the artifact version `artifact_dir`: a directory of hard links to its files
+    (copies where hard links are not supported, e.g. across file systems).
+
+    The link is assembled next to `path` and swapped in with renames, so readers (e.g. a server watching
+    `path`) see either the old or the new model, never a partial one. A legacy model file at `path` is replaced.
+
+    Returns:
+        Path: `path`.
+    """
+    artifact_dir, path = Path(artifact_dir), Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_dir = path.with_name(f".{path.name}.tmp")
+    old_dir = path.with_name(f".{path.name}.old")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for file_name in (CONFIG_FILE, WEIGHTS_FILE, MANIFEST_FILE):
+        try:
+            os.link(artifact_dir / file_name, tmp_dir / file_name)
+        except OSError:
+            shutil.copy2(artifact_dir / file_name, tmp_dir / file_name)
+
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(path, old_dir)
+    elif path.exists() or path.is_symlink():
+        os.remove(path)
+    os.replace(tmp_dir, path)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return path
+
+
+def load_model(path: Path) -> tf.keras.Model:
+    """
+    Loads a model for inference (or for training after compiling it again).
+
+    A model artifact (see `ModelArtifactStore`) is rebuilt from its architecture with zero initializers,
+    and its weights are copied into the variables straight from a read-only memory map of the weights
+    file. The variables own their memory, so every process that loads the model holds its own copy of
+    the weights. Any other path (a legacy `.h5` or `.keras` file or a SavedModel directory) is loaded
+    with `tf.keras.models.load_model`. Either way the model is not compiled.
+
+    Args:
+        path (Path): The artifact directory or model file.
+
+    Returns:
+        tf.keras.Model: The loaded model.
+
+    Raises:
+        ValueError: If the artifact has an unknown format version or does not match its architecture.
+    """
+    path = Path(path)
+    if not is_artifact(path):
+        return tf.keras.models.load_model(path, compile=False)
+
+    manifest = read_manifest(path)
+    if manifest.get("format") != FORMAT or manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format {manifest.get('format')} "
+                         f"version {manifest.get('format_version')} at: {path}")
+
+    with open(path / CONFIG_FILE) as f:
+        config = json.load(f)
+    model = tf.keras.models.model_from_json(json.dumps(_zero_initializers(config)))
+    if len(model.weights) != len(manifest["weights"]):
+        raise ValueError(f"The model at {path} has {len(model.weights)} weights, its manifest lists {len(manifest['weights'])}")
+
+    if manifest["weights"]:
+        buffer = np.memmap(path / WEIGHTS_FILE, dtype=np.uint8, mode="r")
+        model.set_weights([
+            np.ndarray(weight["shape"], dtype=weight["dtype"], buffer=buffer, offset=weight["offset"])
+            for weight in manifest["weights"]
+        ])
+    return model
@@ -0,0 +1,140 @@
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from cnnClassifier.components.model_artifact import model_fingerprint
+from cnnClassifier.constants import EXPORT_FILES
+from cnnClassifier.utils.common import LazyModule
+
+# imported on first use, when an exported model is loaded
+tf = LazyModule("tensorflow")
+
+
+class TFLiteModel:
+    """
+    Runs a TFLite model on batches of float32 images.
+
+    The interpreter's input is resized to the batch size of each call (re-allocating tensors only
+    when the batch size changes). A TFLite interpreter is not thread-safe, so calls are serialized.
+    """
+
+    def __init__(self, path: Path, num_threads: int = None):
+        self.path = Path(path)
+        self.interpreter = tf.lite.Interpreter(model_path=str(path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+
+
+    def __call__(self, batch) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output["index"]).copy()
+
+
+class OnnxModel:
+    """
+    Runs an ONNX model on batches of float32 images with ONNX Runtime on CPU.
+    """
+
+    def __init__(self, path: Path, num_threads: int = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("Serving the onnx backend requires `onnxruntime` (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+
+    def __call__(self, batch) -> np.ndarray:
+        return self.session.run(None, {self._input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+
+def configure_threads(intra_op_threads: int, inter_op_threads: int):
+    """
+    Sets the thread budget of this process. Must be called before TensorFlow runs its first op.
+
+    `intra_op_threads` bounds the threads used inside one op (and the TFLite/ONNX threads, see
+    `thread_budget`); `inter_op_threads` bounds the ops run in parallel. 0 keeps the runtime default.
+    """
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def thread_budget() -> int:
+    """
+    Returns the intra-op thread budget set by `configure_threads`, or None for the runtime default.
+    """
+    return tf.config.threading.get_intra_op_parallelism_threads() or None
+
+
+def check_export_accuracy(backend: str, path: Path, report_path: Path, max_accuracy_drop: float) -> float:
+    """
+    Checks the export report (see `ModelExport.export`) before a quantized backend is served: the report
+    has to cover the very file at `path` (by its hash), and the variant's validation accuracy may be at
+    most `max_accuracy_drop` below the accuracy of the Keras model it was exported from.
+
+    Args:
+        backend (str): The exported variant, e.g. "tflite_int8".
+        path (Path): The exported model file about to be served.
+        report_path (Path): The export report.
+        max_accuracy_drop (float): The largest tolerated accuracy drop, e.g. 0.01 for one percentage point.
+
+    Returns:
+        float: The accuracy drop of the variant.
+
+    Raises:
+        ValueError: If the report is missing, does not cover this file, or shows a larger accuracy drop.
+    """
+    try:
+        with open(report_path) as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Refusing to serve {backend}: no export report at {report_path}, run the model export stage") from None
+
+    entry, baseline = report.get(backend), report.get("keras")
+    if entry is None or baseline is None or entry.get("sha256") != model_fingerprint(path):
+        raise ValueError(f"Refusing to serve {backend}: the export report {report_path} does not cover {path}, "
+                         f"run the model export stage again")
+
+    drop = baseline["accuracy"] - entry["accuracy"]
+    if drop > max_accuracy_drop:
+        raise ValueError(f"Refusing to serve {backend}: its validation accuracy {entry['accuracy']:.4f} is {drop:.4f} "
+                         f"below the Keras model's {baseline['accuracy']:.4f} (max_accuracy_drop: {max_accuracy_drop})")
+    return drop
+
+
+def load_backend(backend: str, path: Path, num_threads: int = None):
+    """
+    Loads an exported model variant as a callable mapping an image batch to class probabilities.
+
+    Args:
+        backend (str): One of the keys of `EXPORT_FILES`.
+        path (Path): The exported model file.
+        num_threads (int, optional): The number of CPU threads used per call. Defaults to the runtime default.
+
+    Returns:
+        TFLiteModel | OnnxModel: The loaded model.
+    """
+    if backend.startswith("tflite"):
+        return TFLiteModel(path, num_threads=num_threads)
+    if backend == "onnx":
+        return OnnxModel(path, num_threads=num_threads)
+    raise ValueError(f"Unknown model backend {backend}, expected 'keras' or one of {list(EXPORT_FILES)}")
@@ -1,10 +1,17 @@
 import mlflow
-import mlflow.keras
 from pathlib import Path
 import tensorflow as tf
 from urllib.parse import urlparse
 
 
+from cnnClassifier import logger
+from cnnClassifier.components.data_pipeline import ImageDatasetBuilder
+from cnnClassifier.components.data_split import DatasetSplit
+from cnnClassifier.components.evaluation_metrics import classification_metrics, load_predictions, save_predictions
+from cnnClassifier.components.image_cache import ImageCache
+from cnnClassifier.components import model_artifact
+from cnnClassifier.components.performance import with_dtype_policy
+from cnnClassifier.components.preprocessing import ImagePreprocessor
 from cnnClassifier.entity.config_entity import EvaluationConfig
 from cnnClassifier.utils.common import save_json
 
@@ -14,86 +21,120 @@ class Evaluation:
 
     def __init__(self, config: EvaluationConfig):
         self.config = config
+        self.split = DatasetSplit(self.config.split_path, self.config.training_data, self.config.params_validation_split)
 
 
     def _valid_generator(self):
         """
-        Generates a data generator for the validation set.
+        Generates a tf.data pipeline over the validation subset of the persisted split (see `DatasetSplit`),
+        the same images training validated on, in the split's order. Images are preprocessed with the spec
+        saved next to the trained model (see `ImagePreprocessor.for_model`), or the `PREPROCESSING` parameters
+        for a model saved without one.
 
-        This method creates a data generator for the validation set using the `ImageDataGenerator` class from the `tensorflow.keras.preprocessing.image` module. 
-        It sets the `rescale` parameter to `1./255` and the `validation_split` parameter to `0.30`.
-        It also sets the `target_size` parameter to `self.config.params_image_size[:-1]`, the `batch_size` parameter to `self.config.params_batch_size`,
-            and the `interpolation` parameter to `"bilinear"`.
+        When `params_image_cache` is set and the image cache built at ingestion is up to date, the validation
+        images are sliced from the cache's memory map instead of being decoded again.
 
-        The generated data generator is then used to flow data from the specified directory, using the `validation` subset and without shuffling. 
-        The `dataflow_kwargs` dictionary is unpacked to pass additional keyword arguments to the `flow_from_directory` method.
-
-        This method does not return anything. Instead, it sets the `self.valid_generator` attribute to the generated data generator.
+        This method does not return anything. Instead, it sets the `self.valid_generator` attribute to the generated pipeline.
         """
-         
-        datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split = 0.30
+        valid_paths, valid_labels, class_names = self.split.subset("validation")
+        preprocessor = ImagePreprocessor.for_model(
+            self.config.path_of_model,
+            default=ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
         )
-
-        dataflow_kwargs = dict(
-            target_size = self.config.params_image_size[:-1],
-            batch_size = self.config.params_batch_size,
-            interpolation = "bilinear"
+        builder = ImageDatasetBuilder(
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            preprocessor=preprocessor
         )
 
-        valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
-            **datagenerator_kwargs
-        )
+        if self.config.params_image_cache:
+            cached = ImageCache(self.config.image_cache_dir, self.config.params_image_size, preprocessor).load(self.config.training_data)
+            if cached is not None:
+                images, labels, manifest = cached
+                self.valid_generator = builder.build_from_arrays(
+                    images, labels, ImageCache.indices_of(manifest, valid_paths, self.config.training_data),
+                    len(class_names), training=False
+                )
+                return
 
-        self.valid_generator = valid_datagenerator.flow_from_directory(
-            directory=self.config.training_data,
-            subset="validation",
-            shuffle=False,
-            **dataflow_kwargs
-        )
+        self.valid_generator = builder.build(valid_paths, valid_labels, len(class_names), training=False, name="validation")
 
 
     @staticmethod
     def load_model(path: Path) -> tf.keras.Model:
         """
-        Load a Keras model from the specified path.
+        Load a Keras model from the specified path, a model artifact or a legacy model file (see `model_artifact.load_model`),
+        in the dtype policy it was trained in (see `model_artifact.trained_dtype_policy`).
 
         Args:
-            path (Path): The path to the model file.
+            path (Path): The path to the model.
 
         Returns:
             tf.keras.Model: The loaded Keras model.
         """
-        return tf.keras.models.load_model(path)
+        return with_dtype_policy(model_artifact.load_model(path), model_artifact.trained_dtype_policy(path))
     
 
-    def evaluate(self):
+    def evaluate(self, write_scores: bool = True):
         """
         Evaluate the model using the validation data.
 
-        This function loads the model from the specified path using the `load_model` method. 
-        It then generates a data generator for the validation set using the `_valid_generator` method. 
-        The model is evaluated using the generated data generator and the evaluation score is stored in the `score` attribute. 
-        Finally, the evaluation score is saved using the `save_score` method.
+        The metrics are computed from the per-sample probabilities of the model on the validation subset.
+        Training stores them for the model it saved, so when `predictions_path` holds the probabilities of
+        this exact model on the current split they are reused and no image is decoded. Otherwise the
+        model is loaded and run once over the validation set (see `_valid_generator`) and its probabilities
+        are stored.
+
+        The loss, accuracy, precision/recall, ROC-AUC and confusion matrix are then computed from the
+        probabilities (see `classification_metrics`) and saved using the `save_score` method.
 
         Parameters:
-            None
+            write_scores (bool, optional): Whether to save the scores with `save_score`. The hyperparameter sweep
+                only keeps them in `self.metrics` and `self.scores`. Defaults to True.
 
         Returns:
             None
         """
-        self.model = self.load_model(self.config.path_of_model)
-        self._valid_generator()
-        self.score = self.model.evaluate(self.valid_generator)
-        self.save_score()
+        split = self.split.load()
+        model_sha256 = model_artifact.model_fingerprint(self.config.path_of_model)
+        predictions = load_predictions(self.config.predictions_path, model_sha256, split["fingerprint"])
+
+        if predictions is not None:
+            logger.info(f"Reusing the validation predictions of this model at: {self.config.predictions_path}")
+            probabilities = predictions["probabilities"]
+        else:
+            logger.info("No stored validation predictions of this model, running the validation pass")
+            self.model = self.load_model(self.config.path_of_model)
+            self._valid_generator()
+            probabilities = self.model.predict(self.valid_generator)
+            save_predictions(
+                self.config.predictions_path,
+                probabilities,
+                labels=split["validation"]["labels"],
+                files=split["validation"]["files"],
+                class_names=split["class_names"],
+                model_sha256=model_sha256,
+                split_fingerprint=split["fingerprint"]
+            )
+
+        self.metrics = classification_metrics(probabilities, split["validation"]["labels"], split["class_names"])
+        self.score = [self.metrics["loss"], self.metrics["accuracy"]]
+        # ROC-AUC is undefined (None) when the validation set has a single class
+        self.scores = {
+            name: value for name, value in self.metrics.items()
+            if name in ("loss", "accuracy", "precision", "recall", "roc_auc") and value is not None
+        }
+        if write_scores:
+            self.save_score()
 
 
     def save_score(self):
         """
         Save the evaluation score of the model to a JSON file.
 
-        This function saves the evaluation score of the model to a JSON file named "scores.json". The score is stored in a dictionary with keys "loss" and "accuracy", corresponding to the first and second elements of the `self.score` attribute, respectively. The `save_json` function from the `utils` module is used to save the dictionary to the file.
+        This function saves the scalar metrics (loss, accuracy, precision, recall and ROC-AUC) to "scores.json",
+        which DVC tracks as the metrics of the pipeline, and the full report with the per-class metrics and the
+        confusion matrix to `report_path`. The `save_json` function from the `utils` module is used to save both files.
 
         Parameters:
             self (object): The instance of the class.
@@ -101,11 +142,8 @@ class Evaluation:
         Returns:
             None
         """
-        scores = {
-            "loss": self.score[0],
-            "accuracy": self.score[1]
-        }
-        save_json(path=Path("scores.json"), data=scores)
+        save_json(path=Path("scores.json"), data=self.scores)
+        save_json(path=self.config.report_path, data=self.metrics)
 
     
     def log_into_mlflow(self):
@@ -113,9 +151,9 @@ class Evaluation:
         Logs the evaluation metrics and the model into MLFlow.
 
         This function sets the MLFlow registry URI and retrieves the tracking URI to determine the type of store being used.
-        It then starts a new run in MLFlow and logs the evaluation parameters and metrics.
-        If the store is not a file store, the model is registered in the MLFlow Model Registry.
-        The model is logged into MLFlow with the name "model" and the registered model name "VGG16Model".
+        It then starts a new run in MLFlow and logs the evaluation parameters, the scalar metrics and the full report.
+        The trained model (its artifact directory with the manifest, or a legacy model file) is uploaded as it is to the
+        "model" artifact directory instead of being loaded and serialized again. If the store is not a file store, it is registered in the MLFlow Model Registry as "VGG16Model".
 
         Parameters:
             self (object): The instance of the class.
@@ -127,19 +165,20 @@ class Evaluation:
         tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
         print(tracking_url_type_store)
 
-        with mlflow.start_run():
+        with mlflow.start_run() as run:
             mlflow.log_params(self.config.all_params)
-            mlflow.log_metrics({
-                "loss": self.score[0],
-                "accuracy": self.score[1]
-            })
-            
+            mlflow.log_metrics(self.scores)
+            mlflow.log_dict(self.metrics, "evaluation_report.json")
+            model_path = Path(self.config.path_of_model)
+            if model_path.is_dir():
+                mlflow.log_artifacts(str(model_path), artifact_path=f"model/{model_path.name}")
+            else:
+                mlflow.log_artifact(str(model_path), artifact_path="model")
+
             # Model registry does not work with file store
             if tracking_url_type_store != "file":
                 # Register the model
                 # There are other ways to use the Model Registry, which depends on the use case,
                 # please refer to the doc for more information:
                 # https://mlflow.org/docs/latest/model-registry.html#api-workflow
-                mlflow.keras.log_model(self.model, "model", registered_model_name="VGG16Model")
-            else:
-                mlflow.keras.log_model(self.model, "model")
\ No newline at end of file
+                mlflow.register_model(f"runs:/{run.info.run_id}/model", "VGG16Model")
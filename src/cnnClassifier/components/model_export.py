@@ -0,0 +1,171 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier import logger
+from cnnClassifier.components.data_pipeline import ImageDatasetBuilder
+from cnnClassifier.components.data_split import DatasetSplit
+from cnnClassifier.components.model_artifact import load_model, model_fingerprint, model_size
+from cnnClassifier.components.model_backends import load_backend
+from cnnClassifier.components.model_registry import build_serving_function
+from cnnClassifier.components.preprocessing import ImagePreprocessor, preprocessing_path
+from cnnClassifier.constants import EXPORT_FILES
+from cnnClassifier.entity.config_entity import ModelExportConfig
+from cnnClassifier.utils.common import save_json
+
+
+class ModelExport:
+
+    def __init__(self, config: ModelExportConfig):
+        self.config = config
+        self.preprocessor = ImagePreprocessor.for_model(
+            self.config.model_path,
+            default=ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
+        )
+        self.builder = ImageDatasetBuilder(
+            image_size=self.config.params_image_size,
+            batch_size=self.config.params_batch_size,
+            seed=self.config.params_seed,
+            preprocessor=self.preprocessor
+        )
+        self.split = DatasetSplit(self.config.split_path, self.config.training_data, self.config.params_validation_split)
+
+
+    def _representative_dataset(self):
+        """
+        Yields up to `representative_samples` single training images (preprocessed like in training),
+        which the int8 converter uses to calibrate the activation ranges.
+        """
+        paths, labels, class_names = self.split.subset("training")
+        rng = np.random.default_rng(self.config.params_seed)
+        selected = rng.permutation(len(paths))[:self.config.representative_samples]
+        dataset = self.builder.build(
+            [paths[i] for i in selected], [labels[i] for i in selected], len(class_names), training=False
+        ).unbatch().batch(1)
+        for images, _ in dataset:
+            yield [images]
+
+
+    def _convert_tflite(self, model: tf.keras.Model, variant: str) -> bytes:
+        """
+        Converts the model to TFLite, with post-training quantization for all but `tflite_float32`.
+
+        - `tflite_float32`: float32 weights and activations, the same numerics as the Keras model.
+        - `tflite_dynamic`: int8 weights, float activations (dynamic-range quantization).
+        - `tflite_float16`: float16 weights.
+        - `tflite_int8`: int8 weights and activations, calibrated on training images. The model keeps
+          float32 inputs and outputs, so it is a drop-in replacement for the Keras model.
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if variant != "tflite_float32":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == "tflite_float16":
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == "tflite_int8":
+            converter.representative_dataset = self._representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        elif variant not in ("tflite_float32", "tflite_dynamic"):
+            raise ValueError(f"Unknown TFLite variant {variant}")
+        return converter.convert()
+
+
+    def _export_onnx(self, model: tf.keras.Model, path: Path) -> bool:
+        """
+        Converts the model to ONNX with `tf2onnx`, if it is installed.
+
+        Returns:
+            bool: True if the model was exported, False if `tf2onnx` is not available.
+        """
+        try:
+            import tf2onnx
+        except ImportError:
+            logger.warning("Skipping the onnx export: `tf2onnx` is not installed (pip install tf2onnx onnxruntime)")
+            return False
+
+        height, width = self.preprocessor.image_size
+        input_signature = (tf.TensorSpec([None, height, width, self.preprocessor.channels], tf.float32, name="images"),)
+        tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=str(path))
+        return True
+
+
+    def _evaluate(self, predict_fn, dataset: tf.data.Dataset) -> float:
+        """
+        Computes the accuracy of a model variant on the validation split.
+        """
+        correct, total = 0, 0
+        for images, labels in dataset:
+            probabilities = np.asarray(predict_fn(images.numpy()))
+            correct += int(np.sum(probabilities.argmax(axis=1) == labels.numpy().argmax(axis=1)))
+            total += len(labels)
+        return correct / total if total else 0.0
+
+
+    def _latency(self, predict_fn) -> float:
+        """
+        Measures the median single-image latency of a model variant on CPU, in milliseconds.
+        """
+        image = np.random.default_rng(0).uniform(size=[1] + list(self.config.params_image_size)).astype(np.float32)
+        predict_fn(image)
+        latencies = []
+        for _ in range(self.config.latency_iterations):
+            start = time.perf_counter()
+            predict_fn(image)
+            latencies.append(time.perf_counter() - start)
+        return float(np.median(latencies) * 1000.0)
+
+
+    def export(self) -> dict:
+        """
+        Exports the trained model to the configured formats and reports their accuracy, size and latency.
+
+        Every variant in `formats` (see `EXPORT_FILES`) is written under `root_dir`. Each variant, and the
+        original Keras model as baseline, is then evaluated on the validation subset of the shared persisted
+        split (see `DatasetSplit`, sized by `VALIDATION_SPLIT`) that training and evaluation use, and timed
+        on single images on CPU. The results are saved to `report_path`.
+        Variants whose converter is not installed (`tf2onnx` for onnx) are skipped with a warning.
+
+        The preprocessing spec of the trained model is saved next to every exported file (see
+        `preprocessing_path`), so serving an exported backend preprocesses exactly like training did. The
+        report also records the hash of every file, so the serving accuracy gate of the quantized variants
+        (see `check_export_accuracy`) only trusts the accuracy measured on the file it loads.
+
+        Returns:
+            dict: The report, mapping each variant to its path, SHA-256 hash, preprocessing spec path, size in
+            MB, accuracy and p50 latency in ms.
+        """
+        model = load_model(self.config.model_path)
+
+        variants = {"keras": (Path(self.config.model_path), build_serving_function(model, self.config.params_image_size))}
+        for variant in self.config.formats:
+            if variant not in EXPORT_FILES:
+                raise ValueError(f"Unknown export format {variant}, expected one of {list(EXPORT_FILES)}")
+            path = Path(self.config.root_dir) / EXPORT_FILES[variant]
+            start = time.perf_counter()
+            if variant == "onnx":
+                if not self._export_onnx(model, path):
+                    continue
+            else:
+                path.write_bytes(self._convert_tflite(model, variant))
+            self.preprocessor.save(preprocessing_path(path))
+            logger.info(f"Exported {variant} model in {time.perf_counter() - start:.1f}s at: {path}")
+            variants[variant] = (path, load_backend(variant, path))
+
+        valid_paths, valid_labels, class_names = self.split.subset("validation")
+        valid_dataset = self.builder.build(valid_paths, valid_labels, len(class_names), training=False)
+
+        report = {}
+        for variant, (path, predict_fn) in variants.items():
+            report[variant] = {
+                "path": str(path),
+                "sha256": model_fingerprint(path),
+                "preprocessing": str(preprocessing_path(path)) if preprocessing_path(path).exists() else None,
+                "size_mb": round(model_size(path) / 2**20, 2),
+                "accuracy": self._evaluate(predict_fn, valid_dataset),
+                "latency_ms_p50": round(self._latency(predict_fn), 2),
+            }
+            logger.info(f"{variant}: {report[variant]}")
+
+        save_json(path=Path(self.config.report_path), data=report)
+        return report
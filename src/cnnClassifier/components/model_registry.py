@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import MANIFEST_FILE, is_artifact, load_model, model_fingerprint, trained_dtype_policy
+from cnnClassifier.components.model_backends import check_export_accuracy, load_backend, thread_budget
+from cnnClassifier.components.performance import with_dtype_policy
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from cnnClassifier.components.profiling import span
+from cnnClassifier.constants import QUANTIZED_BACKENDS
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.utils.common import LazyModule
+
+# imported on first use, when the first model is loaded
+tf = LazyModule("tensorflow")
+
+
+def build_serving_function(model: tf.keras.Model, image_size: list, jit_compile: bool = False):
+    """
+    Wraps a model in a `tf.function` with a fixed (batch, height, width, 3) float32 input signature.
+
+    Calling the function skips the per-call overhead of `model.predict()` (data adapter, callbacks,
+    retracing checks). With `jit_compile=True` the graph is compiled with XLA, once per batch size.
+
+    Args:
+        model (tf.keras.Model): The model to serve.
+        image_size (list): The [height, width, channels] the model expects.
+        jit_compile (bool, optional): Whether to compile the function with XLA. Defaults to False.
+
+    Returns:
+        tf.types.experimental.GenericFunction: A function mapping an image batch to class probabilities.
+    """
+    height, width = image_size[:2]
+
+    @tf.function(
+        input_signature=[tf.TensorSpec(shape=[None, height, width, 3], dtype=tf.float32, name="images")],
+        jit_compile=jit_compile,
+    )
+    def serve(images):
+        return model(images, training=False)
+
+    return serve
+
+
+def warm_up(serving_fn, image_size: list, batch_sizes: list) -> float:
+    """
+    Runs the serving function once per batch size on zero images so tracing (and XLA compilation)
+    happens before the first real request.
+
+    Returns:
+        float: The warm-up time in seconds.
+    """
+    height, width = image_size[:2]
+    start = time.perf_counter()
+    for batch_size in batch_sizes:
+        serving_fn(tf.zeros([batch_size, height, width, 3], dtype=tf.float32))
+    return time.perf_counter() - start
+
+
+class ServedModel(NamedTuple):
+    """
+    One loaded model with everything needed to serve it. The registry swaps it in as a whole, so a
+    request that takes one snapshot preprocesses, runs and caches consistently on the same model.
+    """
+    model: object
+    serving_fn: object
+    preprocessor: ImagePreprocessor
+    content_hash: str
+
+    @property
+    def predict_fn(self):
+        """
+        The callable mapping an image batch to class probabilities: the graph-compiled serving function
+        when `compiled` is set or the exported model for the TFLite and ONNX backends, otherwise the
+        Keras model itself.
+        """
+        return self.serving_fn if self.serving_fn is not None else self.model
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the serving model.
+
+    The model is loaded once and shared by every request. A background watcher thread checks the model
+    file (for a model artifact, its manifest) every `watch_interval_seconds` through its mtime and size;
+    when these change, the model is re-hashed (an artifact by the hash in its manifest, see
+    `model_fingerprint`) and, if its content really changed, the new model is loaded and warmed up on
+    the watcher thread next to the old one and swapped in. Requests never wait for a reload: reading the
+    served model is a single lock-free reference read, and requests that already hold the old model
+    finish on it, so no request is dropped or delayed during a swap.
+
+    With `compiled` set, every loaded model is also wrapped in a graph-compiled serving function
+    (see `build_serving_function`) that is warmed up before the model is swapped in. For the exported
+    backends (TFLite, ONNX) the loaded model itself is the serving function, and is warmed up the same way.
+
+    The preprocessing spec saved next to the model file (see `ImagePreprocessor.for_model`) is loaded
+    and swapped together with the model in one `ServedModel`, so a request that takes one snapshot (see
+    `get_served`) is always preprocessed for the model it runs on.
+
+    A quantized backend (see `QUANTIZED_BACKENDS`) is only loaded when the export report shows that the
+    file lost at most `max_accuracy_drop` validation accuracy (see `check_export_accuracy`); otherwise the
+    first load fails, and a reload keeps serving the current model.
+    """
+
+    # the watcher never polls more often than this, even with `watch_interval_seconds: 0`
+    MIN_WATCH_INTERVAL = 0.1
+
+    def __init__(self, config: PredictionConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._served = None
+        self._stat = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._metrics = {
+            "load_count": 0,
+            "swap_count": 0,
+            "failed_reload_count": 0,
+            "last_load_seconds": 0.0,
+            "total_load_seconds": 0.0,
+            "last_warmup_seconds": 0.0,
+            "loaded_at": None,
+        }
+
+
+    @staticmethod
+    def _file_stat(path: Path) -> tuple:
+        """
+        Returns the cheap change signature (mtime in ns, size in bytes) of the model file, or of the
+        manifest of a model artifact. A new version linked at `path` always brings a new manifest.
+        """
+        stat = os.stat(Path(path) / MANIFEST_FILE if is_artifact(path) else path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+    @staticmethod
+    def _file_hash(path: Path) -> str:
+        """
+        Returns the SHA-256 hash of the model (see `model_fingerprint`).
+        """
+        return model_fingerprint(path)
+
+
+    def _load(self):
+        """
+        Loads the model file and its preprocessing spec, builds and warms up its serving function, and
+        returns them together with the file's stat signature and content hash.
+
+        Returns:
+            tuple: (model, serving_fn, preprocessor, stat, content_hash, load_seconds, warmup_seconds)
+        """
+        path = self.config.model_path
+        stat = self._file_stat(path)
+        content_hash = self._file_hash(path)
+        preprocessor = ImagePreprocessor.for_model(
+            path, default=ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
+        )
+        if self.config.backend in QUANTIZED_BACKENDS:
+            drop = check_export_accuracy(self.config.backend, path, self.config.export_report_path, self.config.max_accuracy_drop)
+            logger.info(f"Serving {self.config.backend}: {drop:.4f} validation accuracy below the Keras model")
+        start = time.perf_counter()
+        with span("model_load"):
+            if self.config.backend != "keras":
+                model = load_backend(self.config.backend, path, num_threads=thread_budget())
+            else:
+                model = load_model(path)
+                # as trained, so the served probabilities match the stored validation predictions
+                policy = trained_dtype_policy(path)
+                if policy != "float32":
+                    model = with_dtype_policy(model, policy)
+                    logger.info(f"Serving {path} with the {policy} dtype policy")
+        load_seconds = time.perf_counter() - start
+
+        serving_fn, warmup_seconds = None, 0.0
+        with span("model_warmup"):
+            if self.config.backend != "keras":
+                serving_fn = model
+                warmup_seconds = warm_up(serving_fn, self.config.params_image_size, self.config.warmup_batch_sizes)
+            elif self.config.compiled:
+                serving_fn = build_serving_function(model, self.config.params_image_size, jit_compile=self.config.jit_compile)
+                warmup_seconds = warm_up(serving_fn, self.config.params_image_size, self.config.warmup_batch_sizes)
+        return model, serving_fn, preprocessor, stat, content_hash, load_seconds, warmup_seconds
+
+
+    def _install(self, model, serving_fn, preprocessor, stat, content_hash, load_seconds, warmup_seconds):
+        """
+        Atomically replaces the served model and updates the load metrics.
+        """
+        served = ServedModel(model, serving_fn, preprocessor, content_hash)
+        with self._lock:
+            is_swap = self._served is not None
+            self._served = served
+            self._stat = stat
+            self._metrics["load_count"] += 1
+            self._metrics["last_load_seconds"] = load_seconds
+            self._metrics["total_load_seconds"] += load_seconds
+            self._metrics["last_warmup_seconds"] = warmup_seconds
+            self._metrics["loaded_at"] = time.time()
+            if is_swap:
+                self._metrics["swap_count"] += 1
+
+        logger.info(f"Loaded model from {self.config.model_path} (sha256={content_hash[:12]}) in {load_seconds:.2f}s"
+                    + (f", warmed up in {warmup_seconds:.2f}s" if serving_fn is not None else "")
+                    + f", preprocessing: {preprocessor.spec()}")
+
+
+    def load(self):
+        """
+        Loads the model if no model has been loaded yet and starts the watcher thread. Safe to call
+        from several threads.
+
+        Returns:
+            tf.keras.Model | TFLiteModel | OnnxModel: The served model.
+        """
+        with self._reload_lock:
+            if self._served is None:
+                self._install(*self._load())
+                self._start_watcher()
+        return self._served.model
+
+
+    def _start_watcher(self):
+        """
+        Starts the thread that calls `reload_if_changed` every `watch_interval_seconds`, unless
+        hot-swapping is disabled (None or a negative interval).
+        """
+        interval = self.config.watch_interval_seconds
+        if interval is None or interval < 0 or self._watcher is not None:
+            return
+        interval = max(interval, self.MIN_WATCH_INTERVAL)
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+
+    def stop(self, timeout: float = None):
+        """
+        Stops the watcher thread; the current model keeps serving.
+        """
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+
+
+    def reload_if_changed(self) -> bool:
+        """
+        Checks the model file for changes and swaps in the new model if its content changed. Called by
+        the watcher thread, never on a request.
+
+        A changed mtime or size alone only triggers a re-hash; the model is reloaded only when the
+        content hash differs. If loading the new file fails (e.g. it is still being written), the
+        current model keeps serving and the check is retried on the next interval.
+
+        Returns:
+            bool: True if a new model was swapped in, False otherwise.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            # another thread is already reloading
+            return False
+        try:
+            try:
+                stat = self._file_stat(self.config.model_path)
+            except OSError as e:
+                logger.warning(f"Model file {self.config.model_path} is not readable, keeping current model: {e}")
+                return False
+
+            if stat == self._stat:
+                return False
+
+            content_hash = self._file_hash(self.config.model_path)
+            if content_hash == self.content_hash:
+                with self._lock:
+                    self._stat = stat
+                return False
+
+            try:
+                self._install(*self._load())
+            except Exception as e:
+                self._metrics["failed_reload_count"] += 1
+                logger.exception(f"Failed to reload model from {self.config.model_path}, keeping current model: {e}")
+                return False
+            return True
+        finally:
+            self._reload_lock.release()
+
+
+    def get_served(self) -> ServedModel:
+        """
+        Returns the current `ServedModel` (model, serving function, preprocessor and hash, which always
+        belong together), loading it on first use. A lock-free read: model changes are picked up by the
+        watcher thread, never on the calling request.
+        """
+        served = self._served
+        if served is None:
+            self.load()
+            served = self._served
+        return served
+
+
+    def get_model(self) -> tf.keras.Model:
+        """
+        Returns the current model (see `get_served`).
+        """
+        return self.get_served().model
+
+
+    def get_serving_fn(self):
+        """
+        Returns the callable that maps an image batch to class probabilities for the current model
+        (see `ServedModel.predict_fn`).
+        """
+        return self.get_served().predict_fn
+
+
+    def get_preprocessor(self) -> ImagePreprocessor:
+        """
+        Returns the preprocessor of the current model. Use `get_served` to get it together with the model.
+        """
+        return self.get_served().preprocessor
+
+
+    @property
+    def content_hash(self) -> str:
+        """
+        SHA-256 hash of the currently served model file, or None if no model is loaded.
+        """
+        served = self._served
+        return served.content_hash if served is not None else None
+
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of the registry metrics: load and swap counts, failed reloads,
+        last and total load time and last warm-up time in seconds, load timestamp, the served model hash and
+        its preprocessing spec.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            served = self._served
+        metrics["model_path"] = str(self.config.model_path)
+        metrics["model_sha256"] = served.content_hash if served is not None else None
+        metrics["preprocessing"] = served.preprocessor.spec() if served is not None else None
+        return metrics
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(config: PredictionConfig) -> ModelRegistry:
+    """
+    Returns the process-wide ModelRegistry for the configured model path, creating it on first use.
+
+    Args:
+        config (PredictionConfig): The prediction configuration.
+
+    Returns:
+        ModelRegistry: The registry shared by every caller in this process.
+    """
+    key = os.path.abspath(config.model_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModelRegistry(config)
+            _registries[key] = registry
+    return registry
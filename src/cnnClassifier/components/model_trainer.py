@@ -1,52 +1,264 @@
+from dataclasses import asdict
 from pathlib import Path
+import time
+import numpy as np
 import tensorflow as tf
 
 from cnnClassifier import logger
+from cnnClassifier.components.checkpoints import CheckpointCallback, TrainingCheckpoints
+from cnnClassifier.components.distribution import create_strategy, is_chief, shard_by_data
+from cnnClassifier.components.data_pipeline import ImageDatasetBuilder, fingerprint_files
+from cnnClassifier.components.data_split import DatasetSplit
+from cnnClassifier.components.evaluation_metrics import save_predictions
+from cnnClassifier.components.feature_cache import BottleneckFeatureCache, features_dataset, split_frozen_backbone
+from cnnClassifier.components.image_cache import ImageCache
+from cnnClassifier.components.model_artifact import ModelArtifactStore, link_artifact, load_model, model_fingerprint
+from cnnClassifier.components.performance import apply_performance_profile, with_dtype_policy
+from cnnClassifier.components.preprocessing import PIL_INTERPOLATIONS, ImagePreprocessor, preprocessing_path
+from cnnClassifier.components.profiling import get_metrics, profile_capture
 from cnnClassifier.entity.config_entity import TrainingConfig
 
 
+class StepTimeLogger(tf.keras.callbacks.Callback):
+    """
+    Logs the mean training step time and throughput of every epoch, and records every step in the
+    `training_step_duration_seconds` histogram.
+    """
+
+    def __init__(self, batch_size: int):
+        super().__init__()
+        self.batch_size = batch_size
+
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.step_times = []
+
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.step_start = time.perf_counter()
+
+
+    def on_train_batch_end(self, batch, logs=None):
+        step_time = time.perf_counter() - self.step_start
+        self.step_times.append(step_time)
+        get_metrics().observe("training_step_duration_seconds", step_time)
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        # the first step of the first epoch includes tracing (and XLA compilation)
+        step_times = self.step_times[1:] if epoch == 0 else self.step_times
+        if not step_times:
+            return
+        step_ms = 1000.0 * sum(step_times) / len(step_times)
+        logger.info(f"Epoch {epoch + 1}: mean step time {step_ms:.1f} ms, "
+                    f"{1000.0 * self.batch_size / step_ms:.1f} images/sec")
+
+
+class StepProfiler(tf.keras.callbacks.Callback):
+    """
+    Captures a cProfile or TensorFlow profile of a single training step, counted across epochs from
+    the start of this run.
+    """
+
+    def __init__(self, kind: str, step: int, output_dir: Path):
+        super().__init__()
+        self.kind = kind
+        self.step = step
+        self.output_dir = output_dir
+        self.steps_seen = 0
+        self.capture = None
+
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.steps_seen == self.step:
+            self.capture = profile_capture(self.kind, self.output_dir, f"train_step_{self.step}_{int(time.time())}")
+            self.capture.__enter__()
+
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self.capture is not None:
+            self.capture.__exit__(None, None, None)
+            self.capture = None
+        self.steps_seen += 1
+
+
 class Training:
 
     def __init__(self, config: TrainingConfig):
         self.config = config
+        self.split = DatasetSplit(self.config.split_path, self.config.training_data, self.config.params_validation_split)
+        self.preprocessor = ImagePreprocessor.from_params(self.config.params_image_size, self.config.params_preprocessing)
 
 
     def get_base_model(self):
         """
         Load the base model from the specified path and compile it with the specified optimizer, loss function, and metrics.
 
+        The `PERFORMANCE` profile is applied first: oneDNN and the thread counts for the process, and the
+        dtype policy for the model (`mixed_bfloat16` rebuilds it with bfloat16 compute and float32 weights).
+
+        The model is then created in the scope of the `DISTRIBUTION` strategy. `BATCH_SIZE` is the batch
+        of one replica, so the global batch is `BATCH_SIZE` times the number of replicas, and with
+        `SCALE_LEARNING_RATE` the learning rate is scaled by the same factor (linear scaling rule).
+
+        Finally the latest checkpoint of the same configuration (parameters other than `EPOCHS`, base model,
+        training files and number of replicas) up to `EPOCHS` is looked up; if there is one, training resumes
+        after its epoch, so raising `EPOCHS` continues a finished run.
+
         Parameters:
             None
 
         Returns:
             None
         """
-        self.model = tf.keras.models.load_model(self.config.updated_base_model_path, compile=False)
-        
-        self.model.compile(
-            optimizer=tf.keras.optimizers.SGD(learning_rate=self.config.params_learning_rate),
+        self.performance = apply_performance_profile(
+            mixed_precision=self.config.params_mixed_precision,
+            intra_op_threads=self.config.params_intra_op_threads,
+            inter_op_threads=self.config.params_inter_op_threads,
+            onednn=self.config.params_onednn
+        )
+        self.performance["xla_jit"] = self.config.params_xla_jit
+
+        self.strategy = create_strategy(self.config.params_distribution_strategy, self.config.params_cpu_devices)
+        replicas = self.strategy.num_replicas_in_sync
+        self.global_batch_size = self.config.params_batch_size * replicas
+        self.learning_rate = self.config.params_learning_rate
+        if self.config.params_scale_learning_rate:
+            self.learning_rate *= replicas
+        logger.info(f"Training on {replicas} replica(s) with {type(self.strategy).__name__}: "
+                    f"global batch size {self.global_batch_size}, learning rate {self.learning_rate}")
+
+        with self.strategy.scope():
+            model = load_model(self.config.updated_base_model_path)
+            self.model = with_dtype_policy(model, self.performance["dtype_policy"])
+            self._compile(self.model)
+
+        config_hash = TrainingCheckpoints.make_config_hash(
+            self.config, self.split.fingerprint, replicas
+        )
+        self.checkpoints = TrainingCheckpoints(
+            self.config.checkpoint_dir, config_hash, self.config.checkpoints_to_keep, is_chief=is_chief(self.strategy)
+        )
+        self.resume_state = self.checkpoints.latest(max_epoch=self.config.params_epochs)
+        self.initial_epoch = self.resume_state["epoch"] if self.resume_state else 0
+        self.skip_elements = self.resume_state["elements_consumed"] if self.resume_state else 0
+        if self.resume_state:
+            logger.info(f"Found a checkpoint after epoch {self.initial_epoch} of {self.config.params_epochs} (config sha256={config_hash})")
+
+
+    def _compile(self, model: tf.keras.Model):
+        """
+        Compiles a model with the configured SGD optimizer, categorical cross-entropy and the tracked metrics,
+        with XLA when `PERFORMANCE.XLA_JIT` is set.
+        """
+        model.compile(
+            optimizer=tf.keras.optimizers.SGD(learning_rate=self.learning_rate),
             loss=tf.keras.losses.CategoricalCrossentropy(),
-            metrics=["accuracy", tf.keras.metrics.Precision(), tf.keras.metrics.Recall()]
+            metrics=["accuracy", tf.keras.metrics.Precision(), tf.keras.metrics.Recall()],
+            jit_compile=self.config.params_xla_jit
         )
 
 
     def train_valid_generator(self):
+        """
+        Initializes the training and validation data for the model.
+
+        The input pipeline is selected by the `DATA_PIPELINE` parameter: `tf_data` builds parallel
+        tf.data pipelines (see `_train_valid_dataset`), anything else uses the legacy
+        `ImageDataGenerator` generators (see `_train_valid_keras_generator`). Both use the same
+        persisted split (`VALIDATION_SPLIT`, see `DatasetSplit`), preprocessing (`PREPROCESSING`, see
+        `ImagePreprocessor`) and augmentation.
+
+        Distributed training (more than one replica) needs the tf.data pipelines.
+        """
+        if self.config.params_data_pipeline != "tf_data" and self.strategy.num_replicas_in_sync > 1:
+            raise ValueError("Distributed training needs DATA_PIPELINE: tf_data")
+        if self.config.params_data_pipeline == "tf_data":
+            self._train_valid_dataset()
+        else:
+            self._train_valid_keras_generator()
+
+
+    def _train_valid_dataset(self):
+        """
+        Initializes tf.data training and validation pipelines for the model.
+
+        The files of each class are split like `flow_from_directory(validation_split=VALIDATION_SPLIT)`, as
+        persisted by `DatasetSplit`.
+        Images are read and decoded in parallel, optionally cached (`DATA_CACHE`: none, memory or disk),
+        shuffled with the `SEED` parameter and prefetched. The training pipeline applies the same
+        random rotation/shift/shear/zoom/flip augmentation as the generator when `AUGMENTATION` is set.
+
+        When `IMAGE_CACHE` is set and the image cache built at ingestion matches the current data and
+        image size, the images are sliced from its memory map instead of being decoded again.
+        """
+        train_paths, train_labels, class_names = self.split.subset("training")
+        valid_paths, valid_labels, _ = self.split.subset("validation")
+
+        builder = ImageDatasetBuilder(
+            image_size=self.config.params_image_size,
+            batch_size=self.global_batch_size,
+            seed=self.config.params_seed,
+            cache=self.config.params_data_cache,
+            cache_dir=Path(self.config.root_dir) / "tf_data_cache",
+            preprocessor=self.preprocessor
+        )
+
+        cached = None
+        if self.config.params_image_cache:
+            cached = ImageCache(self.config.image_cache_dir, self.config.params_image_size, self.preprocessor).load(self.config.training_data)
+
+        if cached is not None:
+            images, labels, manifest = cached
+            self.valid_generator = builder.build_from_arrays(
+                images, labels, ImageCache.indices_of(manifest, valid_paths, self.config.training_data),
+                len(class_names), training=False
+            )
+            self.train_generator = builder.build_from_arrays(
+                images, labels, ImageCache.indices_of(manifest, train_paths, self.config.training_data),
+                len(class_names), training=True, augment=self.config.params_is_augmentation, skip=self.skip_elements
+            )
+        else:
+            self.valid_generator = builder.build(
+                valid_paths, valid_labels, len(class_names), training=False, name="validation"
+            )
+            self.train_generator = builder.build(
+                train_paths, train_labels, len(class_names), training=True,
+                augment=self.config.params_is_augmentation, name="training", skip=self.skip_elements
+            )
+
+        if self.strategy.num_replicas_in_sync > 1:
+            self.train_generator = shard_by_data(self.train_generator)
+            self.valid_generator = shard_by_data(self.valid_generator)
+
+        self.class_indices = {name: index for index, name in enumerate(class_names)}
+        self.train_samples = len(train_paths)
+        self.valid_samples = len(valid_paths)
+        logger.info(f"Found {self.train_samples} training and {self.valid_samples} validation images "
+                    f"belonging to {len(class_names)} classes (tf.data pipeline)")
+
+
+    def _train_valid_keras_generator(self):
         """
         Initializes the training and validation generators for the model.
 
         This function sets up the training and validation generators for the model by loading the data from the specified directory.
         The data is preprocessed using the ImageDataGenerator class from TensorFlow. 
-        The generators are configured with the specified parameters such as rescaling, validation split, target size, batch size, and interpolation.
+        The generators are configured with the specified parameters such as validation split, target size, batch size, and interpolation.
+        The generators decode and resize with PIL, using the filter closest to the preprocessor's
+        `INTERPOLATION` (see `PIL_INTERPOLATIONS`), so their pixels can differ slightly from serving's; they
+        normalize with the preprocessor (`preprocessing_function`) instead of `rescale`.
         """
         datagenerator_kwargs = dict(
-            rescale = 1./255,
-            validation_split = 0.20
+            preprocessing_function = self.preprocessor.normalize,
+            validation_split = self.config.params_validation_split
         )
 
         dataflow_kwargs = dict(
-            target_size = self.config.params_image_size[:-1],
+            target_size = self.preprocessor.image_size,
+            color_mode = "rgb" if self.preprocessor.channels == 3 else "grayscale",
             batch_size = self.config.params_batch_size,
-            interpolation = "bilinear"
+            interpolation = PIL_INTERPOLATIONS[self.preprocessor.interpolation]
         )
 
         valid_datagenerator = tf.keras.preprocessing.image.ImageDataGenerator(
@@ -80,33 +292,179 @@ class Training:
             **dataflow_kwargs
         )
 
+        if self.skip_elements:
+            logger.warning("The keras_generator pipeline cannot resume its position, the resumed epochs restart its data order")
+
+        self.class_indices = self.train_generator.class_indices
+        self.train_samples = self.train_generator.samples
+        self.valid_samples = self.valid_generator.samples
+
     
-    @staticmethod
-    def save_model(path: Path, model: tf.keras.Model):
+    def _train_on_bottleneck(self) -> bool:
+        """
+        Trains only the head of the model on cached features of its frozen backbone.
+
+        The frozen backbone output is computed once per non-augmented image of the persisted split and stored
+        memory-mapped under `root_dir/bottleneck`, keyed on the base model weights, the preprocessing spec and the
+        input files. The head (the layers after the backbone and its trailing pooling/Flatten, e.g. the Dense classifier) shares its layers with
+        `self.model`, so the full model is trained once the head is.
+
+        The cache is only valid when every image maps to a single feature vector, so this method returns
+        False, and `train` falls back to the regular training, when augmentation is enabled or the model has
+        no frozen backbone in front of a plain trainable head.
+
+        Returns:
+            bool: True if the model was trained on bottleneck features, False otherwise.
+        """
+        if self.config.params_is_augmentation:
+            logger.info("Bottleneck feature cache disabled: augmentation changes the backbone output of every epoch")
+            return False
+        if isinstance(self.strategy, tf.distribute.MultiWorkerMirroredStrategy):
+            logger.info("Bottleneck feature cache disabled: multi-worker training")
+            return False
+
+        backbone, head, reason = split_frozen_backbone(self.model)
+        if backbone is None:
+            logger.info(f"Bottleneck feature cache disabled: {reason}")
+            return False
+
+        subsets = {name: self.split.subset(name) for name in ("training", "validation")}
+        num_classes = len(subsets["training"][2])
+
+        builder = ImageDatasetBuilder(
+            image_size=self.config.params_image_size, batch_size=self.global_batch_size, preprocessor=self.preprocessor
+        )
+        cached = None
+        if self.config.params_image_cache:
+            cached = ImageCache(self.config.image_cache_dir, self.config.params_image_size, self.preprocessor).load(self.config.training_data)
+
+        key = BottleneckFeatureCache.make_key(
+            self.config.updated_base_model_path,
+            self.preprocessor.fingerprint(),
+            self.performance["dtype_policy"],
+            fingerprint_files(subsets["training"][0] + subsets["validation"][0])
+        )
+        feature_cache = BottleneckFeatureCache(Path(self.config.root_dir) / "bottleneck", backbone, key)
+
+        datasets = {}
+        for name, (paths, labels, _) in subsets.items():
+            if cached is not None:
+                images, cached_labels, manifest = cached
+                dataset = builder.build_from_arrays(
+                    images, cached_labels, ImageCache.indices_of(manifest, paths, self.config.training_data),
+                    num_classes, training=False
+                )
+            else:
+                dataset = builder.build(paths, labels, num_classes, training=False)
+
+            features = feature_cache.get(name, dataset.map(lambda image, label: image), len(paths))
+            one_hot = np.eye(num_classes, dtype=np.float32)[labels]
+            datasets[name] = features_dataset(
+                features, one_hot, self.global_batch_size,
+                training=(name == "training"), seed=self.config.params_seed,
+                skip=self.skip_elements if name == "training" else 0
+            )
+        feature_cache.prune()
+
+        logger.info("Training the model head on cached bottleneck features")
+        with self.strategy.scope():
+            self._compile(head)
+        self._fit(head, datasets["training"], datasets["validation"])
+        return True
+
+
+    def _fit(self, model: tf.keras.Model, train_data, valid_data):
+        """
+        Fits `model` (the full model or its head) from the resumed epoch on, checkpointing the full
+        model and the optimizer of `model` every `checkpoint_every_epochs` epochs.
+
+        Afterwards the validation probabilities of the final model are predicted once, so evaluation can
+        reuse them instead of decoding the validation images and running the model again. They are only
+        kept when they match the saved model exactly: not for mixed precision (the saved model is float32)
+        and not in multi-worker training.
+        """
+        if self.resume_state:
+            with self.strategy.scope():
+                self.checkpoints.restore(self.resume_state, self.model, model.optimizer)
+
+        callbacks = [
+            StepTimeLogger(self.global_batch_size),
+            CheckpointCallback(
+                self.checkpoints, self.model, self.config.checkpoint_every_epochs,
+                self.config.params_epochs, self.steps_per_epoch * self.global_batch_size
+            ),
+        ]
+        if self.config.training_profile != "none":
+            callbacks.append(StepProfiler(self.config.training_profile, self.config.training_profile_step, self.config.profile_dir))
+
+        model.fit(
+            train_data,
+            epochs=self.config.params_epochs,
+            initial_epoch=self.initial_epoch,
+            steps_per_epoch=self.steps_per_epoch,
+            validation_steps=self.validation_steps,
+            validation_data=valid_data,
+            callbacks=callbacks
+        )
+
+        self.validation_probabilities = None
+        if self.performance["dtype_policy"] == "float32" and not isinstance(self.strategy, tf.distribute.MultiWorkerMirroredStrategy):
+            self.validation_probabilities = model.predict(valid_data)
+
+
+    def save_model(self, paths: list, model: tf.keras.Model) -> Path:
         """
-        Save a Keras model to a specified path.
+        Save a Keras model once as a new version in the model artifact store and link each of the specified paths to it.
+
+        The manifest of the version records the training parameters, the hash of the base model and the
+        dtype policy the model was trained in (see `trained_dtype_policy`). An unchanged model reuses its
+        existing version.
 
         Args:
-            path (Path): The path where the model will be saved.
+            paths (list): The paths where the model will be linked.
             model (tf.keras.Model): The Keras model to be saved.
 
         Returns:
-            None
+            Path: The version directory in the store.
         """
-        model.save(path)
+        store = ModelArtifactStore(self.config.artifact_store_dir, self.config.artifact_versions_to_keep)
+        artifact = store.save(
+            model,
+            name=Path(paths[0]).name,
+            params={key: value for key, value in asdict(self.config).items() if key.startswith("params_")},
+            metadata={
+                "base_model_sha256": model_fingerprint(self.config.updated_base_model_path),
+                "dtype_policy": self.performance["dtype_policy"],
+            }
+        )
+        for path in paths:
+            link_artifact(artifact, path)
+        return artifact
 
 
     def train(self):
         """
         Trains the model using the train and validation generators, and saves the trained model to two different paths.
 
-        This function calculates the number of steps per epoch and the number of validation steps based on the batch size of the train and validation generators. 
-        It then logs the class indices of the train and validation generators.
+        This function calculates the number of steps per epoch and the number of validation steps based on the configured batch size
+        and the number of training and validation samples. It then logs the class indices.
 
         The model is trained using the train generator with the specified number of epochs and steps per epoch. 
         The validation data is provided by the validation generator with the specified number of validation steps.
 
-        After training, the model is saved to two different paths: the configured trained model path and the configured trained model path for tracking.
+        Checkpoints are written while training, and a resumed run starts at the checkpoint's epoch and
+        input position (see `get_base_model`). The mean step time of every epoch is logged. A mixed precision model is saved with float32 layers
+        and its dtype policy recorded, so serving and evaluation run it as trained, whatever `MIXED_PRECISION` is later.
+
+        When `BOTTLENECK_CACHE` is set and the cached features stay valid (no augmentation, frozen backbone), only the
+        head is trained on cached backbone features instead (see `_train_on_bottleneck`).
+
+        After training, the model is saved once as a version in the model artifact store, and the configured trained model path and
+        the configured trained model path for tracking are both linked to it (see `save_model`).
+        The preprocessing spec is saved next to each of them first (see `preprocessing_path`), so a server that picks up
+        the new model also finds its preprocessing.
+        The validation probabilities of the saved model are stored at `predictions_path` for the evaluation stage.
+        In multi-worker training only the chief worker saves it. Steps are counted in global batches (see `get_base_model`).
 
         Parameters:
             self (ModelTrainer): The instance of the ModelTrainer class.
@@ -114,26 +472,37 @@ class Training:
         Returns:
             None
         """
-        self.steps_per_epoch = self.train_generator.samples // self.train_generator.batch_size
-        self.validation_steps = self.valid_generator.samples // self.valid_generator.batch_size
+        self.steps_per_epoch = self.train_samples // self.global_batch_size
+        self.validation_steps = self.valid_samples // self.global_batch_size
 
-        logger.info(f"Class indices (train): {self.train_generator.class_indices}")
-        logger.info(f"Class indices (valid): {self.valid_generator.class_indices}")
+        logger.info(f"Class indices: {self.class_indices}")
+        logger.info(f"Training with performance profile: {self.performance}")
 
-        self.model.fit(
-            self.train_generator,
-            epochs=self.config.params_epochs,
-            steps_per_epoch=self.steps_per_epoch,
-            validation_steps=self.validation_steps,
-            validation_data=self.valid_generator
-        )
+        trained = self.config.params_bottleneck_cache and self._train_on_bottleneck()
+        if not trained:
+            self._fit(self.model, self.train_generator, self.valid_generator)
 
-        self.save_model(
-            path=self.config.trained_model_path,
-            model=self.model
-        )
-        # self to another path for tracking in github
-        self.save_model(
-            path=self.config.trained_model_path_for_tracking,
-            model=self.model
-        )
\ No newline at end of file
+        if not is_chief(self.strategy):
+            logger.info("Not the chief worker, the chief saves the trained model")
+            return
+
+        model = with_dtype_policy(self.model, "float32")
+        if model is not self.model:
+            self._compile(model)
+        # the second path is tracked in github
+        paths = [self.config.trained_model_path, self.config.trained_model_path_for_tracking]
+        for path in paths:
+            self.preprocessor.save(preprocessing_path(path))
+        self.save_model(paths=paths, model=model)
+
+        split = self.split.load()
+        if self.validation_probabilities is not None and len(self.validation_probabilities) == len(split["validation"]["files"]):
+            save_predictions(
+                self.config.predictions_path,
+                self.validation_probabilities,
+                labels=split["validation"]["labels"],
+                files=split["validation"]["files"],
+                class_names=split["class_names"],
+                model_sha256=model_fingerprint(self.config.trained_model_path),
+                split_fingerprint=split["fingerprint"]
+            )
\ No newline at end of file
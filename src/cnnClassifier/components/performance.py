@@ -0,0 +1,110 @@
+import os
+import sys
+
+from cnnClassifier import logger
+
+
+def cpu_supports_bfloat16() -> bool:
+    """
+    Checks whether the CPU has native bfloat16 instructions (AVX512_BF16 or AMX_BF16).
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def resolve_precision(mixed_precision: str) -> str:
+    """
+    Resolves the `MIXED_PRECISION` parameter to a Keras dtype policy name: `auto` selects
+    `mixed_bfloat16` on CPUs with native bfloat16 support and `float32` otherwise.
+    """
+    if mixed_precision in (None, False, "float32", "none"):
+        return "float32"
+    if mixed_precision == "auto":
+        return "mixed_bfloat16" if cpu_supports_bfloat16() else "float32"
+    if mixed_precision in ("mixed_bfloat16", "bfloat16", True):
+        return "mixed_bfloat16"
+    raise ValueError(f"Unknown MIXED_PRECISION {mixed_precision}, expected float32, mixed_bfloat16 or auto")
+
+
+def configure_onednn(enabled: bool):
+    """
+    Enables or disables the oneDNN optimized CPU kernels through `TF_ENABLE_ONEDNN_OPTS`.
+
+    TensorFlow reads the variable when it is imported, so this only takes effect if it runs before
+    the first `import tensorflow` of the process (as `main.py` does); otherwise a warning is logged.
+    """
+    value = "1" if enabled else "0"
+    if "tensorflow" in sys.modules and os.environ.get("TF_ENABLE_ONEDNN_OPTS", "1") != value:
+        logger.warning(f"TensorFlow is already imported, oneDNN={enabled} only applies to new processes")
+    os.environ["TF_ENABLE_ONEDNN_OPTS"] = value
+
+
+def apply_performance_profile(mixed_precision: str, intra_op_threads: int, inter_op_threads: int, onednn: bool) -> dict:
+    """
+    Applies the process-wide part of a performance profile: the oneDNN toggle and the intra/inter-op
+    thread counts (0 keeps TensorFlow's default), and resolves the dtype policy. The policy is not set
+    globally, so only the models passed to `with_dtype_policy` use it.
+
+    Thread counts can only be set before TensorFlow initializes its runtime; if it already has, the
+    current values are kept and a warning is logged.
+
+    Returns:
+        dict: The applied settings, also logged.
+    """
+    configure_onednn(onednn)
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        logger.warning(f"Thread counts are fixed once TensorFlow is initialized, keeping the current ones: {e}")
+
+    settings = {
+        "dtype_policy": resolve_precision(mixed_precision),
+        "cpu_bfloat16": cpu_supports_bfloat16(),
+        "intra_op_threads": tf.config.threading.get_intra_op_parallelism_threads(),
+        "inter_op_threads": tf.config.threading.get_inter_op_parallelism_threads(),
+        "onednn": os.environ.get("TF_ENABLE_ONEDNN_OPTS") == "1",
+    }
+    logger.info(f"Performance profile: {settings}")
+    return settings
+
+
+def with_dtype_policy(model, policy: str):
+    """
+    Rebuilds a functional model with every layer in the given dtype policy and copies its weights.
+
+    Models loaded from a file keep the dtype policy they were saved with, so this is how a saved
+    float32 model is switched to mixed precision (and back to float32 before saving it for serving).
+    With a mixed policy the last layer keeps float32 outputs, so the softmax and the loss stay in
+    full precision.
+
+    Returns:
+        tf.keras.Model: The rebuilt model, or `model` itself if it already uses `policy`.
+    """
+    import tensorflow as tf
+
+    if all(layer.dtype_policy.name == policy for layer in model.layers if not isinstance(layer, tf.keras.layers.InputLayer)):
+        return model
+
+    config = model.get_config()
+    last_layer = config["layers"][-1]["name"]
+    for layer in config["layers"]:
+        if layer["class_name"] == "InputLayer":
+            continue
+        layer_policy = "float32" if layer["name"] == last_layer else policy
+        layer["config"]["dtype"] = layer_policy
+
+    rebuilt = tf.keras.Model.from_config(config)
+    rebuilt.set_weights(model.get_weights())
+    for source, target in zip(model.layers, rebuilt.layers):
+        target.trainable = source.trainable
+    return rebuilt
+
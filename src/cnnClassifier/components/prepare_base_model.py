@@ -1,8 +1,10 @@
+from dataclasses import asdict
 from pathlib import Path
 import tensorflow as tf
 
 
 from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import ModelArtifactStore, link_artifact, load_model
 from cnnClassifier.config.configuration import PrepareBaseModelConfig
 
 class PrepareBaseModel:
@@ -33,6 +35,20 @@ class PrepareBaseModel:
         )
 
 
+    def load_base_model(self):
+        """
+        Loads the base model saved by `get_base_model` instead of creating (and downloading) it again,
+        e.g. to prepare several full models with different `FREEZE_TILL` from one base model.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        self.model = load_model(self.config.base_model_path)
+
+
     @staticmethod
     def _prepare_full_model(model: tf.keras.Model, 
                             classes: int, 
@@ -54,7 +70,7 @@ class PrepareBaseModel:
         if freeze_all: 
             for layer in model.layers:
                 layer.trainable = False
-        elif (freeze_till is not None) and (freeze_all > 0):
+        elif (freeze_till is not None) and (freeze_till > 0):
             for layer in model.layers[:-freeze_till]:
                 layer.trainable = False
 
@@ -75,7 +91,8 @@ class PrepareBaseModel:
         """
         Updates the base model by preparing a full model with frozen layers and saving it to the specified path.
 
-        This function first prepares a full model by freezing all layers of the base model using the `_prepare_full_model` method.
+        This function first prepares a full model by freezing the layers of the base model using the `_prepare_full_model` method:
+        all of them when `FREEZE_TILL` is 0, otherwise all but the last `FREEZE_TILL`.
         The `model` parameter is the base model to prepare, `classes` is the number of classes for the output layer,
         `freeze_all` is a boolean indicating whether to freeze all layers of the base model, and `freeze_till` is the number of layers
         to freeze from the end of the base model.
@@ -95,8 +112,8 @@ class PrepareBaseModel:
             self.full_model = self._prepare_full_model(
                 model = self.model,
                 classes = self.config.params_classes,
-                freeze_all=True,
-                freeze_till=None,
+                freeze_all=not self.config.params_freeze_till,
+                freeze_till=self.config.params_freeze_till or None,
             )
 
             self.save_model(
@@ -109,18 +126,22 @@ class PrepareBaseModel:
             raise e
         
 
-    @staticmethod
-    def save_model(path: Path, model: tf.keras.Model):
+    def save_model(self, path: Path, model: tf.keras.Model):
         """
-        Save a Keras model to a specified path.
+        Save a Keras model as a new version in the model artifact store and link the specified path to it.
+
+        The version is named after the last component of `path` (e.g. `base_model_updated`) and its manifest
+        records the base model parameters. An unchanged model reuses its existing version.
 
         Args:
-            path (Path): The path where the model will be saved.
+            path (Path): The path where the model will be linked.
             model (tf.keras.Model): The Keras model to be saved.
 
         Returns:
             None
         """
-        model.save(path)
+        store = ModelArtifactStore(self.config.artifact_store_dir, self.config.artifact_versions_to_keep)
+        params = {key: value for key, value in asdict(self.config).items() if key.startswith("params_")}
+        link_artifact(store.save(model, name=Path(path).name, params=params), path)
 
     
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from cnnClassifier.utils.common import LazyModule
+
+# imported on first use, so importing the serving apps stays cheap
+tf = LazyModule("tensorflow")
+
+
+# `tf.image.resize` methods; every one but nearest is antialiased when downscaling
+INTERPOLATIONS = ("nearest", "bilinear", "bicubic", "area", "lanczos3", "lanczos5", "gaussian", "mitchellcubic")
+
+# the closest PIL filter of every method, for the legacy `keras_generator` pipeline, which resizes with PIL
+PIL_INTERPOLATIONS = {
+    "nearest": "nearest",
+    "bilinear": "bilinear",
+    "bicubic": "bicubic",
+    "area": "box",
+    "lanczos3": "lanczos",
+    "lanczos5": "lanczos",
+    "gaussian": "bilinear",
+    "mitchellcubic": "bicubic",
+}
+
+# per-channel ImageNet means of the "caffe" normalization (VGG16/ResNet50 weights), in BGR order
+CAFFE_MEANS = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+
+def _rescale(images, preprocessor):
+    return images * preprocessor.rescale
+
+
+def _caffe(images, preprocessor):
+    # RGB -> BGR, then zero-center every channel on ImageNet, like `vgg16.preprocess_input`
+    return images[..., ::-1] - CAFFE_MEANS
+
+
+def _tf(images, preprocessor):
+    return images / 127.5 - 1.0
+
+
+# Pixel normalizations of float32 (..., H, W, C) NumPy arrays or TensorFlow tensors. They only use
+# arithmetic and slicing, so the same function runs on a NumPy batch and in a tf.data graph.
+NORMALIZERS = {
+    "rescale": _rescale,
+    "caffe": _caffe,
+    "tf": _tf,
+}
+
+
+def preprocessing_path(model_path: Path) -> Path:
+    """
+    Returns the path of the preprocessing spec stored next to a model file, e.g.
+    `model/model.preprocessing.json` for `model/model`.
+    """
+    return Path(model_path).with_suffix(".preprocessing.json")
+
+
+class InvalidImageError(ValueError):
+    """
+    Raised when an image source cannot be decoded.
+    """
+
+
+class ImagePreprocessor:
+    """
+    The one image preprocessing of the project, shared by the image cache, the training and
+    evaluation input pipelines, export, batch prediction and serving.
+
+    Every image is decoded by `tf.io.decode_image` to `channels` channels (RGB or grayscale) and resized
+    to `image_size` by `tf.image.resize` (antialiased) into uint8. The tf.data pipelines run these ops in
+    their graphs (see `load_tf`), while serving and the image cache run the very same ops eagerly (see
+    `decode` and `resize`), so a served image gets exactly the pixels it would have had in training.
+    Whole uint8 batches are then normalized to float32 by one of the `NORMALIZERS` in a single
+    vectorized op, on NumPy or inside the tf.data graph after batching.
+
+    The spec is saved as JSON next to every trained and exported model (see `preprocessing_path`), and
+    evaluation, export, batch prediction and serving load it from there, so a model is always fed the
+    way it was trained.
+    """
+
+    def __init__(self,
+                 image_size: list,
+                 interpolation: str = "bilinear",
+                 normalization: str = "rescale",
+                 rescale: float = 1.0 / 255):
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation {interpolation}, expected one of {list(INTERPOLATIONS)}")
+        if normalization not in NORMALIZERS:
+            raise ValueError(f"Unknown normalization {normalization}, expected one of {list(NORMALIZERS)}")
+        self.image_size = [int(size) for size in image_size[:2]]
+        self.channels = int(image_size[2]) if len(image_size) > 2 else 3
+        if self.channels not in (1, 3):
+            raise ValueError(f"Images must have 1 or 3 channels, got {self.channels}")
+        if normalization == "caffe" and self.channels != 3:
+            raise ValueError("The caffe normalization needs 3 channels")
+        self.interpolation = interpolation
+        self.normalization = normalization
+        self.rescale = float(rescale)
+
+
+    @classmethod
+    def from_params(cls, image_size: list, params: dict = None) -> "ImagePreprocessor":
+        """
+        Creates the preprocessor from the `IMAGE_SIZE` and `PREPROCESSING` parameters.
+        """
+        params = params or {}
+        return cls(
+            image_size=list(image_size),
+            interpolation=params.get("INTERPOLATION", "bilinear"),
+            normalization=params.get("NORMALIZATION", "rescale"),
+            rescale=params.get("RESCALE", 1.0 / 255)
+        )
+
+
+    def spec(self) -> dict:
+        return {
+            "image_size": self.image_size + [self.channels],
+            "interpolation": self.interpolation,
+            "normalization": self.normalization,
+            "rescale": self.rescale,
+        }
+
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "ImagePreprocessor":
+        return cls(**spec)
+
+
+    def fingerprint(self, resize_only: bool = False) -> str:
+        """
+        Returns a short hash of the spec, used to key caches on the preprocessing they were built with.
+        With `resize_only`, only the parts that change the uint8 images (size, channels, filter) count.
+        """
+        spec = self.spec()
+        if resize_only:
+            spec = {key: spec[key] for key in ("image_size", "interpolation")}
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+    def save(self, path: Path) -> Path:
+        """
+        Writes the spec as JSON to `path` atomically.
+        """
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.spec(), f, indent=4)
+        os.replace(tmp_path, path)
+        return path
+
+
+    @classmethod
+    def load_spec(cls, path: Path) -> "ImagePreprocessor":
+        with open(path) as f:
+            return cls.from_spec(json.load(f))
+
+
+    @classmethod
+    def for_model(cls, model_path: Path, default: "ImagePreprocessor") -> "ImagePreprocessor":
+        """
+        Returns the preprocessor saved next to `model_path`, or `default` for models saved without one.
+        """
+        path = preprocessing_path(model_path)
+        if path.exists():
+            return cls.load_spec(path)
+        return default
+
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ImagePreprocessor) and self.spec() == other.spec()
+
+
+    def __repr__(self) -> str:
+        return f"ImagePreprocessor({self.spec()})"
+
+
+    def decode(self, source):
+        """
+        Decodes one image with `tf.io.decode_image` to `channels` channels (RGB or grayscale), with the
+        same kernel `load_tf` runs inside the tf.data pipelines.
+
+        Args:
+            source (str | Path | bytes | file-like | np.ndarray): A path to an image file, the raw
+                (encoded) image bytes, a binary file object holding them (e.g. an uploaded file), or an
+                already decoded uint8 (H, W) or (H, W, channels) image array.
+
+        Returns:
+            tf.Tensor: The decoded uint8 (H, W, channels) image.
+
+        Raises:
+            TypeError: If `source` is none of the above.
+            InvalidImageError: If the data is not a BMP, GIF, JPEG or PNG image.
+        """
+        if isinstance(source, np.ndarray):
+            return self._convert_channels(tf.convert_to_tensor(np.asarray(source, dtype=np.uint8)))
+
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                data = f.read()
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+        elif hasattr(source, "read"):
+            data = source.read()
+        else:
+            raise TypeError(f"Unsupported image source type: {type(source).__name__}")
+
+        try:
+            return self._decode(tf.constant(data))
+        except tf.errors.InvalidArgumentError as e:
+            raise InvalidImageError(f"Cannot decode the image: {e.message}") from None
+
+
+    def _decode(self, data):
+        image = tf.io.decode_image(data, channels=self.channels, expand_animations=False)
+        image.set_shape([None, None, self.channels])
+        return image
+
+
+    def _convert_channels(self, image):
+        """
+        Converts a decoded (H, W), (H, W, 1), (H, W, 3) or (H, W, 4) uint8 image to `channels` channels,
+        dropping any alpha channel.
+        """
+        if image.shape.rank == 2:
+            image = image[..., None]
+        if image.shape[-1] == 4:
+            image = image[..., :3]
+        if self.channels == 3 and image.shape[-1] == 1:
+            image = tf.image.grayscale_to_rgb(image)
+        elif self.channels == 1 and image.shape[-1] == 3:
+            image = tf.image.rgb_to_grayscale(image)
+        return image
+
+
+    def _resize(self, image):
+        """
+        Resizes one decoded image to a uint8 (height, width, channels) tensor. The one resize of the
+        project: eager for serving and the image cache, traced into the tf.data graphs for training.
+        """
+        image = tf.image.resize(image, self.image_size, method=self.interpolation, antialias=True)
+        return tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+
+
+    def resize(self, images: list) -> np.ndarray:
+        """
+        Resizes decoded images into one preallocated uint8 (N, height, width, channels) batch.
+        """
+        height, width = self.image_size
+        batch = np.empty((len(images), height, width, self.channels), dtype=np.uint8)
+        for index, image in enumerate(images):
+            batch[index] = self._resize(image).numpy()
+        return batch
+
+
+    def load(self, source) -> np.ndarray:
+        """
+        Decodes and resizes one image into a uint8 (height, width, channels) array.
+        """
+        return self.resize([self.decode(source)])[0]
+
+
+    def load_tf(self, path):
+        """
+        `load` inside a tf.data graph: maps an image path tensor to a uint8 (height, width, channels)
+        tensor with native TensorFlow ops, so parallel map calls run on all cores.
+        """
+        height, width = self.image_size
+        image = self._resize(self._decode(tf.io.read_file(path)))
+        image.set_shape([height, width, self.channels])
+        return image
+
+
+    def normalize(self, images):
+        """
+        Converts uint8 images (a NumPy array or a tensor, one image or a batch) to normalized float32.
+        """
+        if isinstance(images, np.ndarray):
+            images = images.astype(np.float32, copy=False)
+        else:
+            images = tf.cast(images, tf.float32)
+        return NORMALIZERS[self.normalization](images, self)
+
+
+    def __call__(self, sources: list) -> np.ndarray:
+        """
+        Decodes, resizes and normalizes a list of images into one float32 (N, height, width, channels) batch.
+        """
+        return self.normalize(self.resize([self.decode(source) for source in sources]))
@@ -0,0 +1,297 @@
+import contextlib
+import cProfile
+import io
+import math
+import os
+import pstats
+import threading
+import time
+from pathlib import Path
+
+from cnnClassifier import logger
+
+
+METRIC_PREFIX = "cnn_classifier"
+
+# upper bounds in seconds: from sub-millisecond image decoding up to hour-long pipeline stages
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, 300.0, 900.0, 3600.0)
+
+HISTOGRAMS = {
+    "span_duration_seconds": "Duration of one instrumented step of a request (decode, resize, forward, ...).",
+    "pipeline_stage_duration_seconds": "Duration of one stage of the training pipeline.",
+    "training_step_duration_seconds": "Duration of one training step (one batch).",
+}
+
+PROFILERS = ("cprofile", "tensorflow")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    A cumulative histogram of durations with fixed bucket upper bounds, like a Prometheus histogram.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # one count per bucket and one for +Inf
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+
+    def snapshot(self) -> dict:
+        """
+        Returns the cumulative bucket counts (including +Inf), the sum and the count of the observations.
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by linear interpolation inside its bucket, like Prometheus' `histogram_quantile`.
+        """
+        snapshot = self.snapshot()
+        count = snapshot["count"]
+        if count == 0:
+            return None
+        rank = q * count
+        lower_bound, lower_count = 0.0, 0
+        for bound, cumulative in zip(self.buckets + (math.inf,), snapshot["buckets"]):
+            if cumulative >= rank:
+                if bound == math.inf:
+                    return lower_bound
+                in_bucket = cumulative - lower_count
+                return lower_bound + (bound - lower_bound) * ((rank - lower_count) / in_bucket if in_bucket else 0.0)
+            lower_bound, lower_count = bound, cumulative
+        return lower_bound
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency histograms, keyed by metric name and label values.
+
+    Requests and pipeline stages record durations with the `span` context manager; the histograms
+    are exported in the Prometheus text format (`render_prometheus`) for a `/metrics` endpoint or a
+    node exporter text file, and summarized as JSON (`summary`).
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+
+    def histogram(self, metric: str, **labels) -> Histogram:
+        if metric not in HISTOGRAMS:
+            raise ValueError(f"Unknown metric {metric}, expected one of {list(HISTOGRAMS)}")
+        key = (metric, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+
+    def observe(self, metric: str, seconds: float, **labels):
+        self.histogram(metric, **labels).observe(seconds)
+
+
+    @contextlib.contextmanager
+    def span(self, name: str, metric: str = "span_duration_seconds", label: str = "span"):
+        """
+        Times the enclosed block and records it in the `metric` histogram, labelled `label=name`.
+        The duration is recorded even if the block raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, time.perf_counter() - start, **{label: name})
+
+
+    def summary(self) -> dict:
+        """
+        Returns the count, mean and estimated p50/p95/p99 in milliseconds of every histogram, keyed
+        "metric{label=value}".
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+        summary = {}
+        for (metric, labels), histogram in sorted(histograms.items()):
+            snapshot = histogram.snapshot()
+            name = metric + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+            count = snapshot["count"]
+            summary[name] = {"count": count, "mean_ms": 1000.0 * snapshot["sum"] / count if count else None}
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(q)
+                summary[name][f"p{int(q * 100)}_ms"] = 1000.0 * value if value is not None else None
+        return summary
+
+
+    def render_prometheus(self, gauges: dict = None) -> str:
+        """
+        Renders the histograms, and optionally numeric gauges, in the Prometheus text exposition format.
+
+        Args:
+            gauges (dict, optional): Gauge values by name (without the metric prefix), e.g. the model
+                registry or micro-batcher metrics. Non-numeric values are skipped.
+
+        Returns:
+            str: The exposition text, ending with a newline.
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+
+        lines = []
+        for metric, help_text in HISTOGRAMS.items():
+            series = sorted((labels, histogram) for (name, labels), histogram in histograms.items() if name == metric)
+            if not series:
+                continue
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for labels, histogram in series:
+                snapshot = histogram.snapshot()
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                separator = "," if label_text else ""
+                for bound, cumulative in zip(histogram.buckets + (math.inf,), snapshot["buckets"]):
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(f'{name}_bucket{{{label_text}{separator}le="{le}"}} {cumulative}')
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}_sum{suffix} {snapshot['sum']!r}")
+                lines.append(f"{name}_count{suffix} {snapshot['count']}")
+
+        for gauge, value in sorted((gauges or {}).items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{METRIC_PREFIX}_{gauge}"
+            lines += [f"# TYPE {name} gauge", f"{name} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+
+    def write_textfile(self, path: Path):
+        """
+        Writes the Prometheus text to `path` atomically, e.g. for the node exporter's textfile collector.
+        """
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def flatten_gauges(prefix: str, metrics: dict) -> dict:
+    """
+    Flattens a nested metrics dict (e.g. `ModelRegistry.metrics()`) into gauge names like
+    "prefix_key_subkey".
+    """
+    gauges = {}
+    for key, value in metrics.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            gauges.update(flatten_gauges(name, value))
+        else:
+            gauges[name] = value
+    return gauges
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Returns the process-wide MetricsRegistry.
+    """
+    return _metrics
+
+
+def span(name: str):
+    """
+    Times the enclosed block into the process-wide `span_duration_seconds{span=name}` histogram.
+    """
+    return _metrics.span(name)
+
+
+class ProfilerBusyError(Exception):
+    """
+    Raised when a profile is requested while another one is being captured.
+    """
+
+
+_profiler_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def profile_capture(kind: str, output_dir: Path, name: str):
+    """
+    Captures a profile of the enclosed block. Only one profile is captured at a time per process.
+
+    Args:
+        kind (str): "cprofile" (Python functions of the calling thread, saved as `<name>.prof` for
+            `pstats`/snakeviz) or "tensorflow" (TensorFlow ops on all threads, saved as a TensorBoard
+            profile under `<name>/`).
+        output_dir (Path): The directory the profile is written to.
+        name (str): The name of the profile, e.g. a request id or "train_step_10".
+
+    Yields:
+        Path: The path of the profile, written when the block exits.
+
+    Raises:
+        ValueError: If `kind` is not a known profiler.
+        ProfilerBusyError: If another profile is being captured.
+    """
+    if kind not in PROFILERS:
+        raise ValueError(f"Unknown profiler {kind}, expected one of {list(PROFILERS)}")
+    if not _profiler_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Another profile is being captured")
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        if kind == "cprofile":
+            path = Path(output_dir) / f"{name}.prof"
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield path
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+                report = io.StringIO()
+                pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(15)
+                logger.info(f"Saved cProfile profile at: {path}\n{report.getvalue()}")
+        else:
+            import tensorflow as tf
+
+            path = Path(output_dir) / name
+            tf.profiler.experimental.start(str(path))
+            try:
+                yield path
+            finally:
+                tf.profiler.experimental.stop()
+                logger.info(f"Saved TensorFlow profile at: {path} (open with TensorBoard's Profile tab)")
+    finally:
+        _profiler_lock.release()
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import PredictionConfig
+
+
+class PredictionResultCache:
+    """
+    Content-addressed cache of prediction results.
+
+    Results (the class probabilities of one image) are keyed on a hash of the decoded, resized image
+    together with the content hash of the model that produced them, so a retrained model never serves
+    results of the previous one. The in-memory tier is an LRU bounded by `max_entries` and `ttl_seconds`,
+    and drops its entries of older models once a new model hash is seen. The optional SQLite tier at
+    `disk_path` survives restarts and is shared by the processes of a pre-fork server, which may serve
+    different models during a rollout; its rows are therefore never dropped by model, only expired after
+    `ttl_seconds` and trimmed to the newest `disk_max_entries` (every 100 writes).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_path: Path = None, disk_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_hash = None
+        self._disk_writes = 0
+        self._metrics = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, model_hash TEXT NOT NULL, probabilities TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+
+    @staticmethod
+    def image_key(image: np.ndarray) -> str:
+        """
+        Hashes a decoded image array (shape, dtype and pixels).
+        """
+        image = np.ascontiguousarray(image)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.shape}|{image.dtype}".encode())
+        digest.update(image.data)
+        return digest.hexdigest()
+
+
+    def _check_model(self, model_hash: str):
+        """
+        Drops the in-memory results of other models once a new model hash is seen. Called with the
+        lock held. The shared disk tier is left alone: other processes may still serve the old model.
+        """
+        if model_hash == self._model_hash:
+            return
+        if self._model_hash is not None:
+            self._metrics["invalidations"] += len(self._entries)
+            self._entries.clear()
+            logger.info(f"Model changed to sha256={model_hash[:12]}, prediction result cache invalidated")
+        self._model_hash = model_hash
+
+
+    def get(self, image_key: str, model_hash: str):
+        """
+        Returns the cached probabilities of an image under a model, or None.
+        """
+        key = f"{model_hash}:{image_key}"
+        now = time.time()
+        with self._lock:
+            self._check_model(model_hash)
+            entry = self._entries.get(key)
+            if entry is not None:
+                probabilities, created = entry
+                if now - created <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._metrics["hits"] += 1
+                    return probabilities
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT probabilities, created FROM results WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    probabilities = np.asarray(json.loads(row[0]), dtype=np.float32)
+                    self._insert(key, probabilities, row[1])
+                    self._metrics["disk_hits"] += 1
+                    return probabilities
+
+            self._metrics["misses"] += 1
+            return None
+
+
+    def _insert(self, key: str, probabilities: np.ndarray, created: float):
+        self._entries[key] = (probabilities, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+
+    def put(self, image_key: str, model_hash: str, probabilities: np.ndarray):
+        """
+        Stores the probabilities of an image under a model in both tiers.
+        """
+        key = f"{model_hash}:{image_key}"
+        now = time.time()
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        with self._lock:
+            self._check_model(model_hash)
+            self._insert(key, probabilities, now)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, model_hash, probabilities, created) VALUES (?, ?, ?, ?)",
+                    (key, model_hash, json.dumps(probabilities.tolist()), now)
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._trim_disk(now)
+                self._db.commit()
+
+
+    def _trim_disk(self, now: float):
+        """
+        Removes expired rows and the oldest rows beyond `disk_max_entries`. Called with the lock held.
+        """
+        self._db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+
+    def metrics(self) -> dict:
+        """
+        Returns a snapshot of the cache metrics: memory and disk hits, misses, LRU evictions, TTL
+        expirations, entries dropped because the model changed, and the current number of entries.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["size"] = len(self._entries)
+            metrics["max_entries"] = self.max_entries
+            metrics["ttl_seconds"] = self.ttl_seconds
+            if self._db is not None:
+                metrics["disk_size"] = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        lookups = metrics["hits"] + metrics["disk_hits"] + metrics["misses"]
+        metrics["hit_rate"] = (metrics["hits"] + metrics["disk_hits"]) / lookups if lookups else 0.0
+        return metrics
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_prediction_result_cache(config: PredictionConfig) -> PredictionResultCache:
+    """
+    Returns the process-wide PredictionResultCache for the configured model path, creating it on first use.
+
+    Args:
+        config (PredictionConfig): The prediction configuration.
+
+    Returns:
+        PredictionResultCache: The cache shared by every caller in this process.
+    """
+    key = os.path.abspath(config.model_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = PredictionResultCache(
+                max_entries=config.result_cache_max_entries,
+                ttl_seconds=config.result_cache_ttl_seconds,
+                disk_path=config.result_cache_disk_path
+            )
+            _caches[key] = cache
+    return cache
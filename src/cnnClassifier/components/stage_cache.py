@@ -0,0 +1,188 @@
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from box import ConfigBox
+
+from cnnClassifier import logger
+from cnnClassifier.components.model_artifact import model_fingerprint
+
+
+def _module_file(name: str) -> str:
+    """
+    Returns the source file of an importable module, or None if `name` is not a module (e.g. a class
+    imported from a module).
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, AttributeError, ValueError):
+        return None
+    return spec.origin if spec is not None and spec.has_location else None
+
+
+def module_deps(module: str, package: str = "cnnClassifier") -> list:
+    """
+    Returns the source files a module runs: its own and those of every `package` module it imports,
+    directly or through other modules, at the top level or inside functions. The imports are read
+    from the source (nothing is imported but the parent packages), so a stage's code dependencies
+    follow its imports instead of a hand-kept list.
+
+    Args:
+        module (str): The dotted name of the module, e.g. a stage module's `__name__`.
+        package (str, optional): Only modules of this package are followed. Defaults to "cnnClassifier".
+
+    Returns:
+        list: The sorted source file paths, relative to the working directory.
+    """
+    files, pending = {}, [module]
+    while pending:
+        name = pending.pop()
+        if name in files:
+            continue
+        path = _module_file(name)
+        files[name] = path
+        if path is None or not path.endswith(".py"):
+            continue
+
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        current = name if os.path.basename(path) == "__init__.py" else name.rpartition(".")[0]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = importlib.util.resolve_name("." * node.level + (node.module or ""), current) if node.level else node.module
+                # the imported names may be modules themselves (`from package import module`)
+                imported = [base] + [f"{base}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            pending += [other for other in imported if other == package or other.startswith(f"{package}.")]
+
+    return sorted(os.path.relpath(path) for path in files.values() if path is not None)
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    """
+    The inputs and outputs of one pipeline stage, used to decide whether it has to run again.
+
+    `key` is the stage name used on the command line and in `dvc.yaml`. `config_sections` are the
+    parts of `config.yaml` the stage reads: a top-level section, or a single key of one as
+    `section.key`. `params` are keys of `params.yaml`, `deps` are files or directories (source code
+    and upstream artifacts) and `outs` are the artifacts the stage produces.
+    """
+    name: str
+    key: str
+    pipeline: type
+    config_sections: list = field(default_factory=list)
+    params: list = field(default_factory=list)
+    deps: list = field(default_factory=list)
+    outs: list = field(default_factory=list)
+
+
+class StageCache:
+    """
+    Records the input hash of every successfully run stage, so up-to-date stages can be skipped.
+
+    A stage's input hash covers its config sections, its params and the content of its dependencies.
+    File contents are hashed once and reused while the file's size and mtime are unchanged, so
+    checking a large dataset directory only stats its files.
+    """
+
+    def __init__(self, state_path: Path):
+        self.state_path = Path(state_path)
+        self.state = {"stages": {}, "files": {}}
+        if self.state_path.exists():
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+
+
+    def _save(self):
+        os.makedirs(self.state_path.parent, exist_ok=True)
+        tmp_path = Path(f"{self.state_path}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+
+    def _file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self.state["files"].get(path)
+        if cached and cached["signature"] == signature:
+            return cached["sha256"]
+
+        sha256 = model_fingerprint(Path(path))
+        self.state["files"][path] = {"signature": signature, "sha256": sha256}
+        return sha256
+
+
+    def _path_hash(self, path: str) -> str:
+        """
+        Hashes a file, or the relative paths and contents of every file below a directory.
+        """
+        if not os.path.exists(path):
+            return "missing"
+        if os.path.isfile(path):
+            return self._file_hash(path)
+
+        sha256 = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                sha256.update(f"{os.path.relpath(file_path, path)}|{self._file_hash(file_path)}\n".encode())
+        return sha256.hexdigest()
+
+
+    @staticmethod
+    def _config_value(config: ConfigBox, section: str):
+        """
+        Returns a top-level section of the configuration, or one of its keys for `section.key`.
+        """
+        value = config
+        for key in section.split("."):
+            value = value.get(key) if value is not None else None
+        return value
+
+
+    def input_hash(self, spec: StageSpec, config: ConfigBox, params: ConfigBox) -> str:
+        """
+        Computes the hash of everything a stage depends on.
+        """
+        inputs = {
+            "config": {section: self._config_value(config, section) for section in spec.config_sections},
+            "params": {key: params.get(key) for key in spec.params},
+            "deps": {str(dep): self._path_hash(str(dep)) for dep in spec.deps},
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+    def is_up_to_date(self, spec: StageSpec, input_hash: str) -> bool:
+        """
+        Checks whether the stage last succeeded with the same inputs and its outputs still exist.
+        """
+        record = self.state["stages"].get(spec.key)
+        return (
+            record is not None
+            and record["input_hash"] == input_hash
+            and all(os.path.exists(out) for out in spec.outs)
+        )
+
+
+    def record(self, spec: StageSpec, input_hash: str, seconds: float):
+        """
+        Records a successful run of the stage.
+        """
+        self.state["stages"][spec.key] = {
+            "input_hash": input_hash,
+            "finished_at": time.time(),
+            "seconds": seconds,
+        }
+        self._save()
+        logger.info(f"Recorded inputs of {spec.name} (sha256={input_hash[:12]})")
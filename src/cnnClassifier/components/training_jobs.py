@@ -0,0 +1,232 @@
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from cnnClassifier import logger
+from cnnClassifier.entity.config_entity import TrainingJobsConfig
+
+
+# main.py and the relative paths it reads (config/, params.yaml, artifacts/) live here
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+class TrainingJobRunningError(Exception):
+    """Raised when a training job is submitted while another one is still running."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Training job {job_id} is already running")
+        self.job_id = job_id
+
+
+def _write_json(path: Path, data: dict):
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+class JobStatus:
+    """
+    Status file of one training run, written by the training process (`main.py --status-file`).
+
+    Records the overall state, the current stage, the progress (completed stages / total stages)
+    and the start, end and duration of every stage.
+    """
+
+    def __init__(self, path: Path, stages: list):
+        self.path = Path(path)
+        with open(self.path) as f:
+            self.status = json.load(f)
+        self.status.update({
+            "state": "running",
+            "pid": os.getpid(),
+            "started_at": time.time(),
+            "stages": [{"name": name, "state": "pending"} for name in stages],
+            "current_stage": None,
+            "progress": 0.0,
+        })
+        self._save()
+
+
+    def _save(self):
+        _write_json(self.path, self.status)
+
+
+    def _stage(self, name: str) -> dict:
+        return next(stage for stage in self.status["stages"] if stage["name"] == name)
+
+
+    def stage_started(self, name: str):
+        stage = self._stage(name)
+        stage.update({"state": "running", "started_at": time.time()})
+        self.status["current_stage"] = name
+        self._save()
+
+
+    def stage_finished(self, name: str, state: str = "completed"):
+        stage = self._stage(name)
+        stage.update({"state": state, "finished_at": time.time()})
+        stage["seconds"] = stage["finished_at"] - stage.get("started_at", stage["finished_at"])
+        done = sum(stage["state"] in ("completed", "skipped") for stage in self.status["stages"])
+        self.status["progress"] = done / len(self.status["stages"])
+        self._save()
+
+
+    def finish(self, error: str = None):
+        self.status.update({
+            "state": "failed" if error else "succeeded",
+            "finished_at": time.time(),
+            "current_stage": None,
+            "error": error,
+        })
+        self.status["seconds"] = self.status["finished_at"] - self.status["started_at"]
+        self._save()
+
+
+class TrainingJobManager:
+    """
+    Runs the training pipeline (`main.py`) as background jobs, one at a time.
+
+    Every job gets an id and a directory under `root_dir` holding its status file and log. The
+    training process inherits an exclusive `flock` on `root_dir/train.lock` and holds it until it
+    exits, so concurrent submissions - from any thread or server process - are rejected while a run
+    is in progress, and a crashed run releases the lock automatically. The training process runs at
+    a lower CPU priority (`niceness`) so serving keeps its latency. It runs `main.py` of the project
+    root in that directory, whatever the working directory of the server, and is reaped once it
+    exits, the next time a job is submitted or a status is read.
+    """
+
+    def __init__(self, config: TrainingJobsConfig):
+        self.config = config
+        self.root_dir = Path(self.config.root_dir).resolve()
+        self._processes = {}
+        self.lock_path = self.root_dir / "train.lock"
+        os.makedirs(self.root_dir, exist_ok=True)
+
+
+    def _status_path(self, job_id: str) -> Path:
+        return self.root_dir / job_id / "status.json"
+
+
+    def _reap(self):
+        """
+        Collects the exit status of the training processes started here that have finished, so they
+        do not linger as zombies.
+        """
+        for job_id, process in list(self._processes.items()):
+            if process.poll() is not None:
+                self._processes.pop(job_id, None)
+
+
+    def _running_job_id(self):
+        """
+        Returns the id of the job holding the training lock, or None.
+        """
+        current = self.root_dir / "current.json"
+        if not current.exists():
+            return None
+        with open(current) as f:
+            return json.load(f).get("job_id")
+
+
+    def submit(self) -> dict:
+        """
+        Starts a training run in a background process and returns its status right away.
+
+        Returns:
+            dict: The status of the new job, including its `job_id`.
+
+        Raises:
+            TrainingJobRunningError: If another training run holds the lock.
+        """
+        self._reap()
+        lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise TrainingJobRunningError(self._running_job_id())
+
+            job_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+            job_dir = self.root_dir / job_id
+            os.makedirs(job_dir)
+            status_path = self._status_path(job_id)
+            log_path = job_dir / "log.txt"
+            _write_json(status_path, {
+                "job_id": job_id,
+                "state": "queued",
+                "created_at": time.time(),
+                "log_path": str(log_path),
+            })
+            _write_json(self.root_dir / "current.json", {"job_id": job_id})
+
+            command = [sys.executable, str(PROJECT_ROOT / "main.py"), "--status-file", str(status_path)]
+            if self.config.niceness:
+                command = ["nice", "-n", str(self.config.niceness)] + command
+            with open(log_path, "ab") as log:
+                # the child inherits the locked file description and holds the lock until it exits
+                process = subprocess.Popen(
+                    command,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    cwd=PROJECT_ROOT,
+                    pass_fds=(lock_fd,),
+                    start_new_session=True,
+                )
+            self._processes[job_id] = process
+            logger.info(f"Started training job {job_id} (pid {process.pid}), log at: {log_path}")
+        finally:
+            os.close(lock_fd)
+
+        return self.status(job_id)
+
+
+    def _lock_is_held(self) -> bool:
+        lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(lock_fd)
+
+
+    def status(self, job_id: str) -> dict:
+        """
+        Returns the status of a job: state (queued, running, succeeded or failed), current stage,
+        progress, per-stage timing and the log path.
+
+        A job that is not finished although no process holds the training lock any more has crashed
+        (e.g. it was killed); it is reported and recorded as failed.
+
+        Raises:
+            FileNotFoundError: If there is no job with this id.
+        """
+        self._reap()
+        status_path = self._status_path(os.path.basename(job_id))
+        with open(status_path) as f:
+            status = json.load(f)
+
+        job_is_running = self._lock_is_held() and self._running_job_id() == status["job_id"]
+        if status["state"] in ("queued", "running") and not job_is_running:
+            # re-read: the job may have finished between the first read and the lock check
+            with open(status_path) as f:
+                status = json.load(f)
+            if status["state"] in ("queued", "running"):
+                status.update({"state": "failed", "error": "training process exited unexpectedly", "finished_at": time.time()})
+                _write_json(status_path, status)
+        return status
+
+
+    def list_jobs(self) -> list:
+        """
+        Returns the status of every job, most recent first.
+        """
+        job_ids = sorted((path.parent.name for path in self.root_dir.glob("*/status.json")), reverse=True)
+        return [self.status(job_id) for job_id in job_ids]
@@ -1,7 +1,8 @@
 from pathlib import Path
 from cnnClassifier.constants import *
 from cnnClassifier.entity.config_entity import DataIngestionConfig, PrepareBaseModelConfig, \
-                                                TrainingConfig, EvaluationConfig
+                                                TrainingConfig, TrainingJobsConfig, EvaluationConfig, ModelExportConfig, \
+                                                PredictionConfig, BatchPredictionConfig, SweepConfig
 from cnnClassifier.utils.common import read_yaml, create_directories
 
 
@@ -42,7 +43,8 @@ class ConfigurationManager:
 
         Returns:
             DataIngestionConfig: The configuration for data ingestion, including the root directory, source URL,
-            local data file, and unzip directory.
+            local data file, unzip directory, archive checksum, extraction workers, dataset directory, image cache directory, image size,
+            preprocessing parameters and whether to build the image cache.
 
         Description:
             This function retrieves the data ingestion configuration from the `data_ingestion` section of the
@@ -52,9 +54,19 @@ class ConfigurationManager:
         Note:
             - The `data_ingestion` section of the configuration file should contain the following keys:
                 - `root_dir`: The root directory for data ingestion.
-                - `source_url`: The URL of the data source.
+                - `source_url`: The URL of the data source: a Google Drive share link, an HTTP(S) URL,
+                  a `file://` URL or a local path.
                 - `local_data_file`: The local file path where the data will be saved.
                 - `unzip_dir`: The directory where the downloaded data will be extracted.
+                - `source_sha256`: The expected SHA-256 of the archive, or empty to skip verification.
+                - `extract_workers`: The number of threads extracting the archive.
+                - `image_cache_dir`: The directory of the pre-decoded, memory-mapped image cache.
+            - The `training` section of the configuration file should contain the following key:
+                - `training_data`: The extracted dataset directory.
+            - The `params` section of the configuration file should contain the following keys:
+                - `IMAGE_SIZE`: The size the cached images are resized to.
+                - `PREPROCESSING`: How the cached images are resized (see `ImagePreprocessor.from_params`).
+                - `IMAGE_CACHE`: Whether to build the image cache.
 
         """
         config = self.config.data_ingestion
@@ -65,7 +77,14 @@ class ConfigurationManager:
             root_dir=config.root_dir,
             source_url=config.source_url,
             local_data_file=config.local_data_file,
-            unzip_dir=config.unzip_dir
+            unzip_dir=config.unzip_dir,
+            source_sha256=config.source_sha256,
+            extract_workers=config.extract_workers,
+            dataset_dir=Path(self.config.training.training_data),
+            image_cache_dir=Path(config.image_cache_dir),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_preprocessing=dict(self.params.PREPROCESSING),
+            params_image_cache=self.params.IMAGE_CACHE
         )
 
         return data_ingestion_config
@@ -93,8 +112,13 @@ class ConfigurationManager:
                 - `params_include_top`: Whether to include the top layer of the base model.
                 - `params_weights`: The weights for the base model.
                 - `params_classes`: The number of classes for the base model.
+                - `params_freeze_till`: The number of trainable layers at the top of the base model (0 freezes all of them).
+            - The `model_artifacts` section of the configuration file should contain the following keys:
+                - `root_dir`: The versioned model store; both model paths are links to versions in it.
+                - `versions_to_keep`: The number of versions of every model kept in the store.
         """
         config = self.config.prepare_base_model
+        model_artifacts = self.config.model_artifacts
 
         create_directories([config.root_dir])
 
@@ -102,10 +126,13 @@ class ConfigurationManager:
             root_dir=config.root_dir,
             base_model_path=config.base_model_path,
             updated_base_model_path=config.updated_base_model_path,
+            artifact_store_dir=Path(model_artifacts.root_dir),
+            artifact_versions_to_keep=model_artifacts.versions_to_keep,
             params_image_size=self.params.IMAGE_SIZE,
             params_include_top=self.params.INCLUDE_TOP,
             params_weights=self.params.WEIGHTS,
-            params_classes=self.params.CLASSES
+            params_classes=self.params.CLASSES,
+            params_freeze_till=self.params.FREEZE_TILL
         )
 
         return prepare_base_model_config
@@ -118,7 +145,8 @@ class ConfigurationManager:
         Returns:
             TrainingConfig: The training configuration object containing the root directory, trained model path,
             trained model path for tracking, updated base model path, training data, epochs, batch size,
-            augmentation flag, image size, and learning rate.
+            augmentation flag, image size, learning rate, input pipeline, data cache mode, seed, the
+            performance profile, the distribution strategy, the checkpoint settings and the training step profiler.
 
         Description:
             This function retrieves the training configuration from the `training` section of the configuration file.
@@ -132,17 +160,52 @@ class ConfigurationManager:
                 - `trained_model_path`: The path to the trained model.
                 - `trained_model_path_for_tracking`: The path to the trained model for tracking.
                 - `training_data`: The path to the training data.
+                - `checkpoint_dir`: The directory of the resumable training checkpoints.
+                - `checkpoint_every_epochs`: How often (in epochs) a checkpoint is written.
+                - `checkpoints_to_keep`: The number of checkpoints kept.
+            - The `evaluation` section of the configuration file should contain the following key:
+                - `predictions_path`: Where the validation probabilities of the trained model are stored for evaluation.
             - The `prepare_base_model` section of the configuration file should contain the following key:
                 - `updated_base_model_path`: The path to the updated base model.
+            - The `model_artifacts` section of the configuration file should contain the following keys:
+                - `root_dir`: The versioned model store; the trained model is saved there once and both
+                  trained model paths are links to that version.
+                - `versions_to_keep`: The number of versions of every model kept in the store.
             - The `params` section of the configuration file should contain the following keys:
                 - `EPOCHS`: The number of epochs for training.
                 - `BATCH_SIZE`: The batch size for training.
                 - `AUGMENTATION`: Whether to apply augmentation to the training data.
                 - `IMAGE_SIZE`: The image size for training.
+                - `PREPROCESSING`: The image preprocessing (`INTERPOLATION`, `NORMALIZATION`, `RESCALE`),
+                  saved next to the trained model.
                 - `LEARNING_RATE`: The learning rate for training.
+                - `DATA_PIPELINE`: The input pipeline, `tf_data` or `keras_generator`.
+                - `DATA_CACHE`: Where the tf.data pipeline caches decoded images: `none`, `memory` or `disk`.
+                - `SEED`: The seed for shuffling and augmentation in the tf.data pipeline.
+                - `IMAGE_CACHE`: Whether to read the images from the pre-decoded image cache when it is up to date.
+                - `BOTTLENECK_CACHE`: Whether to train only the head on cached frozen-backbone features when possible.
+                - `VALIDATION_SPLIT`: The fraction of each class held out for validation.
+                - `PERFORMANCE`: The performance profile:
+                    - `MIXED_PRECISION`: `float32`, `mixed_bfloat16` or `auto` (bfloat16 when the CPU supports it).
+                    - `INTRA_OP_THREADS` / `INTER_OP_THREADS`: TensorFlow thread pool sizes, 0 for the default.
+                    - `ONEDNN`: Whether to use the oneDNN optimized CPU kernels.
+                    - `XLA_JIT`: Whether to compile the training step with XLA.
+                - `DISTRIBUTION`: The data-parallel training setup:
+                    - `STRATEGY`: `none`, `mirrored`, `multi_worker` (cluster from `TF_CONFIG`) or `auto`.
+                    - `CPU_DEVICES`: The number of logical CPU devices (replicas) of the `mirrored` strategy.
+                    - `SCALE_LEARNING_RATE`: Whether the learning rate is multiplied by the number of replicas.
+            - The `data_ingestion` section of the configuration file should contain the following keys:
+                - `image_cache_dir`: The directory of the pre-decoded image cache.
+                - `split_path`: The persisted training/validation split.
+            - The `profiling` section of the configuration file should contain the following keys:
+                - `root_dir`: The directory profiles are written to.
+                - `training_profile`: `none`, `cprofile` or `tensorflow`, the profiler of one training step.
+                - `training_profile_step`: The (0-based) training step that is profiled.
         """
         training = self.config.training
         prepare_base_model = self.config.prepare_base_model
+        performance = self.params.PERFORMANCE
+        distribution = self.params.DISTRIBUTION
         create_directories([self.config.training.root_dir])
 
         training_config = TrainingConfig(
@@ -150,17 +213,71 @@ class ConfigurationManager:
             trained_model_path=training.trained_model_path,
             trained_model_path_for_tracking=training.trained_model_path_for_tracking,
             updated_base_model_path = prepare_base_model.updated_base_model_path,
+            artifact_store_dir=Path(self.config.model_artifacts.root_dir),
+            artifact_versions_to_keep=self.config.model_artifacts.versions_to_keep,
             training_data=training.training_data,
             params_epochs=self.params.EPOCHS,
             params_batch_size=self.params.BATCH_SIZE,
             params_is_augmentation=self.params.AUGMENTATION,
             params_image_size=self.params.IMAGE_SIZE,
+            params_preprocessing=dict(self.params.PREPROCESSING),
             params_learning_rate=self.params.LEARNING_RATE,
+            params_data_pipeline=self.params.DATA_PIPELINE,
+            params_data_cache=self.params.DATA_CACHE,
+            params_seed=self.params.SEED,
+            image_cache_dir=Path(self.config.data_ingestion.image_cache_dir),
+            params_image_cache=self.params.IMAGE_CACHE,
+            params_bottleneck_cache=self.params.BOTTLENECK_CACHE,
+            params_mixed_precision=performance.MIXED_PRECISION,
+            params_intra_op_threads=performance.INTRA_OP_THREADS,
+            params_inter_op_threads=performance.INTER_OP_THREADS,
+            params_onednn=performance.ONEDNN,
+            params_xla_jit=performance.XLA_JIT,
+            params_distribution_strategy=distribution.STRATEGY,
+            params_cpu_devices=distribution.CPU_DEVICES,
+            params_scale_learning_rate=distribution.SCALE_LEARNING_RATE,
+            checkpoint_dir=Path(training.checkpoint_dir),
+            checkpoint_every_epochs=training.checkpoint_every_epochs,
+            checkpoints_to_keep=training.checkpoints_to_keep,
+            split_path=Path(self.config.data_ingestion.split_path),
+            predictions_path=Path(self.config.evaluation.predictions_path),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            profile_dir=Path(self.config.profiling.root_dir),
+            training_profile=self.config.profiling.training_profile,
+            training_profile_step=self.config.profiling.training_profile_step,
         )
 
         return training_config
     
 
+    def get_training_jobs_config(self) -> TrainingJobsConfig:
+        """
+        Retrieves the background training jobs configuration and creates the necessary directories.
+
+        Returns:
+            TrainingJobsConfig: The training jobs configuration object.
+
+        Description:
+            This function retrieves the configuration of the background training runs started by `/train`
+            from the `training_jobs` section of the configuration object.
+            It creates a `TrainingJobsConfig` object with the following parameters:
+                - `root_dir`: The directory holding the training lock and the status file and log of every job.
+                - `niceness`: The CPU priority (nice value) of the training process.
+
+        Note:
+            - The `training_jobs` section of the configuration object should contain the `root_dir` and `niceness` keys.
+        """
+        training_jobs = self.config.training_jobs
+        create_directories([training_jobs.root_dir])
+
+        training_jobs_config = TrainingJobsConfig(
+            root_dir=Path(training_jobs.root_dir),
+            niceness=training_jobs.niceness
+        )
+
+        return training_jobs_config
+
+
     def get_evaluation_config(self) -> EvaluationConfig:
         """
         Retrieves the evaluation configuration from the configuration object.
@@ -176,7 +293,15 @@ class ConfigurationManager:
                 - `all_params`: The parameters dictionary from the configuration object.
                 - `mlflow_uri`: The MLflow URI from the evaluation section of the configuration object.
                 - `params_image_size`: The image size for training.
+                - `params_preprocessing`: The `PREPROCESSING` parameters, used for models saved without a preprocessing spec.
                 - `params_batch_size`: The batch size for training.
+                - `image_cache_dir`: The directory of the pre-decoded image cache.
+                - `params_image_cache`: Whether to read the images from the image cache when it is up to date.
+                - `root_dir`: The directory of the evaluation artifacts.
+                - `split_path`: The persisted training/validation split shared with training.
+                - `predictions_path`: The stored validation probabilities of the trained model.
+                - `report_path`: The JSON report with the per-class metrics and the confusion matrix.
+                - `params_validation_split`: The fraction of each class held out for validation.
 
             The function then returns the created `EvaluationConfig` object.
 
@@ -184,14 +309,20 @@ class ConfigurationManager:
             - The `training` section of the configuration object should contain the following keys:
                 - `trained_model_path`: The path to the trained model.
                 - `training_data`: The path to the training data.
-            - The `evaluation` section of the configuration object should contain the following key:
-                - `mlflow_uri`: The MLflow URI.
+            - The `evaluation` section of the configuration object should contain the following keys:
+                - `root_dir`, `mlflow_uri`, `predictions_path` and `report_path`.
+            - The `data_ingestion` section of the configuration object should contain the following keys:
+                - `image_cache_dir` and `split_path`.
             - The `params` section of the configuration object should contain the following keys:
                 - `IMAGE_SIZE`: The image size for training.
+                - `PREPROCESSING`: The image preprocessing.
                 - `BATCH_SIZE`: The batch size for training.
+                - `IMAGE_CACHE`: Whether to read the images from the image cache.
+                - `VALIDATION_SPLIT`: The fraction of each class held out for validation.
         """
         training = self.config.training
         evaluation = self.config.evaluation
+        create_directories([evaluation.root_dir])
         
         evaluation_config = EvaluationConfig(
             path_of_model=training.trained_model_path,
@@ -199,7 +330,290 @@ class ConfigurationManager:
             all_params=self.params,
             mlflow_uri=evaluation.mlflow_uri,
             params_image_size=self.params.IMAGE_SIZE,
-            params_batch_size=self.params.BATCH_SIZE
+            params_preprocessing=dict(self.params.PREPROCESSING),
+            params_batch_size=self.params.BATCH_SIZE,
+            image_cache_dir=Path(self.config.data_ingestion.image_cache_dir),
+            params_image_cache=self.params.IMAGE_CACHE,
+            root_dir=Path(evaluation.root_dir),
+            split_path=Path(self.config.data_ingestion.split_path),
+            predictions_path=Path(evaluation.predictions_path),
+            report_path=Path(evaluation.report_path),
+            params_validation_split=self.params.VALIDATION_SPLIT
+        )
+
+        return evaluation_config
+
+
+    def get_model_export_config(self) -> ModelExportConfig:
+        """
+        Retrieves the model export configuration and creates the necessary directories.
+
+        Returns:
+            ModelExportConfig: The model export configuration object.
+
+        Description:
+            This function retrieves the model export configuration from the `model_export` section of the configuration object,
+            and the trained model and training data from the `training` section.
+            It creates a `ModelExportConfig` object with the following parameters:
+                - `root_dir`: The directory the exported models are written to.
+                - `model_path`: The path to the trained model.
+                - `training_data`: The path to the training data, used for calibration and validation.
+                - `report_path`: The JSON file the accuracy/size/latency report is written to.
+                - `formats`: The exported variants (`tflite_float32`, `tflite_dynamic`, `tflite_float16`, `tflite_int8`, `onnx`).
+                - `representative_samples`: The number of training images used to calibrate the int8 model.
+                - `latency_iterations`: The number of timed single-image calls per variant.
+                - `params_image_size`: The image size of the model.
+                - `params_preprocessing`: The `PREPROCESSING` parameters, used for models saved without a preprocessing spec.
+                - `params_batch_size`: The batch size used for the validation pass.
+                - `params_seed`: The seed used to draw the calibration images.
+                - `split_path`: The persisted training/validation split shared with training and evaluation.
+                - `params_validation_split`: The fraction of each class held out for validation.
+
+        Note:
+            - The `model_export` section of the configuration object should contain the following keys:
+                - `root_dir`, `report_path`, `formats`, `representative_samples` and `latency_iterations`.
+            - The `training` section of the configuration object should contain the following keys:
+                - `trained_model_path`: The path to the trained model.
+                - `training_data`: The path to the training data.
+            - The `data_ingestion` section of the configuration object should contain the following key:
+                - `split_path`: The persisted training/validation split.
+            - The `params` section of the configuration object should contain the following keys:
+                - `IMAGE_SIZE`, `PREPROCESSING`, `BATCH_SIZE`, `SEED` and `VALIDATION_SPLIT`.
+        """
+        model_export = self.config.model_export
+        training = self.config.training
+        create_directories([model_export.root_dir])
+
+        model_export_config = ModelExportConfig(
+            root_dir=Path(model_export.root_dir),
+            model_path=Path(training.trained_model_path),
+            training_data=Path(training.training_data),
+            report_path=Path(model_export.report_path),
+            formats=list(model_export.formats),
+            representative_samples=model_export.representative_samples,
+            latency_iterations=model_export.latency_iterations,
+            params_image_size=self.params.IMAGE_SIZE,
+            params_preprocessing=dict(self.params.PREPROCESSING),
+            params_batch_size=self.params.BATCH_SIZE,
+            params_seed=self.params.SEED,
+            split_path=Path(self.config.data_ingestion.split_path),
+            params_validation_split=self.params.VALIDATION_SPLIT
+        )
+
+        return model_export_config
+
+
+    def get_prediction_config(self, prefork: bool = False) -> PredictionConfig:
+        """
+        Retrieves the prediction (serving) configuration from the configuration object.
+
+        Args:
+            prefork (bool, optional): Whether the configuration is for a worker of the pre-fork server, which
+                serves `serving.prefork_backend` when it is set. Defaults to False.
+
+        Returns:
+            PredictionConfig: The prediction configuration object.
+
+        Description:
+            This function retrieves the serving configuration from the `prediction` section of the configuration object.
+            It creates a `PredictionConfig` object with the following parameters:
+                - `model_path`: The path to the model served by the prediction pipeline: `model` for the `keras`
+                  backend, otherwise the exported file of that backend under `model_export.root_dir`.
+                - `backend`: `keras` or one of the exported formats (see `EXPORT_FILES`); for the pre-fork
+                  server `serving.prefork_backend` if set.
+                - `export_report_path`: The report of the model export stage, which gates the quantized backends.
+                - `max_accuracy_drop`: The largest validation accuracy drop (vs. the Keras model) a quantized
+                  backend may show in the export report to be served.
+                - `class_names`: The class names, in the order of the model outputs.
+                - `watch_interval_seconds`: How often (in seconds) the registry's watcher thread checks the
+                  model file for changes. A negative value disables hot-swapping.
+                - `batching_enabled`: Whether concurrent requests are grouped into one forward pass.
+                - `max_batch_size`: The largest batch the micro-batcher builds.
+                - `max_wait_ms`: How long the micro-batcher waits for more requests after the first one.
+                - `result_cache_enabled`: Whether prediction results are cached per image and model.
+                - `result_cache_max_entries`: The number of results kept in memory (LRU).
+                - `result_cache_ttl_seconds`: How long a cached result stays valid.
+                - `result_cache_disk_path`: The SQLite file of the on-disk result tier, or None for memory only.
+                - `compiled`: Whether the model is served through a `tf.function` with a fixed input signature.
+                - `jit_compile`: Whether the serving function is compiled with XLA.
+                - `warmup_batch_sizes`: The batch sizes run once when a model is loaded.
+                - `workers`: The number of serving processes of the pre-fork server.
+                - `worker_threads`: The number of request threads per serving process.
+                - `max_queue`: The number of requests the ASGI app queues before rejecting new ones with 429.
+                - `request_timeout_ms`: The default deadline of an ASGI request, after which it is answered with 503.
+                - `max_upload_mb`: The largest `/predict` request body; larger ones are answered with 413.
+                - `max_images_per_request`: The most images one multipart `/predict` upload may hold.
+                - `intra_op_threads`: The threads used inside one op per process (0: an even share of the CPU cores).
+                - `inter_op_threads`: The ops run in parallel per process (0: derived from `intra_op_threads`).
+                - `params_image_size`: The image size the model expects.
+                - `params_preprocessing`: The `PREPROCESSING` parameters, used for models saved without a preprocessing spec.
+                - `profile_dir`: The directory request profiles are written to.
+                - `request_profiles`: Whether a single request can ask for a cProfile or TensorFlow profile.
+
+        Note:
+            - The `prediction` section of the configuration object should contain the following keys:
+                - `model`: The path to the served Keras model.
+                - `backend`: The serving backend.
+                - `max_accuracy_drop`: The accuracy tolerance of the quantized backends.
+                - `class_names`: The class names, in the order of the model outputs.
+                - `watch_interval_seconds`: The model file watch interval.
+                - `batching`: A section with the `enabled`, `max_batch_size` and `max_wait_ms` keys.
+                - `result_cache`: A section with the `enabled`, `max_entries`, `ttl_seconds` and `disk_path` keys.
+                - `serving`: A section with the `compiled`, `jit_compile`, `warmup_batch_sizes`, `workers`,
+                  `worker_threads`, `prefork_backend`, `max_queue`, `request_timeout_ms`, `max_upload_mb`, `max_images_per_request`,
+                  `intra_op_threads` and `inter_op_threads` keys.
+            - The `profiling` section of the configuration object should contain the `root_dir` and
+              `request_profiles` keys.
+        """
+        prediction = self.config.prediction
+        backend = prediction.backend
+        if prefork and prediction.serving.prefork_backend:
+            backend = prediction.serving.prefork_backend
+        if backend == "keras":
+            model_path = Path(prediction.model)
+        elif backend in EXPORT_FILES:
+            model_path = Path(self.config.model_export.root_dir) / EXPORT_FILES[backend]
+        else:
+            raise ValueError(f"Unknown prediction backend {backend}, expected 'keras' or one of {list(EXPORT_FILES)}")
+
+        prediction_config = PredictionConfig(
+            model_path=model_path,
+            backend=backend,
+            export_report_path=Path(self.config.model_export.report_path),
+            max_accuracy_drop=prediction.max_accuracy_drop,
+            class_names=list(prediction.class_names),
+            watch_interval_seconds=prediction.watch_interval_seconds,
+            batching_enabled=prediction.batching.enabled,
+            max_batch_size=prediction.batching.max_batch_size,
+            max_wait_ms=prediction.batching.max_wait_ms,
+            result_cache_enabled=prediction.result_cache.enabled,
+            result_cache_max_entries=prediction.result_cache.max_entries,
+            result_cache_ttl_seconds=prediction.result_cache.ttl_seconds,
+            result_cache_disk_path=Path(prediction.result_cache.disk_path) if prediction.result_cache.disk_path else None,
+            compiled=prediction.serving.compiled,
+            jit_compile=prediction.serving.jit_compile,
+            warmup_batch_sizes=list(prediction.serving.warmup_batch_sizes),
+            workers=prediction.serving.workers,
+            worker_threads=prediction.serving.worker_threads,
+            max_queue=prediction.serving.max_queue,
+            request_timeout_ms=prediction.serving.request_timeout_ms,
+            max_upload_mb=prediction.serving.max_upload_mb,
+            max_images_per_request=prediction.serving.max_images_per_request,
+            intra_op_threads=prediction.serving.intra_op_threads,
+            inter_op_threads=prediction.serving.inter_op_threads,
+            params_image_size=self.params.IMAGE_SIZE,
+            params_preprocessing=dict(self.params.PREPROCESSING),
+            profile_dir=Path(self.config.profiling.root_dir),
+            request_profiles=self.config.profiling.request_profiles
+        )
+
+        return prediction_config
+    
+
+    def get_batch_prediction_config(self) -> BatchPredictionConfig:
+        """
+        Retrieves the batch prediction configuration and creates the necessary directories.
+
+        Returns:
+            BatchPredictionConfig: The batch prediction configuration object.
+
+        Description:
+            This function retrieves the batch prediction configuration from the `batch_prediction` section of the
+            configuration object, and the served model and class names from the `prediction` section.
+            It creates a `BatchPredictionConfig` object with the following parameters:
+                - `root_dir`: The root directory for batch prediction outputs.
+                - `model_path`: The path to the model used for scoring.
+                - `output_path`: The default CSV/Parquet file the predictions are written to.
+                - `batch_size`: The number of images per forward pass.
+                - `class_names`: The class names, in the order of the model outputs.
+                - `params_image_size`: The image size the model expects.
+                - `params_preprocessing`: The `PREPROCESSING` parameters, used for models saved without a preprocessing spec.
+
+        Note:
+            - The `batch_prediction` section of the configuration object should contain the following keys:
+                - `root_dir`: The root directory for batch prediction outputs.
+                - `output_path`: The default output file.
+                - `batch_size`: The number of images per forward pass.
+            - The `params` section of the configuration object should contain the following keys:
+                - `IMAGE_SIZE`: The image size for the model.
+                - `PREPROCESSING`: The image preprocessing.
+        """
+        batch_prediction = self.config.batch_prediction
+        prediction = self.config.prediction
+        create_directories([batch_prediction.root_dir])
+
+        batch_prediction_config = BatchPredictionConfig(
+            root_dir=Path(batch_prediction.root_dir),
+            model_path=Path(prediction.model),
+            output_path=Path(batch_prediction.output_path),
+            batch_size=batch_prediction.batch_size,
+            class_names=list(prediction.class_names),
+            params_image_size=self.params.IMAGE_SIZE,
+            params_preprocessing=dict(self.params.PREPROCESSING)
+        )
+
+        return batch_prediction_config
+
+
+    def get_sweep_config(self, space_path: Path = None) -> SweepConfig:
+        """
+        Retrieves the hyperparameter sweep configuration and creates the necessary directories.
+
+        Args:
+            space_path (Path, optional): The YAML file with the search space. Defaults to `sweep.space_path`.
+
+        Returns:
+            SweepConfig: The hyperparameter sweep configuration object.
+
+        Description:
+            This function retrieves the sweep settings from the `sweep` section of the configuration object and
+            reads the search space file (`sweep.yaml` by default).
+            It creates a `SweepConfig` object with the following parameters:
+                - `root_dir`: The directory holding one directory per sweep, with a directory per trial.
+                - `mlflow_uri`: The local MLflow file store the trial runs are logged to.
+                - `parallel_trials`: The number of trials trained at the same time.
+                - `threads_per_trial`: The CPU threads of every trial (0 splits the cores evenly).
+                - `base_config`, `base_params`: The whole configuration and parameters every trial starts from.
+                - `training_data`, `split_path`, `params_validation_split`: The dataset and its persisted split,
+                  shared by all trials.
+                - `params_epochs`: The epochs of a fully trained trial.
+                - `sweep_method`: grid or random.
+                - `sweep_trials`: The number of random search trials.
+                - `sweep_seed`: The seed of the random search.
+                - `sweep_metric`: The evaluation score trials are ranked by.
+                - `sweep_successive_halving`, `sweep_min_epochs`, `sweep_eta`: The successive halving schedule.
+                - `sweep_space`: The search space, by parameter name.
+
+        Note:
+            - The `sweep` section of the configuration object should contain the `root_dir`, `space_path`,
+              `mlflow_uri`, `parallel_trials` and `threads_per_trial` keys.
+            - The search space file should contain the `METHOD`, `TRIALS`, `SEED`, `METRIC`, `SUCCESSIVE_HALVING`
+              and `SPACE` keys.
+        """
+        sweep = self.config.sweep
+        space = read_yaml(Path(space_path or sweep.space_path))
+        halving = space.SUCCESSIVE_HALVING
+        create_directories([sweep.root_dir])
+
+        sweep_config = SweepConfig(
+            root_dir=Path(sweep.root_dir),
+            mlflow_uri=sweep.mlflow_uri,
+            parallel_trials=sweep.parallel_trials,
+            threads_per_trial=sweep.threads_per_trial,
+            base_config=self.config.to_dict(),
+            base_params=self.params.to_dict(),
+            training_data=Path(self.config.training.training_data),
+            split_path=Path(self.config.data_ingestion.split_path),
+            params_validation_split=self.params.VALIDATION_SPLIT,
+            params_epochs=self.params.EPOCHS,
+            sweep_method=space.METHOD,
+            sweep_trials=space.TRIALS,
+            sweep_seed=space.SEED,
+            sweep_metric=space.METRIC,
+            sweep_successive_halving=halving.ENABLED,
+            sweep_min_epochs=halving.MIN_EPOCHS,
+            sweep_eta=halving.ETA,
+            sweep_space=space.SPACE.to_dict()
         )
 
-        return evaluation_config
\ No newline at end of file
+        return sweep_config
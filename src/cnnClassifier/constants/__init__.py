@@ -1,4 +1,16 @@
 from pathlib import Path
 
 CONFIG_FILE_PATH = Path("config/config.yaml")
-PARAMS_FILE_PATH = Path("params.yaml")
\ No newline at end of file
+PARAMS_FILE_PATH = Path("params.yaml")
+
+# exported model variants (serving backends other than "keras") and the file each one is written to
+EXPORT_FILES = {
+    "tflite_float32": "model_float32.tflite",
+    "tflite_dynamic": "model_dynamic.tflite",
+    "tflite_float16": "model_float16.tflite",
+    "tflite_int8": "model_int8.tflite",
+    "onnx": "model.onnx",
+}
+# exported variants with quantized weights, served only when their export report shows no accuracy drop
+# beyond `prediction.max_accuracy_drop`
+QUANTIZED_BACKENDS = ("tflite_dynamic", "tflite_float16", "tflite_int8")
@@ -7,6 +7,13 @@ class DataIngestionConfig:
     source_url: str
     local_data_file: Path
     unzip_dir: Path
+    source_sha256: str
+    extract_workers: int
+    dataset_dir: Path
+    image_cache_dir: Path
+    params_image_size: list
+    params_preprocessing: dict
+    params_image_cache: bool
 
 
 @dataclass(frozen=True)
@@ -14,10 +21,13 @@ class PrepareBaseModelConfig:
     root_dir: Path
     base_model_path: Path
     updated_base_model_path: Path
+    artifact_store_dir: Path
+    artifact_versions_to_keep: int
     params_image_size: list
     params_include_top: bool
     params_weights: str
     params_classes: int
+    params_freeze_till: int
 
 
 @dataclass(frozen=True)
@@ -26,14 +36,46 @@ class TrainingConfig:
     trained_model_path: Path
     trained_model_path_for_tracking: Path
     updated_base_model_path: Path
+    artifact_store_dir: Path
+    artifact_versions_to_keep: int
     training_data: Path
     params_epochs: int
     params_batch_size: int
     params_is_augmentation: bool
     params_image_size: list
+    params_preprocessing: dict
     params_learning_rate: float
+    params_data_pipeline: str
+    params_data_cache: str
+    params_seed: int
+    image_cache_dir: Path
+    params_image_cache: bool
+    params_bottleneck_cache: bool
+    params_mixed_precision: str
+    params_intra_op_threads: int
+    params_inter_op_threads: int
+    params_onednn: bool
+    params_xla_jit: bool
+    params_distribution_strategy: str
+    params_cpu_devices: int
+    params_scale_learning_rate: bool
+    checkpoint_dir: Path
+    checkpoint_every_epochs: int
+    checkpoints_to_keep: int
+    split_path: Path
+    predictions_path: Path
+    params_validation_split: float
+    profile_dir: Path
+    training_profile: str
+    training_profile_step: int
+
 
 
+@dataclass(frozen=True)
+class TrainingJobsConfig:
+    root_dir: Path
+    niceness: int
+
 
 @dataclass(frozen=True)
 class EvaluationConfig:
@@ -42,4 +84,93 @@ class EvaluationConfig:
     all_params: dict
     mlflow_uri: str
     params_image_size: list
-    params_batch_size: int
\ No newline at end of file
+    params_preprocessing: dict
+    params_batch_size: int
+    image_cache_dir: Path
+    params_image_cache: bool
+    root_dir: Path
+    split_path: Path
+    predictions_path: Path
+    report_path: Path
+    params_validation_split: float
+
+@dataclass(frozen=True)
+class ModelExportConfig:
+    root_dir: Path
+    model_path: Path
+    training_data: Path
+    report_path: Path
+    formats: list
+    representative_samples: int
+    latency_iterations: int
+    params_image_size: list
+    params_preprocessing: dict
+    params_batch_size: int
+    params_seed: int
+    split_path: Path
+    params_validation_split: float
+
+
+@dataclass(frozen=True)
+class PredictionConfig:
+    model_path: Path
+    backend: str
+    export_report_path: Path
+    max_accuracy_drop: float
+    class_names: list
+    watch_interval_seconds: float
+    batching_enabled: bool
+    max_batch_size: int
+    max_wait_ms: float
+    result_cache_enabled: bool
+    result_cache_max_entries: int
+    result_cache_ttl_seconds: float
+    result_cache_disk_path: Path
+    compiled: bool
+    jit_compile: bool
+    warmup_batch_sizes: list
+    workers: int
+    worker_threads: int
+    max_queue: int
+    request_timeout_ms: float
+    max_upload_mb: float
+    max_images_per_request: int
+    intra_op_threads: int
+    inter_op_threads: int
+    params_image_size: list
+    params_preprocessing: dict
+    profile_dir: Path
+    request_profiles: bool
+
+
+@dataclass(frozen=True)
+class BatchPredictionConfig:
+    root_dir: Path
+    model_path: Path
+    output_path: Path
+    batch_size: int
+    class_names: list
+    params_image_size: list
+    params_preprocessing: dict
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    root_dir: Path
+    mlflow_uri: str
+    parallel_trials: int
+    threads_per_trial: int
+    base_config: dict
+    base_params: dict
+    training_data: Path
+    split_path: Path
+    params_validation_split: float
+    params_epochs: int
+    sweep_method: str
+    sweep_trials: int
+    sweep_seed: int
+    sweep_metric: str
+    sweep_successive_halving: bool
+    sweep_min_epochs: int
+    sweep_eta: int
+    sweep_space: dict
@@ -0,0 +1,61 @@
+import argparse
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.batch_prediction import BatchPrediction
+from cnnClassifier.config.configuration import ConfigurationManager
+
+STAGE_NAME = "Stage: Batch Prediction"
+
+
+class BatchPredictionPipeline:
+
+    def __init__(self):
+        pass
+
+
+    def main(self, source: str, output_path: str = None, batch_size: int = None) -> dict:
+        """
+        Scores a directory, glob or manifest of images with the served model.
+
+        This function performs the following steps:
+        1. Logs the start of the stage.
+        2. Retrieves the batch prediction configuration from the ConfigurationManager.
+        3. Creates an instance of the BatchPrediction class with the configuration.
+        4. Streams the images through the tf.data pipeline and writes the predictions.
+        5. Logs the completion of the stage.
+
+        Args:
+            source (str): A directory, glob pattern or manifest (.csv with a `path` column, or .txt).
+            output_path (str, optional): A .csv or .parquet output file. Defaults to the configured output path.
+            batch_size (int, optional): The number of images per forward pass. Defaults to the configured batch size.
+
+        Raises:
+            Exception: If any exception occurs during the execution of the function.
+
+        Returns:
+            dict: The scoring summary, including throughput in images/sec.
+        """
+        try:
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} STARTED <<<<<<<<<<<<<<<")
+            config = ConfigurationManager()
+            batch_prediction_config = config.get_batch_prediction_config()
+            batch_prediction = BatchPrediction(config=batch_prediction_config)
+            summary = batch_prediction.predict(source=source, output_path=output_path, batch_size=batch_size)
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} COMPLETED <<<<<<<<<<<<<<<\n")
+            return summary
+
+        except Exception as e:
+            logger.exception(f"Exception raised while running {STAGE_NAME}: {e}")
+            raise e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a directory, glob or manifest of CT scans.")
+    parser.add_argument("source", help="directory, glob pattern (quote it) or manifest file (.csv with a 'path' column, or .txt)")
+    parser.add_argument("-o", "--output", default=None, help="output .csv or .parquet file")
+    parser.add_argument("-b", "--batch-size", type=int, default=None, help="images per forward pass")
+    args = parser.parse_args()
+    configure_logging()
+
+    batch_prediction_pipeline = BatchPredictionPipeline()
+    batch_prediction_pipeline.main(source=args.source, output_path=args.output, batch_size=args.batch_size)
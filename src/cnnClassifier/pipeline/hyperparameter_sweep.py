@@ -0,0 +1,75 @@
+import argparse
+import dataclasses
+import os
+
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.hyperparameter_sweep import HyperparameterSweep
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.pipeline.stage_01_data_ingestion import DataIngestionTrainingPipeline
+from cnnClassifier.pipeline.stage_02_prepare_base_model import PrepareBaseModelTrainingPipeline
+
+STAGE_NAME = "Stage: Hyperparameter Sweep"
+
+
+class HyperparameterSweepPipeline:
+
+    def __init__(self):
+        pass
+
+
+    def main(self, space_path: str = None, name: str = None, parallel_trials: int = None, threads_per_trial: int = None) -> dict:
+        """
+        Searches the parameters of params.yaml with parallel trials.
+
+        This function performs the following steps:
+        1. Logs the start of the stage.
+        2. Runs the data ingestion and base model stages if their outputs are missing, as every trial shares them.
+        3. Retrieves the sweep configuration from the ConfigurationManager.
+        4. Creates an instance of the HyperparameterSweep class with the configuration.
+        5. Trains and evaluates the trials, with successive halving if enabled.
+        6. Logs the best trial and the completion of the stage.
+
+        Args:
+            space_path (str, optional): The search space file. Defaults to `sweep.space_path`.
+            name (str, optional): The sweep name. Defaults to a timestamp.
+            parallel_trials (int, optional): The trials trained at the same time. Defaults to `sweep.parallel_trials`.
+            threads_per_trial (int, optional): The CPU threads of every trial. Defaults to `sweep.threads_per_trial`.
+
+        Raises:
+            Exception: If any exception occurs during the execution of the function.
+
+        Returns:
+            dict: The best trial.
+        """
+        try:
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} STARTED <<<<<<<<<<<<<<<")
+            config = ConfigurationManager()
+            if not os.path.isdir(config.config.training.training_data):
+                DataIngestionTrainingPipeline().main()
+            if not os.path.exists(config.config.prepare_base_model.base_model_path):
+                PrepareBaseModelTrainingPipeline().main()
+
+            sweep_config = config.get_sweep_config(space_path=space_path)
+            overrides = {"parallel_trials": parallel_trials, "threads_per_trial": threads_per_trial}
+            sweep_config = dataclasses.replace(sweep_config, **{key: value for key, value in overrides.items() if value is not None})
+            best = HyperparameterSweep(config=sweep_config).run(name=name)
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} COMPLETED <<<<<<<<<<<<<<<\n")
+            return best
+
+        except Exception as e:
+            logger.exception(f"Exception raised while running {STAGE_NAME}: {e}")
+            raise e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the parameters of params.yaml with parallel training runs.")
+    parser.add_argument("--space", default=None, help="search space file (default: sweep.space_path of config.yaml)")
+    parser.add_argument("--name", default=None, help="sweep name, the directory of its trials under sweep.root_dir")
+    parser.add_argument("--parallel", type=int, default=None, help="trials trained at the same time")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads per trial, 0 splits the cores evenly")
+    args = parser.parse_args()
+    configure_logging()
+
+    hyperparameter_sweep_pipeline = HyperparameterSweepPipeline()
+    hyperparameter_sweep_pipeline.main(space_path=args.space, name=args.name,
+                                       parallel_trials=args.parallel, threads_per_trial=args.threads)
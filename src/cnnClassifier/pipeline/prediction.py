@@ -1,25 +1,114 @@
-import numpy as np
 import os
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+import time
+import numpy as np
 from cnnClassifier import logger
+from cnnClassifier.components.micro_batcher import get_micro_batcher
+from cnnClassifier.components.model_registry import ServedModel, get_model_registry
+from cnnClassifier.components.profiling import profile_capture, span
+from cnnClassifier.components.result_cache import PredictionResultCache, get_prediction_result_cache
+from cnnClassifier.config.configuration import ConfigurationManager
+from cnnClassifier.entity.config_entity import PredictionConfig
+from cnnClassifier.utils.common import LazyModule
+
+# imported on first use, when the model is loaded
+tf = LazyModule("tensorflow")
 
 class PredictionPipeline:
-    def __init__(self, filename):
+    def __init__(self, filename=None, config: PredictionConfig = None):
         self.filename = filename
+        self.config = config if config is not None else ConfigurationManager().get_prediction_config()
+        self.registry = get_model_registry(self.config)
+        self.batcher = None
+        if self.config.batching_enabled:
+            self.batcher = get_micro_batcher(self.config, predict_fn=self.forward)
+        self.result_cache = None
+        if self.config.result_cache_enabled:
+            self.result_cache = get_prediction_result_cache(self.config)
+
+
+    def forward(self, batch: np.ndarray, served: ServedModel = None) -> np.ndarray:
+        """
+        Runs one forward pass of the served model over a batch of images.
+
+        With `compiled` set, this calls the warmed-up, graph-compiled serving function of the model;
+        otherwise it falls back to `model.predict()`. The TFLite and ONNX backends run the exported
+        model. XLA compiles one program per input shape, so with `jit_compile` set the batch is
+        zero-padded to the smallest warm-up batch size that fits it.
+
+        Args:
+            batch (np.ndarray): A batch of images of shape (N, 224, 224, 3).
+            served (ServedModel, optional): The registry snapshot to run, the one the batch was
+                preprocessed for. Defaults to the currently served model.
+
+        Returns:
+            np.ndarray: The class probabilities of shape (N, classes).
+        """
+        if served is None:
+            served = self.registry.get_served()
+        if self.config.backend == "keras" and not self.config.compiled:
+            with span("forward"):
+                return served.model.predict(batch, verbose=0)
+        serving_fn = served.predict_fn
+        size = len(batch)
+        if self.config.backend == "keras" and self.config.jit_compile:
+            bucket = min((b for b in self.config.warmup_batch_sizes if b >= size), default=size)
+            if bucket > size:
+                batch = np.concatenate([batch, np.zeros((bucket - size,) + batch.shape[1:], dtype=batch.dtype)])
+        with span("forward"):
+            return np.asarray(serving_fn(tf.convert_to_tensor(batch, dtype=tf.float32)))[:size]
+
+
+    def preprocess(self, sources: list, served: ServedModel = None) -> np.ndarray:
+        """
+        Preprocesses images in memory exactly like the served model was trained, with the `ImagePreprocessor`
+        saved next to it: every image is decoded, then the whole batch is resized and normalized at once.
+        The three steps are timed as the "decode", "resize" and "normalize" spans.
+
+        Args:
+            sources (list): The images, each a path to an image file, the raw (encoded) image bytes, a
+                binary file object holding them (e.g. an uploaded file) or an already decoded uint8 image
+                array of shape (H, W, 3).
+            served (ServedModel, optional): The registry snapshot whose preprocessing to apply.
+                Defaults to the currently served model.
+
+        Returns:
+            np.ndarray: The float32 (N, height, width, channels) batch.
+        """
+        preprocessor = (served if served is not None else self.registry.get_served()).preprocessor
+        with span("decode"):
+            images = [preprocessor.decode(source) for source in sources]
+        with span("resize"):
+            batch = preprocessor.resize(images)
+        with span("normalize"):
+            return preprocessor.normalize(batch)
+
+
+    def load_image(self, source) -> np.ndarray:
+        """
+        Preprocesses a single image (see `preprocess`) into a float32 (height, width, channels) array.
+        """
+        return self.preprocess([source])[0]
 
 
-    def predict(self):
+    def predict(self, source=None):
         """
         Predicts the class of an image using a pre-trained model.
 
-        This method loads a pre-trained model, loads an image from the specified filename,
-        resizes it to 224x224 pixels, converts it to a numpy array, and passes it through the
-        model to obtain a prediction. The predicted class is then determined based on the
-        maximum value in the prediction array.
+        This method takes the pre-trained model from the process-wide model registry (which loads it
+        once and hot-swaps it when the model file changes), preprocesses the image given by `source`
+        (or the specified filename) in memory with the preprocessing the model was trained with (see
+        `preprocess`), and passes it through the model to obtain a prediction. When the result cache
+        is enabled, the probabilities of an image the current model has already scored are reused
+        instead. When batching is enabled, the image is queued on the process-wide micro-batcher and
+        shares one forward pass with concurrent requests. The image is preprocessed, run and cached
+        with one registry snapshot, so a model swapped in meanwhile never scores an image preprocessed
+        for its predecessor. The predicted class is then determined based on the maximum value in the
+        prediction array.
 
         Parameters:
             self (PredictionPipeline): The instance of the PredictionPipeline class.
+            source (str | Path | bytes | np.ndarray, optional): The image to classify, as a file path,
+                raw encoded image bytes or a decoded image array. Defaults to the pipeline's filename.
 
         Returns:
             list: A list containing a dictionary with a single key-value pair. The key is
@@ -30,22 +119,105 @@ class PredictionPipeline:
             prediction_pipeline = PredictionPipeline("image.jpg")
             prediction = prediction_pipeline.predict()
             print(prediction)  # Output: [{"image": "Normal"}]
+
+            with open("image.jpg", "rb") as f:
+                prediction = PredictionPipeline().predict(f.read())
         """
-        model = load_model(os.path.join("model", "model.h5"))
+        if source is None:
+            source = self.filename
+        with span("predict"):
+            served = self.registry.get_served()
+            test_image = self.preprocess([source], served)[0]
 
-        image_name = self.filename
-        test_image = image.load_img(image_name, target_size=(224,224))
-        test_image = image.img_to_array(test_image)
-        test_image = np.expand_dims(test_image, axis=0)
-        result = model.predict(test_image)
-        logger.info(f"RAW PREDICTION RESULT: {result}")
-        class_result = np.argmax(result, axis=1)
-        
+            result = None
+            if self.result_cache is not None:
+                with span("cache_lookup"):
+                    model_hash = served.content_hash
+                    image_key = PredictionResultCache.image_key(test_image)
+                    cached = self.result_cache.get(image_key, model_hash)
+                if cached is not None:
+                    result = np.expand_dims(cached, axis=0)
 
-        if class_result[0] == 1:
-            prediction = "Normal"
-        else:
-            prediction = "Adenocarcinoma Cancer"
+            if result is None:
+                if self.batcher is not None:
+                    # queueing for the micro-batcher and the shared forward pass
+                    with span("batched_forward"):
+                        result = np.expand_dims(self.batcher.predict(test_image), axis=0)
+                    # the batcher runs the model served when the batch is flushed; if that may not be
+                    # the one the image was preprocessed for, run it again on that one
+                    if self.registry.get_served() is not served:
+                        result = self.forward(np.expand_dims(test_image, axis=0), served)
+                else:
+                    result = self.forward(np.expand_dims(test_image, axis=0), served)
+                if self.result_cache is not None:
+                    self.result_cache.put(image_key, model_hash, result[0])
+            logger.info(f"RAW PREDICTION RESULT: {result}")
+            with span("postprocess"):
+                class_result = np.argmax(result, axis=1)
+                prediction = self.config.class_names[class_result[0]]
 
         return [{"image": prediction}]
-        # return [{"result": result}]
\ No newline at end of file
+
+
+    def predict_batch(self, sources: list) -> list:
+        """
+        Predicts the classes of several images, e.g. the files of one multipart upload.
+
+        The images are decoded one by one, resized and normalized as one batch (see `preprocess`), and
+        the ones not in the result cache are run through the model in a single forward pass (a
+        multi-image request is already a batch, so it does not go through the micro-batcher).
+
+        Args:
+            sources (list): The images, as accepted by `preprocess`.
+
+        Returns:
+            list: One {"image": predicted class} dictionary per image, in order.
+        """
+        if len(sources) == 1:
+            return self.predict(sources[0])
+
+        with span("predict_batch"):
+            served = self.registry.get_served()
+            images = self.preprocess(sources, served)
+            results = [None] * len(images)
+
+            if self.result_cache is not None:
+                with span("cache_lookup"):
+                    model_hash = served.content_hash
+                    image_keys = [PredictionResultCache.image_key(image) for image in images]
+                    results = [self.result_cache.get(key, model_hash) for key in image_keys]
+
+            misses = [index for index, result in enumerate(results) if result is None]
+            if misses:
+                probabilities = self.forward(images[misses], served)
+                for index, result in zip(misses, probabilities):
+                    results[index] = result
+                if self.result_cache is not None:
+                    for index in misses:
+                        self.result_cache.put(image_keys[index], model_hash, results[index])
+
+            with span("postprocess"):
+                predictions = [self.config.class_names[int(np.argmax(result))] for result in results]
+        logger.info(f"Predicted {len(predictions)} images: {predictions}")
+
+        return [{"image": prediction} for prediction in predictions]
+
+
+    def profile(self, sources: list, kind: str):
+        """
+        Predicts like `predict_batch` while capturing a profile of the request (see `profile_capture`).
+
+        With batching enabled, the forward pass runs on the micro-batcher thread, which only the
+        `tensorflow` profiler sees.
+
+        Args:
+            sources (list): The images to classify, as accepted by `preprocess`.
+            kind (str): "cprofile" or "tensorflow".
+
+        Returns:
+            tuple: (prediction, path) with the result of `predict_batch` and the path of the profile.
+        """
+        name = f"predict_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{time.monotonic_ns()}"
+        with profile_capture(kind, self.config.profile_dir, name) as path:
+            prediction = self.predict_batch(sources)
+        return prediction, path
@@ -1,6 +1,6 @@
 from cnnClassifier.components.data_ingestion import DataIngestion
 from cnnClassifier.config.configuration import ConfigurationManager
-from cnnClassifier import logger
+from cnnClassifier import configure_logging, logger
 
 STAGE_NAME = "STAGE: Data Ingestion"
 
@@ -21,7 +21,8 @@ class DataIngestionTrainingPipeline:
         3. Creates a DataIngestion object with the retrieved configuration.
         4. Downloads the file using the DataIngestion object.
         5. Extracts the zip file using the DataIngestion object.
-        6. Logs the completion of the data ingestion stage.
+        6. Builds the pre-decoded image cache if `IMAGE_CACHE` is enabled.
+        7. Logs the completion of the data ingestion stage.
 
         Raises:
             Exception: If any exception occurs during the execution of the data ingestion stage.
@@ -36,6 +37,8 @@ class DataIngestionTrainingPipeline:
             data_ingestion = DataIngestion(config=data_ingestion_config)
             data_ingestion.download_file()
             data_ingestion.extract_zip_file()
+            if data_ingestion_config.params_image_cache:
+                data_ingestion.build_image_cache()
             logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} COMPLETED <<<<<<<<<<<<<<< \n")
 
 
@@ -46,6 +49,7 @@ class DataIngestionTrainingPipeline:
 
 # for dvc pipeline tracking
 if __name__ == "__main__":
+    configure_logging()
     data_ingestion_pipeline = DataIngestionTrainingPipeline()
     data_ingestion_pipeline.main()
     
@@ -1,4 +1,4 @@
-from cnnClassifier import logger
+from cnnClassifier import configure_logging, logger
 from cnnClassifier.components.prepare_base_model import PrepareBaseModel
 from cnnClassifier.config.configuration import ConfigurationManager
 
@@ -44,6 +44,7 @@ class PrepareBaseModelTrainingPipeline:
 
 # for dvc pipeline tracking
 if __name__ == "__main__":
+    configure_logging()
     prepare_base_model_pipeline = PrepareBaseModelTrainingPipeline()
     prepare_base_model_pipeline.main()
     
\ No newline at end of file
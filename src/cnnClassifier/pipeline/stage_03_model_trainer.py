@@ -1,4 +1,4 @@
-from cnnClassifier import logger
+from cnnClassifier import configure_logging, logger
 from cnnClassifier.config.configuration import ConfigurationManager
 from cnnClassifier.components.model_trainer import Training
 
@@ -42,5 +42,6 @@ class ModelTrainingPipeline:
 
 # for dvc pipeline tracking
 if __name__ == "__main__":
+    configure_logging()
     model_training_pipeline = ModelTrainingPipeline()
     model_training_pipeline.main()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from cnnClassifier import logger
+from cnnClassifier import configure_logging, logger
 from cnnClassifier.components.model_evaluation_mlflow import Evaluation
 from cnnClassifier.config.configuration import ConfigurationManager
 
@@ -43,5 +43,6 @@ class EvaluationPipeline:
 
 # for dvc pipeline tracking
 if __name__ == "__main__":
+    configure_logging()
     model_evaluation_pipeline = EvaluationPipeline()
     model_evaluation_pipeline.main()
\ No newline at end of file
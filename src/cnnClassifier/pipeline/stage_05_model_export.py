@@ -0,0 +1,47 @@
+from cnnClassifier import configure_logging, logger
+from cnnClassifier.components.model_export import ModelExport
+from cnnClassifier.config.configuration import ConfigurationManager
+
+STAGE_NAME = "Stage: Model Export"
+
+
+class ModelExportPipeline:
+
+    def __init__(self):
+        pass
+
+
+    def main(self):
+        """
+        This function performs the following steps:
+        1. Logs the start of the stage.
+        2. Retrieves the model export configuration from the ConfigurationManager.
+        3. Creates an instance of the ModelExport class with the model export configuration.
+        4. Calls the export method of the ModelExport instance, which writes the quantized TFLite/ONNX
+           variants and the accuracy/size/latency report.
+        5. Logs the completion of the stage.
+
+        Raises:
+            Exception: If any exception occurs during the execution of the function.
+
+        Returns:
+            None
+        """
+        try:
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} STARTED <<<<<<<<<<<<<<<")
+            config = ConfigurationManager()
+            model_export_config = config.get_model_export_config()
+            model_export = ModelExport(config=model_export_config)
+            model_export.export()
+            logger.info(f">>>>>>>>>>>>>> {STAGE_NAME} COMPLETED <<<<<<<<<<<<<<<\n")
+
+        except Exception as e:
+            logger.exception(f"Exception raised while running {STAGE_NAME}: {e}")
+            raise e
+
+
+# for dvc pipeline tracking
+if __name__ == "__main__":
+    configure_logging()
+    model_export_pipeline = ModelExportPipeline()
+    model_export_pipeline.main()
@@ -1,17 +1,62 @@
 
+from __future__ import annotations
+
 import base64
-from box import ConfigBox
-from box.exceptions import BoxValueError
-from ensure import ensure_annotations
+import functools
+import importlib
 import json
-import joblib
 import os
+import types
+import typing
 from pathlib import Path
-from typing import Any
-import yaml
+from typing import TYPE_CHECKING, Any
 
 from cnnClassifier import logger
 
+# box, ensure, yaml and joblib are imported on first use, so importing this module stays cheap
+if TYPE_CHECKING:
+    from box import ConfigBox
+
+
+def ensure_annotations(f):
+    """`ensure.ensure_annotations`, applied on the first call of `f`
+
+    The annotations of this module are strings (postponed evaluation), so they are resolved,
+    importing `ConfigBox`, before `ensure` checks them.
+    """
+    checked = None
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        nonlocal checked
+        if checked is None:
+            from box import ConfigBox
+            from ensure import ensure_annotations as ensure
+
+            f.__annotations__ = typing.get_type_hints(f, localns={"ConfigBox": ConfigBox})
+            checked = ensure(f)
+        return checked(*args, **kwargs)
+
+    return wrapper
+
+
+class LazyModule(types.ModuleType):
+    """A module that is imported on first attribute access
+
+    Used for heavy dependencies (TensorFlow) of modules the serving apps import at startup:
+    `tf = LazyModule("tensorflow")` defers the import until `tf.` is first used.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return getattr(self._module, attribute)
+
 
 @ensure_annotations
 def read_yaml(path_to_yaml: Path) -> ConfigBox:
@@ -27,6 +72,10 @@ def read_yaml(path_to_yaml: Path) -> ConfigBox:
     Returns:
         ConfigBox: ConfigBox type
     """
+    import yaml
+    from box import ConfigBox
+    from box.exceptions import BoxValueError
+
     try:
         with open(path_to_yaml) as yaml_file:
             content = yaml.safe_load(yaml_file)
@@ -78,6 +127,8 @@ def load_json(path: Path) -> ConfigBox:
     Returns:
         ConfigBox: data as class attributes instead of dict
     """
+    from box import ConfigBox
+
     with open(path) as f:
         content = json.load(f)
 
@@ -93,6 +144,8 @@ def save_bin(data: Any, path: Path):
         data (Any): data to be saved as binary
         path (Path): path to binary file
     """
+    import joblib
+
     joblib.dump(value=data, filename=path)
     logger.info(f"binary file saved at: {path}")
 
@@ -107,6 +160,8 @@ def load_bin(path: Path) -> Any:
     Returns:
         Any: object stored in the file
     """
+    import joblib
+
     data = joblib.load(path)
     logger.info(f"binary file loaded from: {path}")
     return data
@@ -126,6 +181,18 @@ def get_size(path: Path) -> str:
     return f"~ {size_in_kb} KB"
 
 
+def decodeImageToBytes(imgstring) -> bytes:
+    """decode a base64 image string into an in-memory buffer
+
+    Args:
+        imgstring (str | bytes): base64 encoded image
+
+    Returns:
+        bytes: raw (still encoded, e.g. JPEG) image bytes
+    """
+    return base64.b64decode(imgstring)
+
+
 def decodeImage(imgstring, fileName):
     imgdata = base64.b64decode(imgstring)
     with open(fileName, 'wb') as f:
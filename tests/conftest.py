@@ -0,0 +1,153 @@
+import io
+import os
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import pytest
+from PIL import Image
+
+
+IMAGE_SIZE = [8, 8, 3]
+
+
+def build_tiny_model(image_size: list = IMAGE_SIZE, classes: int = 2, seed: int = 0):
+    """
+    A small CNN with the project's head (Flatten + softmax Dense), fast enough to build, save and
+    run in every test.
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=image_size)
+    x = tf.keras.layers.Conv2D(4, 3, padding="same", activation="relu")(inputs)
+    x = tf.keras.layers.Flatten()(x)
+    outputs = tf.keras.layers.Dense(classes, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def encode_image(pixels: np.ndarray, fmt: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def make_dataset(root, classes=("adenocarcinoma", "normal"), per_class: int = 5, size: int = 16, seed: int = 0):
+    """
+    Writes a tiny image dataset (one directory per class, PNG files) under `root` and returns its path.
+    """
+    rng = np.random.default_rng(seed)
+    for index, class_name in enumerate(classes):
+        os.makedirs(os.path.join(root, class_name), exist_ok=True)
+        for number in range(per_class):
+            pixels = rng.integers(0, 255, size=(size, size, 3), dtype=np.uint8)
+            # classes differ in brightness, so a tiny model can tell them apart
+            pixels = (pixels // 2 + index * 127).astype(np.uint8)
+            Image.fromarray(pixels).save(os.path.join(root, class_name, f"{number:03d}.png"))
+    return root
+
+
+def make_prediction_config(model_path, **overrides):
+    from cnnClassifier.entity.config_entity import PredictionConfig
+
+    values = dict(
+        model_path=model_path,
+        backend="keras",
+        export_report_path=None,
+        max_accuracy_drop=0.01,
+        class_names=["Adenocarcinoma Cancer", "Normal"],
+        # tests drive `reload_if_changed` themselves instead of a watcher thread
+        watch_interval_seconds=None,
+        batching_enabled=False,
+        max_batch_size=4,
+        max_wait_ms=5,
+        result_cache_enabled=False,
+        result_cache_max_entries=16,
+        result_cache_ttl_seconds=60,
+        result_cache_disk_path=None,
+        compiled=True,
+        jit_compile=False,
+        warmup_batch_sizes=[1],
+        workers=1,
+        worker_threads=2,
+        max_queue=4,
+        request_timeout_ms=10000,
+        max_upload_mb=1,
+        max_images_per_request=3,
+        intra_op_threads=0,
+        inter_op_threads=0,
+        params_image_size=IMAGE_SIZE,
+        params_preprocessing={"INTERPOLATION": "bilinear", "NORMALIZATION": "rescale", "RESCALE": 1.0 / 255},
+        profile_dir=None,
+        request_profiles=False,
+    )
+    values.update(overrides)
+    return PredictionConfig(**values)
+
+
+def save_model(model, root, name: str = "model", path=None, metadata: dict = None):
+    """
+    Saves `model` (with the manifest `metadata`) into the model store under `root` and links it at
+    `path` (default `root/<name>-link`), like the training stage does.
+    """
+    from cnnClassifier.components.model_artifact import ModelArtifactStore, link_artifact
+
+    artifact_dir = ModelArtifactStore(os.path.join(root, "store")).save(model, name=name, metadata=metadata)
+    return link_artifact(artifact_dir, path or os.path.join(root, f"{name}-link"))
+
+
+def make_training_config(root, base_model_path, training_data, **overrides):
+    """
+    A TrainingConfig that trains `base_model_path` on `training_data` in one process on CPU, with every
+    output under `root`; any field can be overridden.
+    """
+    from pathlib import Path
+
+    from cnnClassifier.entity.config_entity import TrainingConfig
+
+    root = Path(root)
+    values = dict(
+        root_dir=root,
+        trained_model_path=root / "model",
+        trained_model_path_for_tracking=root / "model_tracked",
+        updated_base_model_path=Path(base_model_path),
+        artifact_store_dir=root / "store",
+        artifact_versions_to_keep=2,
+        training_data=training_data,
+        params_epochs=2,
+        params_batch_size=2,
+        params_is_augmentation=False,
+        params_image_size=IMAGE_SIZE,
+        params_preprocessing={},
+        params_learning_rate=0.05,
+        params_data_pipeline="tf_data",
+        params_data_cache="none",
+        params_seed=0,
+        image_cache_dir=root / "image_cache",
+        params_image_cache=False,
+        params_bottleneck_cache=False,
+        params_mixed_precision="float32",
+        params_intra_op_threads=0,
+        params_inter_op_threads=0,
+        params_onednn=True,
+        params_xla_jit=False,
+        params_distribution_strategy="none",
+        params_cpu_devices=1,
+        params_scale_learning_rate=True,
+        checkpoint_dir=root / "checkpoints",
+        checkpoint_every_epochs=1,
+        checkpoints_to_keep=2,
+        split_path=root / "split.json",
+        predictions_path=root / "predictions.npz",
+        params_validation_split=0.2,
+        profile_dir=root / "profiles",
+        training_profile="none",
+        training_profile_step=0,
+    )
+    values.update(overrides)
+    return TrainingConfig(**values)
+
+
+@pytest.fixture
+def tiny_model():
+    return build_tiny_model
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cnnClassifier.components.batch_prediction import BatchPrediction
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from cnnClassifier.entity.config_entity import BatchPredictionConfig
+from conftest import IMAGE_SIZE, build_tiny_model, make_dataset, save_model
+
+
+def make_batch_prediction(tmp_path, model):
+    return BatchPrediction(BatchPredictionConfig(
+        root_dir=tmp_path,
+        model_path=save_model(model, tmp_path / "models"),
+        output_path=tmp_path / "predictions.csv",
+        batch_size=4,
+        class_names=["Adenocarcinoma Cancer", "Normal"],
+        params_image_size=IMAGE_SIZE,
+        params_preprocessing={},
+    ))
+
+
+def test_directory_is_scored_into_one_row_per_image(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=3)
+    model = build_tiny_model()
+    batch_prediction = make_batch_prediction(tmp_path, model)
+
+    summary = batch_prediction.predict(data_dir, batch_size=4)
+
+    results = pd.read_csv(summary["output_path"])
+    assert summary["images"] == 6 and summary["skipped"] == 0
+    assert sorted(results["path"]) == BatchPrediction.resolve_inputs(data_dir)
+
+    preprocessor = ImagePreprocessor(IMAGE_SIZE)
+    expected = model(preprocessor(list(results["path"]))).numpy()
+    np.testing.assert_allclose(results[["prob_Adenocarcinoma Cancer", "prob_Normal"]].to_numpy(), expected, atol=1e-5)
+    assert list(results["prediction"]) == [["Adenocarcinoma Cancer", "Normal"][i] for i in expected.argmax(axis=1)]
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=2)
+    with open(tmp_path / "data" / "manifest.txt", "w") as f:
+        f.write("normal/000.png\nadenocarcinoma/001.png\n")
+
+    paths = BatchPrediction.resolve_inputs(str(tmp_path / "data" / "manifest.txt"))
+
+    assert paths == [os.path.join(data_dir, "adenocarcinoma/001.png"), os.path.join(data_dir, "normal/000.png")]
+
+
+def test_missing_images_raise(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BatchPrediction.resolve_inputs(str(tmp_path / "*.png"))
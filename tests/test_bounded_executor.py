@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from cnnClassifier.components.bounded_executor import BoundedExecutor, DeadlineExceededError, QueueFullError
+
+
+def test_jobs_beyond_the_queue_limit_are_rejected():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        # the first job occupies the only thread, the second waits for it
+        jobs = [asyncio.create_task(executor.run(release.wait, timeout=10)) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        try:
+            with pytest.raises(QueueFullError):
+                await executor.run(release.wait, timeout=10)
+        finally:
+            release.set()
+        return await asyncio.gather(*jobs)
+
+    assert asyncio.run(main()) == [True, True]
+    metrics = executor.metrics()
+    executor.shutdown()
+    assert metrics["rejected_queue_full"] == 1 and metrics["completed"] == 2
+    assert metrics["queue_depth"] == 0 and metrics["max_queue_depth"] == 1
+
+
+def test_a_job_queued_past_its_deadline_never_runs():
+    executor = BoundedExecutor(max_workers=1, max_queue=4)
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        blocker = asyncio.create_task(executor.run(release.wait, timeout=10))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(DeadlineExceededError):
+                await executor.run(ran.append, "late", timeout=0.05)
+        finally:
+            release.set()
+        await blocker
+
+    asyncio.run(main())
+    executor.shutdown()
+    assert ran == []
+    assert executor.metrics()["deadline_exceeded"] == 1 and executor.metrics()["queue_depth"] == 0
+
+
+def test_errors_of_the_job_reach_the_caller():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(executor.run(lambda: 1 / 0, timeout=1))
+    executor.shutdown()
+    assert executor.metrics()["failed"] == 1
@@ -0,0 +1,60 @@
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.checkpoints import TrainingCheckpoints
+from cnnClassifier.components.model_artifact import load_model
+from cnnClassifier.components.model_trainer import Training
+from conftest import build_tiny_model, make_dataset, make_training_config, save_model
+
+
+def train(config) -> Training:
+    training = Training(config)
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train()
+    return training
+
+
+def test_a_resumed_run_ends_with_the_weights_of_an_uninterrupted_one(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=6)
+    base_model = save_model(build_tiny_model(), tmp_path / "base")
+
+    uninterrupted = train(make_training_config(tmp_path / "straight", base_model, data_dir, params_epochs=2))
+    first = train(make_training_config(tmp_path / "resumed", base_model, data_dir, params_epochs=1))
+    resumed = train(make_training_config(tmp_path / "resumed", base_model, data_dir, params_epochs=2))
+
+    assert first.initial_epoch == 0
+    assert resumed.initial_epoch == 1 and resumed.skip_elements == first.checkpoints.latest(max_epoch=1)["elements_consumed"]
+    for expected, actual in zip(load_model(tmp_path / "straight" / "model").get_weights(),
+                                load_model(tmp_path / "resumed" / "model").get_weights()):
+        np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+def test_only_complete_checkpoints_of_the_same_configuration_are_resumed(tmp_path):
+    model = build_tiny_model()
+    optimizer = tf.keras.optimizers.SGD(learning_rate=0.1)
+    checkpoints = TrainingCheckpoints(tmp_path, "current", max_to_keep=2)
+    TrainingCheckpoints(tmp_path, "other", max_to_keep=2).save(model, optimizer, epoch=9, elements_consumed=90)
+    for epoch in (1, 2, 3):
+        checkpoints.save(model, optimizer, epoch=epoch, elements_consumed=10 * epoch)
+    (tmp_path / "epoch-0004").mkdir()
+
+    assert sorted(path.name for path in tmp_path.glob("epoch-*")) == ["epoch-0002", "epoch-0003", "epoch-0004"]
+    assert checkpoints.latest()["epoch"] == 3
+    assert checkpoints.latest(max_epoch=2)["elements_consumed"] == 20
+    assert TrainingCheckpoints(tmp_path, "other", max_to_keep=2).latest() is None
+
+
+def test_restore_brings_back_the_weights(tmp_path):
+    model = build_tiny_model(seed=0)
+    optimizer = tf.keras.optimizers.SGD(learning_rate=0.1)
+    # as after fitting the model
+    optimizer.build(model.trainable_variables)
+    checkpoints = TrainingCheckpoints(tmp_path, "hash", max_to_keep=1)
+    checkpoints.save(model, optimizer, epoch=1, elements_consumed=4)
+
+    restored = build_tiny_model(seed=1)
+    checkpoints.restore(checkpoints.latest(), restored, tf.keras.optimizers.SGD(learning_rate=0.1))
+
+    for expected, actual in zip(model.get_weights(), restored.get_weights()):
+        np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import yaml
+
+from cnnClassifier.config.configuration import ConfigurationManager
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def make_manager(tmp_path, monkeypatch, **serving) -> ConfigurationManager:
+    monkeypatch.chdir(tmp_path)
+    with open(ROOT / "config" / "config.yaml") as f:
+        config = yaml.safe_load(f)
+    config["prediction"]["serving"].update(serving)
+    with open(tmp_path / "config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+    return ConfigurationManager(tmp_path / "config.yaml", ROOT / "params.yaml")
+
+
+def test_prefork_workers_serve_the_keras_model_by_default(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path, monkeypatch)
+
+    single_process = manager.get_prediction_config()
+    prefork = manager.get_prediction_config(prefork=True)
+
+    assert single_process.backend == "keras" and single_process.model_path == Path("model/model")
+    assert prefork.backend == "keras" and prefork.model_path == Path("model/model")
+
+
+def test_a_quantized_prefork_backend_is_an_explicit_opt_in(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path, monkeypatch, prefork_backend="tflite_dynamic")
+
+    prefork = manager.get_prediction_config(prefork=True)
+
+    assert prefork.backend == "tflite_dynamic"
+    assert prefork.model_path == Path("artifacts/model_export/model_dynamic.tflite")
+    assert prefork.export_report_path == Path("export_report.json") and prefork.max_accuracy_drop == 0.01
+
+
+def test_an_empty_prefork_backend_serves_the_configured_backend(tmp_path, monkeypatch):
+    manager = make_manager(tmp_path, monkeypatch, prefork_backend=None)
+
+    assert manager.get_prediction_config(prefork=True).backend == "keras"
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cnnClassifier.components.data_ingestion import DataIngestion
+from cnnClassifier.entity.config_entity import DataIngestionConfig
+
+
+def make_ingestion(tmp_path, source_url: str, source_sha256: str = None) -> DataIngestion:
+    root = tmp_path / "ingestion"
+    return DataIngestion(DataIngestionConfig(
+        root_dir=root,
+        source_url=source_url,
+        local_data_file=str(root / "data.zip"),
+        unzip_dir=str(root),
+        source_sha256=source_sha256,
+        extract_workers=2,
+        dataset_dir=root / "data",
+        image_cache_dir=root / "image_cache",
+        params_image_size=[8, 8, 3],
+        params_preprocessing={},
+        params_image_cache=False,
+    ))
+
+
+def make_archive(path, members: dict) -> str:
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_download_is_verified_and_skipped_when_up_to_date(tmp_path, monkeypatch):
+    archive = tmp_path / "source.zip"
+    sha256 = make_archive(archive, {"data/a/1.png": b"one"})
+    ingestion = make_ingestion(tmp_path, str(archive), source_sha256=sha256)
+
+    ingestion.download_file()
+    assert os.path.exists(ingestion.config.local_data_file)
+
+    def fail(*args):
+        raise AssertionError("an up-to-date archive must not be fetched again")
+
+    monkeypatch.setattr(ingestion, "_fetch", fail)
+    ingestion.download_file()
+
+
+def test_checksum_mismatch_raises(tmp_path):
+    archive = tmp_path / "source.zip"
+    make_archive(archive, {"data/a/1.png": b"one"})
+    ingestion = make_ingestion(tmp_path, f"file://{archive}", source_sha256="0" * 64)
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        ingestion.download_file()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    payload = b""
+    ranges = []
+
+    def do_GET(self):
+        start = 0
+        header = self.headers.get("Range")
+        RangeHandler.ranges.append(header)
+        if header:
+            start = int(header.split("=")[1].split("-")[0])
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        body = self.payload[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_interrupted_http_download_resumes_from_the_partial_file(tmp_path):
+    archive = tmp_path / "source.zip"
+    make_archive(archive, {f"data/a/{index}.png": os.urandom(2048) for index in range(4)})
+    RangeHandler.payload, RangeHandler.ranges = archive.read_bytes(), []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        ingestion = make_ingestion(tmp_path, f"http://127.0.0.1:{server.server_port}/data.zip")
+        os.makedirs(ingestion.config.root_dir)
+        with open(ingestion.config.local_data_file + ".part", "wb") as f:
+            f.write(RangeHandler.payload[:1000])
+
+        ingestion.download_file()
+    finally:
+        server.shutdown()
+
+    assert RangeHandler.ranges == ["bytes=1000-"]
+    with open(ingestion.config.local_data_file, "rb") as f:
+        assert f.read() == RangeHandler.payload
+
+
+def test_extraction_only_rewrites_changed_files(tmp_path):
+    archive = tmp_path / "source.zip"
+    make_archive(archive, {"data/a/1.png": b"one", "data/b/2.png": b"two"})
+    ingestion = make_ingestion(tmp_path, str(archive))
+    ingestion.download_file()
+    ingestion.extract_zip_file()
+
+    root = ingestion.config.unzip_dir
+    unchanged = os.path.join(root, "data/b/2.png")
+    changed = os.path.join(root, "data/a/1.png")
+    mtime = os.stat(unchanged).st_mtime_ns
+    with open(changed, "wb") as f:
+        f.write(b"corrupted")
+
+    ingestion.extract_zip_file()
+
+    with open(changed, "rb") as f:
+        assert f.read() == b"one"
+    assert os.stat(unchanged).st_mtime_ns == mtime
+
+
+def test_members_outside_the_target_directory_are_rejected(tmp_path):
+    archive = tmp_path / "source.zip"
+    make_archive(archive, {"../escape.txt": b"x"})
+    ingestion = make_ingestion(tmp_path, str(archive))
+    ingestion.download_file()
+
+    with pytest.raises(ValueError, match="outside"):
+        ingestion.extract_zip_file()
+    assert not (tmp_path / "escape.txt").exists()
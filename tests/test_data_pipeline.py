@@ -0,0 +1,103 @@
+import numpy as np
+
+from cnnClassifier.components.data_pipeline import ImageDatasetBuilder, list_image_files
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from conftest import make_dataset
+
+
+def take_batches(dataset, count: int) -> list:
+    return [(images.numpy(), labels.numpy()) for images, labels in dataset.take(count)]
+
+
+def test_split_holds_out_the_first_files_of_every_class(tmp_path):
+    data_dir = make_dataset(str(tmp_path), per_class=5)
+
+    validation, validation_labels, class_names = list_image_files(data_dir, 0.2, "validation")
+    training, training_labels, _ = list_image_files(data_dir, 0.2, "training")
+
+    assert class_names == ["adenocarcinoma", "normal"]
+    assert [path.rsplit("/", 2)[-2:] for path in validation] == [["adenocarcinoma", "000.png"], ["normal", "000.png"]]
+    assert validation_labels == [0, 1]
+    assert len(training) == 8 and training_labels == [0] * 4 + [1] * 4
+    assert not set(training) & set(validation)
+
+
+def test_validation_pipeline_keeps_order_and_normalizes(tmp_path):
+    paths, labels, _ = list_image_files(make_dataset(str(tmp_path), per_class=3))
+    preprocessor = ImagePreprocessor([8, 8, 3])
+    builder = ImageDatasetBuilder([8, 8, 3], batch_size=4, preprocessor=preprocessor)
+
+    batches = take_batches(builder.build(paths, labels, 2, training=False), 10)
+
+    images = np.concatenate([images for images, _ in batches])
+    one_hot = np.concatenate([labels for _, labels in batches])
+    np.testing.assert_allclose(images, preprocessor(paths), atol=1e-6)
+    np.testing.assert_array_equal(one_hot.argmax(axis=1), labels)
+    assert [len(images) for images, _ in batches] == [4, 2]
+
+
+def test_training_pipeline_is_reproducible_for_a_seed(tmp_path):
+    paths, labels, _ = list_image_files(make_dataset(str(tmp_path), per_class=4))
+
+    def batches(seed):
+        builder = ImageDatasetBuilder([8, 8, 3], batch_size=3, seed=seed)
+        return take_batches(builder.build(paths, labels, 2, training=True, augment=True), 4)
+
+    first, second, other = batches(7), batches(7), batches(8)
+
+    for (images, labels_a), (same_images, labels_b) in zip(first, second):
+        np.testing.assert_array_equal(images, same_images)
+        np.testing.assert_array_equal(labels_a, labels_b)
+    assert any(not np.array_equal(a[0], b[0]) for a, b in zip(first, other))
+
+
+def test_cached_arrays_give_the_same_batches_as_files(tmp_path):
+    paths, labels, _ = list_image_files(make_dataset(str(tmp_path), per_class=4))
+    preprocessor = ImagePreprocessor([8, 8, 3])
+    builder = ImageDatasetBuilder([8, 8, 3], batch_size=3, seed=3, preprocessor=preprocessor)
+    images = np.stack([preprocessor.load(path) for path in paths])
+
+    from_files = take_batches(builder.build(paths, labels, 2, training=True), 5)
+    from_arrays = take_batches(builder.build_from_arrays(images, np.asarray(labels), np.arange(len(paths)), 2, training=True), 5)
+
+    for (a, a_labels), (b, b_labels) in zip(from_files, from_arrays):
+        np.testing.assert_allclose(a, b, atol=1e-6)
+        np.testing.assert_array_equal(a_labels, b_labels)
+
+
+def test_shifts_move_the_image_along_the_keras_axes():
+    builder = ImageDatasetBuilder([7, 9, 3], batch_size=1)
+    image = np.zeros((7, 9, 3), dtype=np.float32)
+    image[3, 4] = 1.0
+
+    def bright_pixel(**params):
+        matrix = builder._affine_matrix(**dict(dict(theta=0, tx=0, ty=0, shear=0, zx=1, zy=1), **params))
+        moved = builder._transform(image, matrix).numpy()
+        return tuple(int(index) for index in np.argwhere(moved[..., 0] > 0.5)[0])
+
+    # tx shifts rows (height), ty columns (width), as in `apply_affine_transform`
+    assert bright_pixel(tx=2) == (1, 4)
+    assert bright_pixel(ty=2) == (3, 2)
+
+
+
+def test_height_and_width_shift_ranges_move_rows_and_columns():
+    import tensorflow as tf
+
+    image = np.zeros((7, 9, 3), dtype=np.float32)
+    image[3, 4] = 1.0
+    still = dict(rotation_range=0, width_shift_range=0, height_shift_range=0, shear_range=0, zoom_range=0, horizontal_flip=False)
+
+    def centers(**ranges):
+        builder = ImageDatasetBuilder([7, 9, 3], batch_size=1, **dict(still, **ranges))
+        for seed in range(8):
+            moved = builder._transform(image, builder._affine_transform(tf.constant([seed, 0]))).numpy()[..., 0]
+            rows, columns = np.indices(moved.shape)
+            yield (rows * moved).sum() / moved.sum(), (columns * moved).sum() / moved.sum()
+
+    vertical, horizontal = list(centers(height_shift_range=0.3)), list(centers(width_shift_range=0.3))
+
+    np.testing.assert_allclose([column for _, column in vertical], 4.0, atol=1e-5)
+    assert max(abs(row - 3.0) for row, _ in vertical) > 0.5
+    np.testing.assert_allclose([row for row, _ in horizontal], 3.0, atol=1e-5)
+    assert max(abs(column - 4.0) for _, column in horizontal) > 0.5
@@ -0,0 +1,170 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+# main.py in miniature: the base model stage runs TensorFlow ops before training creates its strategy
+PIPELINE_SCRIPT = textwrap.dedent("""
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, sys.argv[2])
+    from conftest import make_dataset
+    from cnnClassifier.components.distribution import configure_devices
+    from cnnClassifier.components.model_trainer import Training
+    from cnnClassifier.components.prepare_base_model import PrepareBaseModel
+    from cnnClassifier.entity.config_entity import PrepareBaseModelConfig, TrainingConfig
+
+    root = Path(sys.argv[1])
+    if sys.argv[3] == "configure":
+        configure_devices("mirrored", 2)
+
+    prepare_base_model = PrepareBaseModel(PrepareBaseModelConfig(
+        root_dir=root, base_model_path=root / "base_model", updated_base_model_path=root / "base_model_updated",
+        artifact_store_dir=root / "store", artifact_versions_to_keep=2, params_image_size=[32, 32, 3],
+        params_include_top=False, params_weights=None, params_classes=2, params_freeze_till=0,
+    ))
+    prepare_base_model.get_base_model()
+    prepare_base_model.update_base_model()
+
+    training = Training(TrainingConfig(
+        root_dir=root, trained_model_path=root / "model", trained_model_path_for_tracking=root / "model_tracked",
+        updated_base_model_path=root / "base_model_updated", artifact_store_dir=root / "store",
+        artifact_versions_to_keep=2, training_data=make_dataset(str(root / "data"), per_class=4, size=32),
+        params_epochs=1, params_batch_size=2, params_is_augmentation=False, params_image_size=[32, 32, 3],
+        params_preprocessing={}, params_learning_rate=0.01, params_data_pipeline="tf_data", params_data_cache="none",
+        params_seed=0, image_cache_dir=root / "image_cache", params_image_cache=False, params_bottleneck_cache=False,
+        params_mixed_precision="float32", params_intra_op_threads=0, params_inter_op_threads=0, params_onednn=True,
+        params_xla_jit=False, params_distribution_strategy="mirrored", params_cpu_devices=2,
+        params_scale_learning_rate=True, checkpoint_dir=root / "checkpoints", checkpoint_every_epochs=1,
+        checkpoints_to_keep=1, split_path=root / "split.json", predictions_path=root / "predictions.json",
+        params_validation_split=0.25, profile_dir=root / "profiles", training_profile="none", training_profile_step=0,
+    ))
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train()
+    print("replicas", training.strategy.num_replicas_in_sync)
+""")
+
+
+def run_pipeline(tmp_path, mode: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", PIPELINE_SCRIPT, str(tmp_path), str(TESTS_DIR), mode],
+                          capture_output=True, text=True, timeout=600)
+
+
+def test_mirrored_training_after_the_base_model_stage(tmp_path):
+    result = run_pipeline(tmp_path, "configure")
+
+    assert result.returncode == 0, result.stderr[-3000:]
+    assert "replicas 2" in result.stdout
+    assert (tmp_path / "model").exists()
+
+
+def test_devices_configured_too_late_raise_a_clear_error(tmp_path):
+    result = run_pipeline(tmp_path, "late")
+
+    assert result.returncode != 0
+    assert "call configure_devices at the start of the process" in result.stderr
+
+
+# one worker of a local cluster: an all-reduce across the workers, then one checkpoint written by all of them
+WORKER_SCRIPT = textwrap.dedent("""
+    import sys
+
+    import tensorflow as tf
+
+    from cnnClassifier.components.checkpoints import TrainingCheckpoints
+    from cnnClassifier.components.distribution import create_strategy, is_chief
+
+    strategy = create_strategy("auto", 1)
+    total = strategy.reduce("SUM", strategy.run(lambda: tf.constant(1.0)), axis=None)
+    with strategy.scope():
+        model = tf.keras.Sequential([tf.keras.Input(shape=(2,)), tf.keras.layers.Dense(1)])
+        optimizer = tf.keras.optimizers.SGD()
+    TrainingCheckpoints(sys.argv[1], "hash", 2, is_chief=is_chief(strategy)).save(model, optimizer, 1, 10)
+    multi_worker = isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy)
+    print("worker", multi_worker, strategy.num_replicas_in_sync, is_chief(strategy), float(total))
+""")
+
+
+def test_a_local_cluster_trains_multi_worker_and_only_the_chief_keeps_checkpoints(tmp_path, monkeypatch):
+    import launch_multi_worker
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TMPDIR", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+
+    exit_code = launch_multi_worker.launch(2, [sys.executable, "-c", WORKER_SCRIPT, str(tmp_path / "checkpoints")])
+
+    logs = [(tmp_path / launch_multi_worker.LOG_DIR / f"worker_{index}.log").read_text() for index in range(2)]
+    assert exit_code == 0, logs
+    assert "worker True 2 True 2.0" in logs[0]
+    assert "worker True 2 False 2.0" in logs[1]
+    assert [path.name for path in (tmp_path / "checkpoints").iterdir()] == ["epoch-0001"]
+    assert not list((tmp_path / "tmp").iterdir())
+
+
+def test_a_failed_worker_stops_the_cluster(tmp_path, monkeypatch):
+    import launch_multi_worker
+
+    monkeypatch.chdir(tmp_path)
+    script = "import json, os, sys, time; sys.exit(3) if json.loads(os.environ['TF_CONFIG'])['task']['index'] else time.sleep(120)"
+
+    assert launch_multi_worker.launch(2, [sys.executable, "-c", script]) == 3
+
+
+def test_multi_worker_needs_a_cluster(monkeypatch):
+    from cnnClassifier.components.distribution import create_strategy, resolve_strategy_name
+
+    monkeypatch.delenv("TF_CONFIG", raising=False)
+    assert resolve_strategy_name("auto", 1) == "none"
+    with pytest.raises(ValueError, match="needs a cluster"):
+        create_strategy("multi_worker", 1)
+
+    monkeypatch.setenv("TF_CONFIG", '{"cluster": {"worker": ["localhost:1"]}, "task": {"type": "worker", "index": 0}}')
+    assert resolve_strategy_name("auto", 1) == "multi_worker"
+
+
+@pytest.mark.parametrize("cluster, task_type, task_id, chief", [
+    ({"worker": ["a:1", "b:1"]}, "worker", 0, True),
+    ({"worker": ["a:1", "b:1"]}, "worker", 1, False),
+    ({"chief": ["c:1"], "worker": ["a:1"]}, "chief", 0, True),
+    ({"chief": ["c:1"], "worker": ["a:1"]}, "worker", 0, False),
+])
+def test_only_the_chief_task_is_chief(cluster, task_type, task_id, chief):
+    import tensorflow as tf
+    from cnnClassifier.components.distribution import is_chief
+
+    strategy = mock.Mock(spec=tf.distribute.MultiWorkerMirroredStrategy)
+    strategy.cluster_resolver = tf.distribute.cluster_resolver.SimpleClusterResolver(
+        tf.train.ClusterSpec(cluster), task_type=task_type, task_id=task_id
+    )
+
+    assert is_chief(strategy) is chief
+    assert is_chief(tf.distribute.get_strategy())
+
+
+def test_non_chief_checkpoints_are_written_to_a_removed_temp_dir(tmp_path, monkeypatch):
+    import tensorflow as tf
+    from cnnClassifier.components import checkpoints
+    from cnnClassifier.components.checkpoints import TrainingCheckpoints
+
+    model = tf.keras.Sequential([tf.keras.Input(shape=(2,)), tf.keras.layers.Dense(1)])
+    temp_dirs, mkdtemp = [], checkpoints.tempfile.mkdtemp
+    monkeypatch.setattr(checkpoints.tempfile, "mkdtemp", lambda **kwargs: temp_dirs.append(mkdtemp(dir=tmp_path, **kwargs)) or temp_dirs[-1])
+    written = []
+    write = tf.train.Checkpoint.write
+    monkeypatch.setattr(tf.train.Checkpoint, "write", lambda self, prefix, **kwargs: written.append(prefix) or write(self, prefix, **kwargs))
+
+    TrainingCheckpoints(tmp_path / "worker", "hash", 2, is_chief=False).save(model, tf.keras.optimizers.SGD(), 1, 10)
+    TrainingCheckpoints(tmp_path / "chief", "hash", 2, is_chief=True).save(model, tf.keras.optimizers.SGD(), 1, 10)
+
+    assert len(temp_dirs) == 1 and written[0].startswith(temp_dirs[0])
+    assert not Path(temp_dirs[0]).exists()
+    assert not list((tmp_path / "worker").iterdir())
+    assert [path.name for path in (tmp_path / "chief").iterdir()] == ["epoch-0001"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sklearn import metrics as sk_metrics
+
+from cnnClassifier.components.data_split import DatasetSplit
+from cnnClassifier.components.evaluation_metrics import classification_metrics, load_predictions, save_predictions
+from cnnClassifier.components.model_evaluation_mlflow import Evaluation
+from cnnClassifier.components.model_trainer import Training
+from cnnClassifier.entity.config_entity import EvaluationConfig
+from conftest import IMAGE_SIZE, build_tiny_model, make_dataset, make_training_config, save_model
+
+
+def test_metrics_match_scikit_learn():
+    rng = np.random.default_rng(0)
+    probabilities = rng.dirichlet([1, 1, 1], size=40)
+    labels = rng.integers(0, 3, size=40)
+
+    metrics = classification_metrics(probabilities, labels, ["a", "b", "c"])
+
+    predicted = probabilities.argmax(axis=1)
+    assert metrics["loss"] == pytest.approx(sk_metrics.log_loss(labels, probabilities), rel=1e-6)
+    assert metrics["accuracy"] == pytest.approx(sk_metrics.accuracy_score(labels, predicted))
+    assert metrics["precision"] == pytest.approx(sk_metrics.precision_score(labels, predicted, average="macro", zero_division=0))
+    assert metrics["recall"] == pytest.approx(sk_metrics.recall_score(labels, predicted, average="macro"))
+    assert metrics["roc_auc"] == pytest.approx(sk_metrics.roc_auc_score(labels, probabilities, multi_class="ovr"))
+    assert metrics["confusion_matrix"] == sk_metrics.confusion_matrix(labels, predicted).tolist()
+
+
+def test_predictions_are_only_reused_for_the_same_model_and_split(tmp_path):
+    path = tmp_path / "predictions.npz"
+    save_predictions(path, [[0.9, 0.1]], labels=[0], files=["a/000.png"], class_names=["a", "b"],
+                     model_sha256="model", split_fingerprint="split")
+
+    np.testing.assert_allclose(load_predictions(path, "model", "split")["probabilities"], [[0.9, 0.1]])
+    assert load_predictions(path, "other-model", "split") is None
+    assert load_predictions(path, "model", "other-split") is None
+
+
+def test_the_split_is_persisted_and_made_again_when_the_images_change(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=5)
+    split = DatasetSplit(tmp_path / "split.json", data_dir, 0.2).load()
+
+    assert DatasetSplit(tmp_path / "split.json", data_dir, 0.2).load() == split
+    assert split["validation"]["files"] == ["adenocarcinoma/000.png", "normal/000.png"]
+
+    make_dataset(str(tmp_path / "data"), classes=("normal",), per_class=6, seed=1)
+    assert DatasetSplit(tmp_path / "split.json", data_dir, 0.2).load()["fingerprint"] != split["fingerprint"]
+
+
+def test_evaluation_reuses_the_predictions_stored_by_training(tmp_path, monkeypatch):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=5)
+    training = Training(make_training_config(tmp_path, save_model(build_tiny_model(), tmp_path / "base"), data_dir))
+    training.get_base_model()
+    training.train_valid_generator()
+    training.train()
+    config = EvaluationConfig(
+        path_of_model=tmp_path / "model", training_data=data_dir, all_params={}, mlflow_uri="",
+        params_image_size=IMAGE_SIZE, params_preprocessing={}, params_batch_size=2,
+        image_cache_dir=tmp_path / "image_cache", params_image_cache=False, root_dir=tmp_path / "evaluation",
+        split_path=tmp_path / "split.json", predictions_path=tmp_path / "predictions.npz",
+        report_path=tmp_path / "evaluation" / "report.json", params_validation_split=0.2,
+    )
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Evaluation, "load_model", staticmethod(lambda path: pytest.fail("the model was loaded")))
+        reused = Evaluation(config)
+        reused.evaluate(write_scores=False)
+
+    (tmp_path / "predictions.npz").unlink()
+    recomputed = Evaluation(config)
+    recomputed.evaluate(write_scores=False)
+
+    assert reused.metrics["samples"] == 2
+    assert reused.metrics["loss"] == pytest.approx(recomputed.metrics["loss"], abs=1e-5)
+    assert reused.metrics["confusion_matrix"] == recomputed.metrics["confusion_matrix"]
@@ -0,0 +1,76 @@
+import numpy as np
+import tensorflow as tf
+
+from cnnClassifier.components.feature_cache import BottleneckFeatureCache, split_frozen_backbone
+
+
+def vgg_style_model(dropout: bool = False) -> tf.keras.Model:
+    """
+    A frozen conv block ending in max pooling, then Flatten and a trainable Dense head, like VGG16 + the project head.
+    """
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input(shape=(8, 8, 3))
+    x = tf.keras.layers.Conv2D(4, 3, padding="same", activation="relu", name="block1_conv1", trainable=False)(inputs)
+    x = tf.keras.layers.Conv2D(4, 3, padding="same", activation="relu", name="block1_conv2", trainable=False)(x)
+    x = tf.keras.layers.MaxPooling2D(name="block1_pool")(x)
+    x = tf.keras.layers.Flatten()(x)
+    if dropout:
+        x = tf.keras.layers.Dropout(0.5)(x)
+    outputs = tf.keras.layers.Dense(2, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def test_backbone_keeps_the_trailing_pooling_and_flatten():
+    model = vgg_style_model()
+
+    backbone, head, reason = split_frozen_backbone(model)
+
+    assert reason is None
+    assert backbone.output.shape[1:] == (4 * 4 * 4,)
+    assert [layer.name for layer in head.layers[1:]] == [model.layers[-1].name]
+    images = np.random.default_rng(0).random((3, 8, 8, 3), dtype=np.float32)
+    np.testing.assert_allclose(head(backbone(images)).numpy(), model(images).numpy(), atol=1e-6)
+
+
+def test_dropout_stays_in_the_head():
+    backbone, head, reason = split_frozen_backbone(vgg_style_model(dropout=True))
+
+    assert reason is None
+    assert isinstance(head.layers[1], tf.keras.layers.Dropout)
+    assert backbone.output.shape[1:] == (64,)
+
+
+def test_cached_features_are_the_pooled_backbone_output(tmp_path):
+    backbone, _, _ = split_frozen_backbone(vgg_style_model())
+    images = np.random.default_rng(1).random((5, 8, 8, 3), dtype=np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices(images).batch(2)
+    cache = BottleneckFeatureCache(tmp_path, backbone, key="test")
+
+    features = cache.get("training", dataset, 5)
+
+    assert features.shape == (5, 4 * 4 * 4)
+    np.testing.assert_allclose(features, backbone(images).numpy(), atol=1e-6)
+    assert np.load(tmp_path / "test" / "training_features.npy", mmap_mode="r").shape == (5, 64)
+
+
+def test_features_of_another_shape_are_computed_again(tmp_path):
+    backbone, _, _ = split_frozen_backbone(vgg_style_model())
+    (tmp_path / "test").mkdir()
+    np.save(tmp_path / "test" / "training_features.npy", np.zeros((5, 8, 8, 4), dtype=np.float32))
+    images = np.random.default_rng(2).random((5, 8, 8, 3), dtype=np.float32)
+
+    features = BottleneckFeatureCache(tmp_path, backbone, key="test").get(
+        "training", tf.data.Dataset.from_tensor_slices(images).batch(5), 5
+    )
+
+    assert features.shape == (5, 64)
+
+
+def test_model_without_frozen_weights_is_not_split():
+    tf.keras.utils.set_random_seed(0)
+    inputs = tf.keras.Input(shape=(4,))
+    model = tf.keras.Model(inputs, tf.keras.layers.Dense(2)(inputs))
+
+    backbone, head, reason = split_frozen_backbone(model)
+
+    assert backbone is None and head is None and reason
@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from cnnClassifier.components.checkpoints import TrainingCheckpoints
+from cnnClassifier.components.hyperparameter_sweep import halving_rungs, sample_configurations, set_param, trial_config
+from cnnClassifier.components.model_trainer import Training
+from conftest import build_tiny_model, make_dataset, make_training_config, save_model
+
+
+def test_dotted_keys_set_nested_params():
+    params = {"PREPROCESSING": {"INTERPOLATION": "bilinear"}}
+
+    set_param(params, "PREPROCESSING.NORMALIZATION", "tf")
+    set_param(params, "DISTRIBUTION.STRATEGY", "mirrored")
+    set_param(params, "LEARNING_RATE", 0.1)
+
+    assert params == {
+        "PREPROCESSING": {"INTERPOLATION": "bilinear", "NORMALIZATION": "tf"},
+        "DISTRIBUTION": {"STRATEGY": "mirrored"},
+        "LEARNING_RATE": 0.1,
+    }
+
+
+def test_grid_search_covers_every_combination():
+    configurations = sample_configurations({"LEARNING_RATE": [0.1, 0.01], "BATCH_SIZE": [8, 16, 32]}, "grid", trials=1, seed=0)
+
+    assert len(configurations) == 6
+    assert {"LEARNING_RATE": 0.01, "BATCH_SIZE": 16} in configurations
+    with pytest.raises(ValueError, match="list of values"):
+        sample_configurations({"LEARNING_RATE": {"DISTRIBUTION": "uniform", "LOW": 0, "HIGH": 1}}, "grid", 1, 0)
+
+
+def test_random_search_is_seeded_within_bounds_and_without_duplicates():
+    space = {
+        "LEARNING_RATE": {"DISTRIBUTION": "log_uniform", "LOW": 1e-4, "HIGH": 1e-1},
+        "BATCH_SIZE": {"DISTRIBUTION": "int_uniform", "LOW": 8, "HIGH": 64},
+    }
+
+    configurations = sample_configurations(space, "random", trials=10, seed=3)
+
+    assert configurations == sample_configurations(space, "random", trials=10, seed=3)
+    assert configurations != sample_configurations(space, "random", trials=10, seed=4)
+    assert all(1e-4 <= c["LEARNING_RATE"] <= 1e-1 and 8 <= c["BATCH_SIZE"] <= 64 for c in configurations)
+    # a space with 2 distinct points yields 2 trials, not 10 duplicates
+    assert len(sample_configurations({"OPTIMIZER": ["sgd", "adam"]}, "random", trials=10, seed=0)) == 2
+    with pytest.raises(ValueError, match="Unknown distribution"):
+        sample_configurations({"LEARNING_RATE": {"DISTRIBUTION": "normal", "LOW": 0, "HIGH": 1}}, "random", 1, 0)
+    with pytest.raises(ValueError, match="Unknown search method"):
+        sample_configurations(space, "bayesian", 1, 0)
+
+
+def test_halving_rungs_end_at_the_full_budget():
+    assert halving_rungs(5, 1, 2) == [1, 2, 4, 5]
+    assert halving_rungs(9, 1, 3) == [1, 3, 9]
+    assert halving_rungs(3, 5, 2) == [3]
+    assert halving_rungs(4, 0, 2) == [1, 2, 4]
+
+
+def test_trials_write_their_own_outputs_and_share_the_dataset(tmp_path):
+    with open(Path(__file__).parents[1] / "config" / "config.yaml") as f:
+        base_config = yaml.safe_load(f)
+
+    config = trial_config(base_config, tmp_path / "trial-0001")
+
+    for section, key in (("training", "trained_model_path"), ("training", "checkpoint_dir"),
+                         ("model_artifacts", "root_dir"), ("evaluation", "report_path")):
+        assert config[section][key].startswith(str(tmp_path / "trial-0001"))
+    assert config["data_ingestion"] == base_config["data_ingestion"]
+    assert config["prepare_base_model"]["base_model_path"] == base_config["prepare_base_model"]["base_model_path"]
+    assert base_config["training"]["root_dir"] != config["training"]["root_dir"]
+
+
+def test_checkpoints_are_keyed_on_every_parameter_but_the_epochs(tmp_path):
+    base_model = save_model(build_tiny_model(), tmp_path / "base")
+
+    def config_hash(**overrides):
+        return TrainingCheckpoints.make_config_hash(make_training_config(tmp_path, base_model, "data", **overrides))
+
+    assert config_hash(params_epochs=1) == config_hash(params_epochs=4)
+    assert config_hash(params_learning_rate=0.05) != config_hash(params_learning_rate=0.01)
+
+
+def test_a_promoted_trial_resumes_from_its_previous_rung(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=6)
+    base_model = save_model(build_tiny_model(), tmp_path / "base")
+
+    def train(epochs: int, **overrides) -> Training:
+        training = Training(make_training_config(tmp_path / "trial", base_model, data_dir, params_epochs=epochs, **overrides))
+        training.get_base_model()
+        training.train_valid_generator()
+        training.train()
+        return training
+
+    train(1)
+
+    assert train(2).initial_epoch == 1
+    assert train(2, params_learning_rate=0.01).initial_epoch == 0
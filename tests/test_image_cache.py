@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from cnnClassifier.components.data_pipeline import list_image_files
+from cnnClassifier.components.image_cache import ImageCache
+from cnnClassifier.components.preprocessing import ImagePreprocessor
+from conftest import make_dataset
+
+
+def test_cache_holds_the_preprocessed_images_memory_mapped(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=3)
+    preprocessor = ImagePreprocessor([8, 8, 3])
+    cache = ImageCache(tmp_path / "cache", [8, 8, 3], preprocessor)
+
+    cache.build(data_dir, num_workers=2)
+    images, labels, manifest = cache.load(data_dir)
+
+    paths, expected_labels, class_names = list_image_files(data_dir)
+    assert isinstance(images, np.memmap)
+    assert images.dtype == np.uint8 and images.shape == (6, 8, 8, 3)
+    np.testing.assert_array_equal(images, np.stack([preprocessor.load(path) for path in paths]))
+    np.testing.assert_array_equal(labels, expected_labels)
+    assert manifest["class_names"] == class_names
+    np.testing.assert_array_equal(ImageCache.indices_of(manifest, paths[::-1], data_dir), np.arange(6)[::-1])
+
+
+def test_cache_is_reused_until_the_images_change(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=2)
+    cache = ImageCache(tmp_path / "cache", [8, 8, 3])
+    first = cache.build(data_dir, num_workers=1)
+
+    assert cache.build(data_dir, num_workers=1) == first
+
+    path = os.path.join(data_dir, "normal", "000.png")
+    Image.fromarray(np.zeros((16, 16, 3), dtype=np.uint8)).save(path)
+
+    assert cache.load(data_dir) is None
+    second = cache.build(data_dir, num_workers=1)
+    assert second != first
+    assert not cache.load(data_dir)[0][-2].any()
+
+
+def test_a_different_image_size_does_not_reuse_the_cache(tmp_path):
+    data_dir = make_dataset(str(tmp_path / "data"), per_class=2)
+    ImageCache(tmp_path / "cache", [8, 8, 3]).build(data_dir, num_workers=1)
+
+    assert ImageCache(tmp_path / "cache", [4, 4, 3]).load(data_dir) is None
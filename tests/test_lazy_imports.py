@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def imported_modules(code: str, cwd) -> set:
+    script = textwrap.dedent(code) + "\nimport sys\nprint(' '.join(sorted(sys.modules)))\n"
+    result = subprocess.run([sys.executable, "-c", script], cwd=cwd, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-3000:]
+    return set(result.stdout.splitlines()[-1].split())
+
+
+def test_importing_the_package_loads_no_heavy_dependency_and_writes_nothing(tmp_path):
+    modules = imported_modules("""
+        import cnnClassifier
+        import cnnClassifier.utils.common
+        import cnnClassifier.config.configuration
+        import cnnClassifier.pipeline.prediction
+    """, cwd=tmp_path)
+
+    assert "cnnClassifier.pipeline.prediction" in modules
+    assert not {"tensorflow", "joblib", "box", "ensure", "yaml"} & modules
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_the_serving_apps_start_without_tensorflow():
+    for app in ("app", "asgi_app"):
+        assert "tensorflow" not in imported_modules(f"import {app}", cwd=ROOT), app
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+import pytest
+
+from cnnClassifier.components.micro_batcher import MicroBatcher
+
+
+def test_concurrent_requests_share_batches_and_get_their_own_rows():
+    batch_sizes = []
+
+    def predict_fn(batch):
+        batch_sizes.append(len(batch))
+        return batch.sum(axis=1, keepdims=True)
+
+    # a long wait, so the submitted requests are all queued before the first batch closes
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=200)
+    inputs = [np.full(3, value, dtype=np.float32) for value in range(10)]
+    futures = [batcher.submit(x) for x in inputs]
+
+    outputs = [future.result(timeout=10) for future in futures]
+    batcher.stop(timeout=10)
+
+    assert [float(output[0]) for output in outputs] == [3.0 * value for value in range(10)]
+    assert max(batch_sizes) <= 4
+    assert sum(batch_sizes) == 10
+    assert len(batch_sizes) < 10
+    assert batcher.metrics()["item_count"] == 10
+
+
+def test_single_request_is_served_after_the_wait_budget():
+    batcher = MicroBatcher(lambda batch: batch * 2, max_batch_size=8, max_wait_ms=1)
+    try:
+        np.testing.assert_array_equal(batcher.predict(np.ones(2), timeout=10), [2.0, 2.0])
+    finally:
+        batcher.stop(timeout=10)
+
+
+def test_forward_error_is_raised_to_every_caller_of_the_batch():
+    def predict_fn(batch):
+        raise RuntimeError("forward failed")
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(batcher.predict(np.zeros(2), timeout=10))
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop(timeout=10)
+
+    assert not results
+    assert len(errors) == 3
+
+
+def test_max_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda batch: batch, max_batch_size=0)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from cnnClassifier.components.model_artifact import (ALIGNMENT, ModelArtifactStore, link_artifact, load_model,
+                                                     model_fingerprint, read_manifest)
+from conftest import build_tiny_model
+
+
+def test_saved_model_loads_back_with_the_same_weights_and_outputs(tmp_path):
+    model = build_tiny_model()
+    version = ModelArtifactStore(tmp_path).save(model, "model", params={"EPOCHS": 1}, metadata={"base": "abc"})
+
+    loaded = load_model(version)
+
+    manifest = read_manifest(version)
+    assert manifest["version"] == "v0001" and manifest["params"] == {"EPOCHS": 1}
+    assert manifest["metadata"] == {"base": "abc"}
+    assert all(weight["offset"] % ALIGNMENT == 0 for weight in manifest["weights"])
+    for expected, actual in zip(model.get_weights(), loaded.get_weights()):
+        np.testing.assert_array_equal(expected, actual)
+    images = np.random.default_rng(0).random((2, 8, 8, 3), dtype=np.float32)
+    np.testing.assert_allclose(loaded(images).numpy(), model(images).numpy(), atol=1e-6)
+
+
+def test_saving_an_identical_model_reuses_its_version(tmp_path):
+    store = ModelArtifactStore(tmp_path)
+    model = build_tiny_model()
+
+    first = store.save(model, "model")
+    again = store.save(model, "model")
+    other = store.save(build_tiny_model(seed=1), "model")
+
+    assert again == first
+    assert other != first and other.name == "v0002"
+    assert model_fingerprint(first) != model_fingerprint(other)
+    assert not list((tmp_path / "model").glob(".tmp-*"))
+
+
+def test_only_the_newest_versions_are_kept(tmp_path):
+    store = ModelArtifactStore(tmp_path, versions_to_keep=2)
+
+    saved = [store.save(build_tiny_model(seed=seed), "model") for seed in range(4)]
+
+    assert store.versions("model") == saved[-2:]
+    assert [path.name for path in store.versions("model")] == ["v0003", "v0004"]
+
+
+def test_a_link_stays_valid_after_its_version_is_pruned(tmp_path):
+    store = ModelArtifactStore(tmp_path / "store", versions_to_keep=1)
+    model = build_tiny_model()
+    link = link_artifact(store.save(model, "model"), tmp_path / "model")
+
+    store.save(build_tiny_model(seed=1), "model")
+
+    assert [path.name for path in store.versions("model")] == ["v0002"]
+    for expected, actual in zip(model.get_weights(), load_model(link).get_weights()):
+        np.testing.assert_array_equal(expected, actual)
+
+
+def test_unknown_format_version_is_rejected(tmp_path):
+    version = ModelArtifactStore(tmp_path).save(build_tiny_model(), "model")
+    manifest_path = version / "manifest.json"
+    manifest_path.write_text(manifest_path.read_text().replace('"format_version": 1', '"format_version": 99'))
+
+    with pytest.raises(ValueError, match="Unsupported model artifact format"):
+        load_model(version)
@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from cnnClassifier.components.model_backends import load_backend
+from cnnClassifier.components.model_export import ModelExport
+from cnnClassifier.components.model_registry import ModelRegistry
+from cnnClassifier.components.preprocessing import ImagePreprocessor, preprocessing_path
+from cnnClassifier.entity.config_entity import ModelExportConfig
+from conftest import IMAGE_SIZE, build_tiny_model, make_dataset, make_prediction_config, save_model
+
+
+def make_export(tmp_path, model, formats: list) -> ModelExport:
+    config = ModelExportConfig(
+        root_dir=tmp_path / "export",
+        model_path=save_model(model, tmp_path / "models"),
+        training_data=make_dataset(str(tmp_path / "data"), per_class=5),
+        report_path=tmp_path / "export_report.json",
+        formats=formats,
+        representative_samples=4,
+        latency_iterations=2,
+        params_image_size=IMAGE_SIZE,
+        params_preprocessing={},
+        params_batch_size=4,
+        params_seed=0,
+        split_path=tmp_path / "split.json",
+        params_validation_split=0.2,
+    )
+    (tmp_path / "export").mkdir()
+    return ModelExport(config)
+
+
+def test_variants_are_exported_evaluated_and_servable(tmp_path):
+    model = build_tiny_model()
+    export = make_export(tmp_path, model, ["tflite_float32", "tflite_dynamic", "tflite_float16", "tflite_int8"])
+
+    report = export.export()
+
+    assert set(report) == {"keras", "tflite_float32", "tflite_dynamic", "tflite_float16", "tflite_int8"}
+    with open(export.config.report_path) as f:
+        assert json.load(f) == report
+    data_dir = export.config.training_data
+    images = ImagePreprocessor(IMAGE_SIZE)([f"{data_dir}/normal/000.png", f"{data_dir}/adenocarcinoma/000.png"])
+    expected = model(images).numpy()
+    for variant, tolerance in (("tflite_float32", 1e-5), ("tflite_dynamic", 0.05), ("tflite_float16", 0.05), ("tflite_int8", 0.05)):
+        assert 0.0 <= report[variant]["accuracy"] <= 1.0
+        assert preprocessing_path(report[variant]["path"]).exists()
+        probabilities = load_backend(variant, report[variant]["path"])(images)
+        np.testing.assert_allclose(probabilities, expected, atol=tolerance)
+
+
+def test_quantized_backends_are_only_served_within_the_accuracy_tolerance(tmp_path):
+    export = make_export(tmp_path, build_tiny_model(), ["tflite_dynamic"])
+    report = export.export()
+    path = report["tflite_dynamic"]["path"]
+
+    def load(report_path, max_accuracy_drop=0.01):
+        config = make_prediction_config(path, backend="tflite_dynamic", export_report_path=report_path,
+                                        max_accuracy_drop=max_accuracy_drop)
+        return ModelRegistry(config).load()
+
+    report["keras"]["accuracy"] = report["tflite_dynamic"]["accuracy"] + 0.005
+    with open(export.config.report_path, "w") as f:
+        json.dump(report, f)
+    assert load(export.config.report_path) is not None
+
+    report["keras"]["accuracy"] = report["tflite_dynamic"]["accuracy"] + 0.25
+    with open(export.config.report_path, "w") as f:
+        json.dump(report, f)
+    with pytest.raises(ValueError, match="below the Keras model"):
+        load(export.config.report_path)
+    assert load(export.config.report_path, max_accuracy_drop=0.3) is not None
+
+    report["tflite_dynamic"]["sha256"] = "0" * 64
+    with open(export.config.report_path, "w") as f:
+        json.dump(report, f)
+    with pytest.raises(ValueError, match="does not cover"):
+        load(export.config.report_path)
+    with pytest.raises(ValueError, match="no export report"):
+        load(tmp_path / "missing.json")
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from cnnClassifier.components.model_registry import ModelRegistry
+from conftest import build_tiny_model, make_prediction_config, save_model
+
+
+def test_model_is_loaded_once_and_shared(tmp_path):
+    path = save_model(build_tiny_model(), tmp_path)
+    registry = ModelRegistry(make_prediction_config(path, watch_interval_seconds=None))
+
+    model = registry.get_model()
+
+    assert registry.get_model() is model
+    assert registry.metrics()["load_count"] == 1
+
+
+def test_changed_model_file_is_swapped_in(tmp_path):
+    path = save_model(build_tiny_model(seed=0), tmp_path)
+    registry = ModelRegistry(make_prediction_config(path))
+    old_model = registry.get_model()
+    old_hash = registry.content_hash
+
+    new_model = build_tiny_model(seed=1)
+    save_model(new_model, tmp_path, path=path)
+
+    assert registry.reload_if_changed()
+    assert registry.get_model() is not old_model
+    assert registry.content_hash != old_hash
+    assert registry.metrics()["swap_count"] == 1
+    images = np.random.default_rng(0).random((2, 8, 8, 3), dtype=np.float32)
+    np.testing.assert_allclose(registry.get_serving_fn()(images).numpy(), new_model(images).numpy(), atol=1e-6)
+
+
+def test_the_watcher_thread_swaps_in_a_changed_model_off_the_request_path(tmp_path):
+    path = save_model(build_tiny_model(seed=0), tmp_path)
+    registry = ModelRegistry(make_prediction_config(path, watch_interval_seconds=0))
+    loads, load = [], registry._load
+    registry._load = lambda: loads.append(threading.current_thread().name) or load()
+    old = registry.get_served()
+
+    try:
+        save_model(build_tiny_model(seed=1), tmp_path, path=path)
+        deadline = time.monotonic() + 60
+        while registry.get_served() is old and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        registry.stop()
+
+    assert registry.get_served() is not old
+    assert loads == [threading.current_thread().name, "model-watcher"]
+
+
+def test_touched_but_unchanged_model_is_not_reloaded(tmp_path):
+    model = build_tiny_model()
+    path = save_model(model, tmp_path)
+    registry = ModelRegistry(make_prediction_config(path))
+    registry.get_model()
+
+    manifest = os.path.join(path, "manifest.json")
+    os.utime(manifest, ns=(os.stat(manifest).st_atime_ns, os.stat(manifest).st_mtime_ns + 10**9))
+
+    assert not registry.reload_if_changed()
+    assert registry.metrics()["load_count"] == 1
+
+
+def test_failed_reload_keeps_serving_the_current_model(tmp_path):
+    path = save_model(build_tiny_model(), tmp_path)
+    registry = ModelRegistry(make_prediction_config(path))
+    model = registry.get_model()
+
+    with open(os.path.join(path, "model.json"), "w") as f:
+        f.write("not a model")
+    os.remove(os.path.join(path, "manifest.json"))
+
+    assert not registry.reload_if_changed()
+    assert registry.get_model() is model
+
+
+def test_model_is_served_in_the_dtype_policy_it_was_trained_in(tmp_path):
+    from cnnClassifier.components.performance import with_dtype_policy
+
+    model = build_tiny_model()
+    float32_path = save_model(model, tmp_path / "float32")
+    bfloat16_path = save_model(model, tmp_path / "bfloat16", metadata={"dtype_policy": "mixed_bfloat16"})
+    images = np.random.default_rng(0).random((2, 8, 8, 3), dtype=np.float32)
+
+    served = ModelRegistry(make_prediction_config(bfloat16_path)).get_model()
+
+    assert served.layers[1].dtype_policy.name == "mixed_bfloat16"
+    np.testing.assert_allclose(served(images).numpy(), with_dtype_policy(model, "mixed_bfloat16")(images).numpy(), atol=1e-6)
+    assert ModelRegistry(make_prediction_config(float32_path)).get_model().layers[1].dtype_policy.name == "float32"
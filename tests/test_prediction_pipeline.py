@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from conftest import build_tiny_model, encode_image, make_prediction_config, save_model
+
+
+def test_prediction_from_bytes_never_touches_disk(tmp_path, monkeypatch):
+    path = save_model(build_tiny_model(), tmp_path / "models")
+    pipeline = PredictionPipeline(config=make_prediction_config(path))
+    pixels = np.random.default_rng(0).integers(0, 255, size=(8, 8, 3), dtype=np.uint8)
+    work_dir = tmp_path / "cwd"
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)
+
+    prediction = pipeline.predict(encode_image(pixels))
+
+    assert os.listdir(work_dir) == []
+    assert prediction[0]["image"] in pipeline.config.class_names
+
+
+def test_bytes_and_decoded_arrays_give_the_same_prediction(tmp_path):
+    model = build_tiny_model()
+    path = save_model(model, tmp_path)
+    pipeline = PredictionPipeline(config=make_prediction_config(path))
+    pixels = np.random.default_rng(1).integers(0, 255, size=(8, 8, 3), dtype=np.uint8)
+
+    from_bytes = pipeline.load_image(encode_image(pixels))
+    from_array = pipeline.load_image(pixels)
+
+    np.testing.assert_array_equal(from_bytes, from_array)
+    expected = model(pixels[None].astype(np.float32) / 255.0).numpy().argmax()
+    assert pipeline.predict(pixels)[0]["image"] == pipeline.config.class_names[expected]
+
+
+def test_a_request_runs_on_the_model_it_was_preprocessed_for(tmp_path, monkeypatch):
+    path = save_model(build_tiny_model(seed=0), tmp_path)
+    pipeline = PredictionPipeline(config=make_prediction_config(path))
+    old = pipeline.registry.get_served()
+    save_model(build_tiny_model(seed=1), tmp_path, path=path)
+    preprocess, forward, ran_on = pipeline.preprocess, pipeline.forward, []
+
+    def preprocess_then_swap(sources, served=None):
+        batch = preprocess(sources, served)
+        assert pipeline.registry.reload_if_changed()
+        return batch
+
+    def recording_forward(batch, served=None):
+        ran_on.append(served)
+        return forward(batch, served)
+
+    monkeypatch.setattr(pipeline, "preprocess", preprocess_then_swap)
+    monkeypatch.setattr(pipeline, "forward", recording_forward)
+    pipeline.predict(encode_image(np.zeros((8, 8, 3), dtype=np.uint8)))
+
+    assert len(ran_on) == 1 and ran_on[0] is old
+    assert pipeline.registry.get_served() is not old
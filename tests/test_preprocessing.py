@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from cnnClassifier.components.data_pipeline import ImageDatasetBuilder
+from cnnClassifier.components.preprocessing import ImagePreprocessor, InvalidImageError, preprocessing_path
+from conftest import encode_image
+
+
+@pytest.mark.parametrize("normalization", ["rescale", "caffe", "tf"])
+def test_numpy_and_tensorflow_normalization_agree(normalization):
+    preprocessor = ImagePreprocessor([8, 8, 3], normalization=normalization)
+    images = np.random.default_rng(0).integers(0, 256, (2, 8, 8, 3), dtype=np.uint8)
+
+    on_numpy = preprocessor.normalize(images)
+    on_tensorflow = preprocessor.normalize(tf.constant(images)).numpy()
+
+    assert on_numpy.dtype == np.float32
+    np.testing.assert_allclose(on_numpy, on_tensorflow, atol=1e-5)
+
+
+@pytest.mark.parametrize("interpolation", ["bilinear", "area", "lanczos3"])
+def test_serving_and_training_see_exactly_the_same_pixels(tmp_path, interpolation):
+    rng = np.random.default_rng(0)
+    paths = []
+    for index, fmt in enumerate(["JPEG", "PNG", "JPEG"]):
+        paths.append(str(tmp_path / f"{index}.{fmt.lower()}"))
+        with open(paths[-1], "wb") as f:
+            f.write(encode_image(rng.integers(0, 256, (21 + index, 17, 3), dtype=np.uint8), fmt))
+    preprocessor = ImagePreprocessor([8, 8, 3], interpolation=interpolation)
+    builder = ImageDatasetBuilder([8, 8, 3], batch_size=3, preprocessor=preprocessor)
+
+    served = preprocessor([open(path, "rb").read() for path in paths])
+    trained, _ = next(iter(builder.build(paths, [0, 1, 0], 2, training=False)))
+
+    np.testing.assert_array_equal(served, trained.numpy())
+
+
+def test_decoded_sources_are_converted_to_the_model_channels():
+    gray = np.random.default_rng(1).integers(0, 256, (8, 8), dtype=np.uint8)
+    rgba = np.random.default_rng(2).integers(0, 256, (8, 8, 4), dtype=np.uint8)
+
+    from_bytes = ImagePreprocessor([8, 8, 1]).load(encode_image(gray))
+    from_array = ImagePreprocessor([8, 8, 1]).load(gray)
+
+    assert from_bytes.shape == (8, 8, 1)
+    np.testing.assert_array_equal(from_bytes, from_array)
+    np.testing.assert_array_equal(ImagePreprocessor([8, 8, 3]).load(gray), np.repeat(from_array, 3, axis=-1))
+    np.testing.assert_array_equal(ImagePreprocessor([8, 8, 3]).load(encode_image(rgba)), rgba[..., :3])
+
+
+def test_undecodable_data_raises_invalid_image_error():
+    with pytest.raises(InvalidImageError):
+        ImagePreprocessor([8, 8, 3]).load(b"not an image")
+    with pytest.raises(TypeError):
+        ImagePreprocessor([8, 8, 3]).load(42)
+
+
+def test_spec_round_trips_next_to_the_model(tmp_path):
+    preprocessor = ImagePreprocessor([8, 8, 3], interpolation="bicubic", normalization="caffe")
+    default = ImagePreprocessor([8, 8, 3])
+    model_path = tmp_path / "model" / "model.keras"
+
+    assert ImagePreprocessor.for_model(model_path, default) is default
+
+    preprocessor.save(preprocessing_path(model_path))
+
+    assert preprocessing_path(model_path).name == "model.preprocessing.json"
+    assert ImagePreprocessor.for_model(model_path, default) == preprocessor
+    assert ImagePreprocessor.from_params([8, 8, 3], {"INTERPOLATION": "bicubic", "NORMALIZATION": "caffe"}) == preprocessor
+
+
+def test_fingerprint_tracks_what_changes_the_images():
+    base = ImagePreprocessor([8, 8, 3])
+    renormalized = ImagePreprocessor([8, 8, 3], normalization="tf")
+    resized = ImagePreprocessor([16, 16, 3])
+
+    assert base.fingerprint() != renormalized.fingerprint()
+    assert base.fingerprint(resize_only=True) == renormalized.fingerprint(resize_only=True)
+    assert base.fingerprint(resize_only=True) != resized.fingerprint(resize_only=True)
+
+
+def test_invalid_specs_raise():
+    with pytest.raises(ValueError, match="interpolation"):
+        ImagePreprocessor([8, 8, 3], interpolation="cubic")
+    with pytest.raises(ValueError, match="caffe"):
+        ImagePreprocessor([8, 8, 1], normalization="caffe")
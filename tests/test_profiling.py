@@ -0,0 +1,78 @@
+import pstats
+import threading
+
+import numpy as np
+import pytest
+
+from cnnClassifier.components.profiling import Histogram, MetricsRegistry, ProfilerBusyError, flatten_gauges, get_metrics, \
+                                                profile_capture
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from conftest import build_tiny_model, encode_image, make_prediction_config, save_model
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {"buckets": [1, 3, 4, 5], "sum": pytest.approx(1.65), "count": 5}
+    # the 2.5th of 5 observations lies halfway through the (0.1, 0.2] bucket
+    assert histogram.quantile(0.5) == pytest.approx(0.175)
+    assert Histogram().quantile(0.5) is None
+
+
+def test_spans_are_recorded_on_errors_and_rendered_for_prometheus():
+    metrics = MetricsRegistry(buckets=(0.5, 1.0))
+    with metrics.span("decode"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("training", metric="pipeline_stage_duration_seconds", label="stage"):
+            raise RuntimeError
+
+    text = metrics.render_prometheus(flatten_gauges("serving", {"load_count": 2, "batching": {"queue": 1}, "pid": "x"}))
+
+    assert 'cnn_classifier_span_duration_seconds_bucket{span="decode",le="0.5"} 1' in text
+    assert 'cnn_classifier_span_duration_seconds_bucket{span="decode",le="+Inf"} 1' in text
+    assert 'cnn_classifier_pipeline_stage_duration_seconds_count{stage="training"} 1' in text
+    assert "cnn_classifier_serving_load_count 2" in text and "cnn_classifier_serving_batching_queue 1" in text
+    assert "serving_pid" not in text
+    assert metrics.summary()["span_duration_seconds{span=decode}"]["count"] == 1
+    with pytest.raises(ValueError):
+        metrics.observe("unknown_seconds", 1.0)
+
+
+def test_a_prediction_records_its_spans(tmp_path):
+    pipeline = PredictionPipeline(config=make_prediction_config(save_model(build_tiny_model(), tmp_path)))
+    before = get_metrics().summary()
+
+    pipeline.predict(encode_image(np.zeros((16, 16, 3), dtype=np.uint8)))
+
+    after = get_metrics().summary()
+    for name in ("decode", "resize", "normalize", "forward", "postprocess", "predict"):
+        key = f"span_duration_seconds{{span={name}}}"
+        assert after[key]["count"] == before.get(key, {"count": 0})["count"] + 1, name
+
+
+def test_one_profile_at_a_time(tmp_path):
+    entered, release = threading.Event(), threading.Event()
+
+    def capture():
+        with profile_capture("cprofile", tmp_path, "first"):
+            entered.set()
+            release.wait(10)
+
+    thread = threading.Thread(target=capture)
+    thread.start()
+    entered.wait(10)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            with profile_capture("cprofile", tmp_path, "second"):
+                pass
+    finally:
+        release.set()
+        thread.join()
+
+    assert pstats.Stats(str(tmp_path / "first.prof")).total_calls > 0
+    with pytest.raises(ValueError):
+        with profile_capture("perf", tmp_path, "third"):
+            pass
@@ -0,0 +1,68 @@
+import numpy as np
+
+from cnnClassifier.components import result_cache
+from cnnClassifier.components.result_cache import PredictionResultCache
+
+
+def test_results_are_keyed_on_the_image_and_dropped_when_the_model_changes():
+    cache = PredictionResultCache(max_entries=4, ttl_seconds=60)
+    image = np.zeros((8, 8, 3), dtype=np.float32)
+    key = cache.image_key(image)
+    cache.put(key, "model-a", [0.25, 0.75])
+
+    np.testing.assert_array_equal(cache.get(cache.image_key(image.copy()), "model-a"), [0.25, 0.75])
+    assert cache.get(cache.image_key(image + 1), "model-a") is None
+    assert cache.get(key, "model-b") is None
+    assert cache.get(key, "model-a") is None
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_the_lru_keeps_max_entries_and_results_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = PredictionResultCache(max_entries=2, ttl_seconds=10)
+    for key in ("a", "b", "c"):
+        cache.put(key, "model", [1.0, 0.0])
+
+    assert cache.get("a", "model") is None
+    assert cache.get("b", "model") is not None
+    now[0] += 11
+    assert cache.get("c", "model") is None
+    metrics = cache.metrics()
+    assert metrics["evictions"] == 1 and metrics["expirations"] == 1 and metrics["size"] == 1
+
+
+def test_the_disk_tier_survives_a_restart(tmp_path):
+    PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite").put("a", "model", [0.5, 0.5])
+
+    restarted = PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite")
+
+    np.testing.assert_array_equal(restarted.get("a", "model"), [0.5, 0.5])
+    assert restarted.get("a", "other-model") is None
+    assert restarted.metrics()["disk_hits"] == 1
+
+
+def test_workers_serving_different_models_keep_each_others_disk_rows(tmp_path):
+    old_worker = PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite")
+    new_worker = PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite")
+    old_worker.put("a", "old-model", [0.5, 0.5])
+
+    new_worker.put("a", "new-model", [0.25, 0.75])
+    restarted = PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite")
+
+    np.testing.assert_array_equal(restarted.get("a", "old-model"), [0.5, 0.5])
+    np.testing.assert_array_equal(restarted.get("a", "new-model"), [0.25, 0.75])
+
+
+def test_the_disk_tier_is_trimmed_by_age_and_size(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = PredictionResultCache(max_entries=4, ttl_seconds=60, disk_path=tmp_path / "results.sqlite", disk_max_entries=50)
+    cache.put("expired", "old-model", [1.0, 0.0])
+    now[0] += 61
+    for index in range(99):
+        now[0] += 0.01
+        cache.put(str(index), "model", [1.0, 0.0])
+
+    assert cache.metrics()["disk_size"] == 50
+    assert cache._db.execute("SELECT COUNT(*) FROM results WHERE key LIKE 'old-model:%'").fetchone()[0] == 0
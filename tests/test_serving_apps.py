@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+from starlette.testclient import TestClient
+
+from conftest import build_tiny_model, encode_image, make_prediction_config, save_model
+
+IMAGE = encode_image(np.zeros((16, 16, 3), dtype=np.uint8))
+
+
+@pytest.fixture
+def asgi_client(tmp_path):
+    import asgi_app
+
+    config = make_prediction_config(save_model(build_tiny_model(), tmp_path), max_images_per_request=3, max_upload_mb=1)
+    client_app = asgi_app.AsyncClientApp(config)
+    asgi_app.app.state.clApp = client_app
+    yield TestClient(asgi_app.app)
+    client_app.executor.shutdown()
+
+
+def files(count: int) -> list:
+    return [("images", (f"{index}.png", IMAGE, "image/png")) for index in range(count)]
+
+
+def test_asgi_multipart_upload_is_predicted_per_image(asgi_client):
+    response = asgi_client.post("/predict", files=files(3))
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_too_many_images_get_the_same_413_from_both_apps(asgi_client):
+    import app
+
+    response = asgi_client.post("/predict", files=files(4))
+
+    assert response.status_code == 413
+    assert response.json() == {"error": "At most 3 images per request"}
+
+    limit = app.serving_config.max_images_per_request
+    uploads = [(io.BytesIO(IMAGE), f"{index}.png") for index in range(limit + 1)]
+    flask_response = app.app.test_client().post("/predict", data={"images": uploads})
+    assert flask_response.status_code == 413
+    assert flask_response.get_json() == {"error": f"At most {limit} images per request"}
+
+
+def test_chunked_bodies_without_a_content_length_are_capped(asgi_client):
+    def chunks():
+        for _ in range(3):
+            yield b"\0" * (512 * 1024)
+
+    response = asgi_client.post("/predict", content=chunks(), headers={"Content-Type": "image/png"})
+
+    assert response.status_code == 413
+    assert response.json() == {"error": "The request body exceeds 1 MB"}
+
+
+def test_undecodable_images_are_rejected_with_400(asgi_client):
+    response = asgi_client.post("/predict", content=b"not an image", headers={"Content-Type": "image/png"})
+
+    assert response.status_code == 400
+    assert "Cannot decode the image" in response.json()["error"]
+
+
+@pytest.mark.parametrize("headers", [
+    {"X-Request-Timeout-Ms": "soon"},
+    {"X-Request-Timeout-Ms": "nan"},
+    {"X-Request-Timeout-Ms": "-5"},
+    {"X-Request-Timeout-Ms": "0"},
+    {"Content-Length": "many"},
+])
+def test_malformed_headers_are_rejected_with_400(asgi_client, headers):
+    response = asgi_client.post("/predict", content=IMAGE, headers={"Content-Type": "image/png", **headers})
+
+    assert response.status_code == 400
+    assert list(headers)[0] in response.json()["error"]
+
+
+def test_the_request_timeout_header_is_capped_at_the_configured_timeout(asgi_client):
+    from starlette.requests import Request
+
+    client_app = asgi_client.app.state.clApp
+
+    def request(timeout_ms):
+        return Request({"type": "http", "headers": [(b"x-request-timeout-ms", timeout_ms.encode())]})
+
+    assert client_app.timeout_of(request("10")) == pytest.approx(0.01)
+    assert client_app.timeout_of(request("1e12")) == client_app.default_timeout
+    assert client_app.timeout_of(request("inf")) == client_app.default_timeout
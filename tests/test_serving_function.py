@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from cnnClassifier.components.model_registry import build_serving_function, warm_up
+from cnnClassifier.pipeline.prediction import PredictionPipeline
+from conftest import build_tiny_model, make_prediction_config, save_model
+
+
+def test_serving_function_matches_the_model_for_any_batch_size():
+    model = build_tiny_model()
+    serve = build_serving_function(model, [8, 8, 3])
+
+    for batch_size in (1, 3, 8):
+        images = np.random.default_rng(batch_size).random((batch_size, 8, 8, 3), dtype=np.float32)
+        np.testing.assert_allclose(serve(tf.constant(images)).numpy(), model(images).numpy(), atol=1e-6)
+
+
+def test_serving_function_is_traced_once_for_its_fixed_signature():
+    serve = build_serving_function(build_tiny_model(), [8, 8, 3])
+
+    warm_up(serve, [8, 8, 3], [1, 4, 16])
+
+    assert serve.experimental_get_tracing_count() == 1
+    with pytest.raises((TypeError, ValueError)):
+        serve(tf.zeros([1, 4, 4, 3]))
+
+
+def test_padded_xla_batches_return_one_row_per_image(tmp_path):
+    model = build_tiny_model()
+    config = make_prediction_config(save_model(model, tmp_path), jit_compile=True, warmup_batch_sizes=[1, 4])
+    pipeline = PredictionPipeline(config=config)
+    images = np.random.default_rng(0).random((3, 8, 8, 3), dtype=np.float32)
+
+    probabilities = pipeline.forward(images)
+
+    assert probabilities.shape == (3, 2)
+    np.testing.assert_allclose(probabilities, model(images).numpy(), atol=1e-5)
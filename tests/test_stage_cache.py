@@ -0,0 +1,84 @@
+import copy
+from pathlib import Path
+
+from box import ConfigBox
+
+from cnnClassifier.components.stage_cache import StageCache, StageSpec
+from cnnClassifier.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from cnnClassifier.utils.common import read_yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_a_stage_reruns_only_when_its_inputs_change(tmp_path):
+    dep, out = tmp_path / "dep.txt", tmp_path / "out.txt"
+    dep.write_text("v1")
+    out.write_text("result")
+    config = ConfigBox({"stage": {"a": 1}, "other": {"read": 1, "ignored": 1}})
+    params = ConfigBox({"EPOCHS": 1, "SEED": 0})
+    spec = StageSpec(name="Stage", key="stage", pipeline=object, config_sections=["stage", "other.read"],
+                     params=["EPOCHS"], deps=[str(dep)], outs=[str(out)])
+    cache = StageCache(tmp_path / "state.json")
+    cache.record(spec, cache.input_hash(spec, config, params), 1.0)
+
+    def up_to_date(config=config, params=params):
+        return StageCache(tmp_path / "state.json").is_up_to_date(spec, cache.input_hash(spec, config, params))
+
+    assert up_to_date()
+    assert up_to_date(config=ConfigBox({**config, "other": {"read": 1, "ignored": 2}}))
+    assert up_to_date(params=ConfigBox({"EPOCHS": 1, "SEED": 1}))
+    assert not up_to_date(config=ConfigBox({**config, "other": {"read": 2, "ignored": 1}}))
+    assert not up_to_date(config=ConfigBox({**config, "stage": {"a": 2}}))
+    assert not up_to_date(params=ConfigBox({"EPOCHS": 2, "SEED": 0}))
+    dep.write_text("v2")
+    assert not up_to_date()
+    dep.write_text("v1")
+    out.unlink()
+    assert not up_to_date()
+
+
+def test_every_config_path_a_stage_reads_is_part_of_its_inputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    from main import stage_specs
+
+    config, params = read_yaml(CONFIG_FILE_PATH), read_yaml(PARAMS_FILE_PATH)
+    specs = {spec.key: spec for spec in stage_specs(config)}
+    cache = StageCache(tmp_path / "state.json")
+    read_by = {
+        "training": ["model_artifacts.root_dir", "data_ingestion.split_path", "data_ingestion.image_cache_dir",
+                     "evaluation.predictions_path", "profiling.training_profile", "prepare_base_model.updated_base_model_path"],
+        "evaluation": ["training.trained_model_path", "data_ingestion.split_path", "data_ingestion.image_cache_dir"],
+        "model_export": ["training.trained_model_path", "training.training_data", "data_ingestion.split_path"],
+    }
+
+    for key, paths in read_by.items():
+        for path in paths:
+            changed = copy.deepcopy(config.to_dict())
+            section, name = path.split(".")
+            changed[section][name] = f"{changed[section][name]}-changed"
+            assert cache.input_hash(specs[key], ConfigBox(changed), params) != cache.input_hash(specs[key], config, params), (key, path)
+
+
+def test_stage_code_deps_follow_the_imports(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    from main import stage_specs
+    from cnnClassifier.components.stage_cache import module_deps
+
+    training = {spec.key: spec for spec in stage_specs(read_yaml(CONFIG_FILE_PATH))}["training"]
+    for module in ("model_trainer", "image_cache", "profiling", "checkpoints", "distribution"):
+        assert f"src/cnnClassifier/components/{module}.py" in training.deps
+
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "stage.py").write_text("from pkg import direct\n\ndef run():\n    from pkg.lazy import thing\n")
+    (package / "direct.py").write_text("from .transitive import VALUE\n")
+    (package / "transitive.py").write_text("import os\nVALUE = 1\n")
+    (package / "lazy.py").write_text("thing = None\n")
+    (package / "unused.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    assert module_deps("pkg.stage", package="pkg") == [
+        "pkg/__init__.py", "pkg/direct.py", "pkg/lazy.py", "pkg/stage.py", "pkg/transitive.py"
+    ]
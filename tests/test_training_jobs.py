@@ -0,0 +1,94 @@
+import os
+import textwrap
+import time
+
+import pytest
+
+from cnnClassifier.components import training_jobs
+from cnnClassifier.components.training_jobs import TrainingJobManager, TrainingJobRunningError
+from cnnClassifier.entity.config_entity import TrainingJobsConfig
+
+# stands in for main.py: one stage that waits for the `release` file, or exits early on `crash`
+TRAINING_SCRIPT = textwrap.dedent("""
+    import os, sys, time
+    from cnnClassifier.components.training_jobs import JobStatus
+
+    status = JobStatus(sys.argv[2], ["Training stage"])
+    status.stage_started("Training stage")
+    while not os.path.exists("release"):
+        if os.path.exists("crash"):
+            os._exit(1)
+        time.sleep(0.02)
+    status.stage_finished("Training stage")
+    status.finish()
+""")
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    (tmp_path / "main.py").write_text(TRAINING_SCRIPT)
+    monkeypatch.setattr(training_jobs, "PROJECT_ROOT", tmp_path)
+    # the server's working directory is not the project root
+    (tmp_path / "server").mkdir()
+    monkeypatch.chdir(tmp_path / "server")
+    return TrainingJobManager(TrainingJobsConfig(root_dir="jobs", niceness=0))
+
+
+def wait_for(manager, job_id, states, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(job_id)
+        if status["state"] in states:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not reach {states}: {status}")
+
+
+def test_only_one_training_run_at_a_time(manager, tmp_path):
+    job = manager.submit()
+    assert wait_for(manager, job["job_id"], ("running",))["current_stage"] == "Training stage"
+
+    with pytest.raises(TrainingJobRunningError) as error:
+        manager.submit()
+    assert error.value.job_id == job["job_id"]
+
+    (tmp_path / "release").touch()
+    status = wait_for(manager, job["job_id"], ("succeeded", "failed"))
+    assert status["state"] == "succeeded" and status["progress"] == 1.0
+    # the lock is released with the training process
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            next_job = manager.submit()
+            break
+        except TrainingJobRunningError:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    assert [job["job_id"] for job in manager.list_jobs()] == sorted([job["job_id"], next_job["job_id"]], reverse=True)
+
+
+def test_a_crashed_run_is_reported_as_failed(manager, tmp_path):
+    job = manager.submit()
+    wait_for(manager, job["job_id"], ("running",))
+
+    (tmp_path / "crash").touch()
+
+    status = wait_for(manager, job["job_id"], ("succeeded", "failed"))
+    assert status["state"] == "failed" and "exited unexpectedly" in status["error"]
+
+
+def test_finished_runs_are_reaped_when_their_status_is_read(manager, tmp_path):
+    job = manager.submit()
+    pid = manager._processes[job["job_id"]].pid
+    wait_for(manager, job["job_id"], ("running",))
+
+    (tmp_path / "release").touch()
+    wait_for(manager, job["job_id"], ("succeeded",))
+    deadline = time.monotonic() + 10
+    while manager._processes and time.monotonic() < deadline:
+        time.sleep(0.05)
+        manager.status(job["job_id"])
+
+    assert not manager._processes
+    assert not os.path.exists(f"/proc/{pid}")
+    assert (tmp_path / "server" / "jobs" / job["job_id"] / "status.json").exists()